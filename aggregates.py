@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Running usage totals and time-bucketed rollups.
+
+Writers (hotspot_monitor.py, simulator.py) call record_usage() with the same
+cursor they used for the Connection_Log / Data_Usage inserts, so the totals
+and buckets are committed in the same transaction as the raw rows. The
+dashboard then reads these small tables instead of re-aggregating every log row.
+Every such transaction also bumps Ingest_Watermark, which app.py uses to tell
+whether a cached response is still current.
+
+Run this file directly to rebuild everything from the raw tables:
+    python aggregates.py
+
+retention.py compacts old raw rows into Usage_Rollup; the rebuild reads those
+too, so totals come out the same. Buckets can only be rebuilt as finely as the
+surviving history: hourly ones from hourly rollups, none from daily rollups.
+"""
+from datetime import timedelta
+import storage
+
+DEVICE_TOTAL_SQL = """
+    INSERT INTO Device_Usage_Total (Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Last_Seen = GREATEST(COALESCE(Last_Seen, VALUES(Last_Seen)), VALUES(Last_Seen)),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+NETWORK_TOTAL_SQL = """
+    INSERT INTO Network_Usage_Total (Network_ID, Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Last_Seen = GREATEST(COALESCE(Last_Seen, VALUES(Last_Seen)), VALUES(Last_Seen)),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+# One row (Id = 1); Version goes up by one with every committed ingest or edit
+WATERMARK_SQL = """
+    INSERT INTO Ingest_Watermark (Id, Version, Updated_At)
+    VALUES (1, 1, NOW(3))
+    ON DUPLICATE KEY UPDATE Version = Version + 1, Updated_At = NOW(3)
+"""
+
+# Usage is stored in bytes; the dashboard shows megabytes
+BYTES_PER_MB = 1024 * 1024
+
+# Bucket sizes in seconds (1 minute, 5 minutes, 1 hour). All divide an hour evenly.
+RESOLUTIONS = (60, 300, 3600)
+
+GLOBAL_BUCKET_SQL = """
+    INSERT INTO Usage_Bucket_Global (Resolution, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+DEVICE_BUCKET_SQL = """
+    INSERT INTO Usage_Bucket_Device (Resolution, Device_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+NETWORK_BUCKET_SQL = """
+    INSERT INTO Usage_Bucket_Network (Resolution, Network_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+
+def bucket_start(timestamp, resolution):
+    """Floors a datetime to the start of its bucket (local wall-clock time)."""
+    # TIMESTAMP columns store whole seconds and MySQL rounds the fraction,
+    # so round here too; otherwise a rebuild could put a row in another bucket.
+    if timestamp.microsecond >= 500000:
+        timestamp += timedelta(seconds=1)
+    timestamp = timestamp.replace(microsecond=0)
+    return timestamp - timedelta(seconds=(timestamp.minute * 60 + timestamp.second) % resolution)
+
+
+def bump_watermark(cursor):
+    """
+    Marks the dashboard data as changed. Does NOT commit; call it last in the
+    transaction so the single watermark row stays locked as briefly as possible.
+    """
+    cursor.execute(WATERMARK_SQL)
+
+
+def _bucket_sql_expr(column, resolution):
+    """SQL equivalent of bucket_start() for the rebuild queries."""
+    if storage.BACKEND == 'sqlite':
+        return f"BUCKET_START({column}, {int(resolution)})"  # registered by storage.connect_sqlite()
+    return f"{column} - INTERVAL ((MINUTE({column}) * 60 + SECOND({column})) % {int(resolution)}) SECOND"
+
+
+def _fold_bucket(buckets, key, data_down, data_up):
+    """Adds one sample to an in-memory [down, up, count] bucket entry."""
+    entry = buckets.get(key)
+    if entry is None:
+        buckets[key] = [data_down, data_up, 1]
+        return
+    entry[0] += data_down
+    entry[1] += data_up
+    entry[2] += 1
+
+
+def _fold(totals, key, timestamp, data_down, data_up):
+    """Adds one sample to an in-memory [down, up, last_seen, count] entry."""
+    entry = totals.get(key)
+    if entry is None:
+        totals[key] = [data_down, data_up, timestamp, 1]
+        return
+    entry[0] += data_down
+    entry[1] += data_up
+    if timestamp > entry[2]:
+        entry[2] = timestamp
+    entry[3] += 1
+
+
+def record_usage(cursor, samples):
+    """
+    Adds samples to the running totals and time buckets. Does NOT commit: the
+    caller commits together with the raw Connection_Log / Data_Usage rows.
+
+    samples: iterable of (device_id, network_id, timestamp, bytes_down, bytes_up)
+    """
+    device_totals = {}
+    network_totals = {}
+    global_buckets = {}
+    device_buckets = {}
+    network_buckets = {}
+    for device_id, network_id, timestamp, data_down, data_up in samples:
+        _fold(device_totals, device_id, timestamp, data_down, data_up)
+        _fold(network_totals, (network_id, device_id), timestamp, data_down, data_up)
+        for resolution in RESOLUTIONS:
+            start = bucket_start(timestamp, resolution)
+            _fold_bucket(global_buckets, (resolution, start), data_down, data_up)
+            _fold_bucket(device_buckets, (resolution, device_id, start), data_down, data_up)
+            _fold_bucket(network_buckets, (resolution, network_id, start), data_down, data_up)
+
+    if not device_totals:
+        return
+
+    cursor.executemany(DEVICE_TOTAL_SQL, [
+        (device_id, down, up, last_seen, count)
+        for device_id, (down, up, last_seen, count) in device_totals.items()
+    ])
+    cursor.executemany(NETWORK_TOTAL_SQL, [
+        (network_id, device_id, down, up, last_seen, count)
+        for (network_id, device_id), (down, up, last_seen, count) in network_totals.items()
+    ])
+    cursor.executemany(GLOBAL_BUCKET_SQL, [
+        (resolution, start, down, up, count)
+        for (resolution, start), (down, up, count) in global_buckets.items()
+    ])
+    cursor.executemany(DEVICE_BUCKET_SQL, [
+        (resolution, device_id, start, down, up, count)
+        for (resolution, device_id, start), (down, up, count) in device_buckets.items()
+    ])
+    cursor.executemany(NETWORK_BUCKET_SQL, [
+        (resolution, network_id, start, down, up, count)
+        for (resolution, network_id, start), (down, up, count) in network_buckets.items()
+    ])
+    bump_watermark(cursor)
+
+
+# Every sample still on record: the raw rows plus the rollups of compacted ones
+USAGE_HISTORY_SQL = """
+    (SELECT cl.Device_ID, cl.Network_ID, cl.Timestamp AS Last_Seen,
+            du.Data_Downloaded, du.Data_Uploaded, 1 AS Sample_Count
+     FROM Connection_Log cl
+     JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+     UNION ALL
+     SELECT Device_ID, Network_ID, Last_Seen, Data_Downloaded, Data_Uploaded, Sample_Count
+     FROM Usage_Rollup) h
+"""
+
+def rebuild_aggregates(conn):
+    """Recomputes every running total and bucket from the usage history in one transaction."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM Device_Usage_Total")
+        cursor.execute("DELETE FROM Network_Usage_Total")
+        cursor.execute("DELETE FROM Usage_Bucket_Global")
+        cursor.execute("DELETE FROM Usage_Bucket_Device")
+        cursor.execute("DELETE FROM Usage_Bucket_Network")
+        cursor.execute(f"""
+            INSERT INTO Device_Usage_Total (Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+            SELECT Device_ID, SUM(Data_Downloaded), SUM(Data_Uploaded), MAX(Last_Seen), SUM(Sample_Count)
+            FROM {USAGE_HISTORY_SQL}
+            GROUP BY Device_ID
+        """)
+        device_rows = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO Network_Usage_Total (Network_ID, Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+            SELECT Network_ID, Device_ID, SUM(Data_Downloaded), SUM(Data_Uploaded), MAX(Last_Seen), SUM(Sample_Count)
+            FROM {USAGE_HISTORY_SQL}
+            GROUP BY Network_ID, Device_ID
+        """)
+        network_rows = cursor.rowcount
+        bucket_rows = 0
+        for resolution in RESOLUTIONS:
+            start = _bucket_sql_expr('cl.Timestamp', resolution)
+            cursor.execute(f"""
+                INSERT INTO Usage_Bucket_Global (Resolution, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+                SELECT {resolution}, {start}, SUM(du.Data_Downloaded), SUM(du.Data_Uploaded), COUNT(*)
+                FROM Connection_Log cl
+                JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+                GROUP BY {start}
+            """)
+            bucket_rows += cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO Usage_Bucket_Device (Resolution, Device_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+                SELECT {resolution}, cl.Device_ID, {start}, SUM(du.Data_Downloaded), SUM(du.Data_Uploaded), COUNT(*)
+                FROM Connection_Log cl
+                JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+                GROUP BY cl.Device_ID, {start}
+            """)
+            bucket_rows += cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO Usage_Bucket_Network (Resolution, Network_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+                SELECT {resolution}, cl.Network_ID, {start}, SUM(du.Data_Downloaded), SUM(du.Data_Uploaded), COUNT(*)
+                FROM Connection_Log cl
+                JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+                GROUP BY cl.Network_ID, {start}
+            """)
+            bucket_rows += cursor.rowcount
+        # Compacted hours only have hourly buckets. Added on top, in case a late
+        # (spooled) raw row landed in an hour that was already compacted.
+        cursor.execute("""
+            INSERT INTO Usage_Bucket_Global (Resolution, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+            SELECT 3600, Bucket_Start, SUM(Data_Downloaded), SUM(Data_Uploaded), SUM(Sample_Count)
+            FROM Usage_Rollup WHERE Resolution = 3600
+            GROUP BY Bucket_Start
+            ON DUPLICATE KEY UPDATE
+                Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+                Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+                Sample_Count = Sample_Count + VALUES(Sample_Count)
+        """)
+        bucket_rows += cursor.rowcount
+        cursor.execute("""
+            INSERT INTO Usage_Bucket_Device (Resolution, Device_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+            SELECT 3600, Device_ID, Bucket_Start, SUM(Data_Downloaded), SUM(Data_Uploaded), SUM(Sample_Count)
+            FROM Usage_Rollup WHERE Resolution = 3600
+            GROUP BY Device_ID, Bucket_Start
+            ON DUPLICATE KEY UPDATE
+                Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+                Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+                Sample_Count = Sample_Count + VALUES(Sample_Count)
+        """)
+        bucket_rows += cursor.rowcount
+        cursor.execute("""
+            INSERT INTO Usage_Bucket_Network (Resolution, Network_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+            SELECT 3600, Network_ID, Bucket_Start, SUM(Data_Downloaded), SUM(Data_Uploaded), SUM(Sample_Count)
+            FROM Usage_Rollup WHERE Resolution = 3600
+            GROUP BY Network_ID, Bucket_Start
+            ON DUPLICATE KEY UPDATE
+                Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+                Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+                Sample_Count = Sample_Count + VALUES(Sample_Count)
+        """)
+        bucket_rows += cursor.rowcount
+        bump_watermark(cursor)
+        conn.commit()
+        return device_rows, network_rows, bucket_rows
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+if __name__ == '__main__':
+    print("--- Rebuilding usage totals and buckets from raw logs ---")
+    conn = storage.connect()
+    try:
+        device_rows, network_rows, bucket_rows = rebuild_aggregates(conn)
+        print(f"Rebuilt {device_rows} device totals, {network_rows} network/device totals and {bucket_rows} buckets.")
+    finally:
+        conn.close()
@@ -1,12 +1,35 @@
-from flask import Flask, jsonify, request, make_response, redirect, url_for, flash, render_template_string
-import mysql.connector
+from flask import Flask, jsonify, request, make_response, redirect, url_for, flash, render_template_string, g, has_app_context, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import pandas as pd
 from datetime import datetime, timedelta  # <-- MODIFIED: Ensure timedelta is imported
 import uuid
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import io
+import json
+import base64
+import csv
+import zlib
+import time
+import hashlib
+import hmac
+import threading
+from functools import wraps
+try:
+    import orjson
+    # Flask's default converts datetimes to HTTP dates; keep that rather than orjson's ISO form
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+except ImportError:  # optional: the standard json module is used instead
+    orjson = None
+import storage
+from aggregates import bump_watermark
+from db_pool import ConnectionPool
+from shaping import TIMESTAMP_FORMAT, to_mb, format_data_unit, mb_column, unit_column, timestamp_column, shape_usage
+from instrumentation import InstrumentedConnection, Metrics, start_request, finish_request, timed
+from id_generator import next_id
+from ttl_cache import TTLCache
+from live_updates import LiveHub
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -16,29 +39,283 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-db_config = {'host': 'localhost', 'user': 'root', 'password': '1234', 'database': 'dbms_proj'}
+# --- INSTRUMENTATION ---
+# Every SQL statement, result-shaping step and JSON encoding is timed (see instrumentation.py):
+# per request in the Server-Timing header, and in aggregate on /metrics.
+# SLOW_QUERY_MS prints statements that take at least that long; METRICS_TOKEN lets a
+# Prometheus scraper read /metrics with "Authorization: Bearer <token>" instead of a login.
+SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+metrics = Metrics(slow_query_seconds=float(SLOW_QUERY_MS) / 1000 if SLOW_QUERY_MS else None)
+
+@app.before_request
+def start_request_timing():
+    start_request(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def finish_request_timing(response):
+    # A streamed export is timed until its first byte; its queries are still counted when they finish
+    timings = finish_request()
+    if timings is not None:
+        response.headers['Server-Timing'] = timings.server_timing()
+        metrics.requests.observe((timings.endpoint, request.method, str(response.status_code)), timings.elapsed())
+    return response
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() with the encoding timed as the 'json' stage, and done by orjson
+    when it is installed: equivalent JSON (sorted keys, compact, Flask's
+    conversions for dates and decimals; UTF-8 rather than \\u escapes),
+    several times faster.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+    def response(self, *args, **kwargs):
+        with timed(metrics, 'json', request.endpoint or 'unmatched'):
+            if orjson is None or self._app.debug:
+                return super().response(*args, **kwargs)
+            body = orjson.dumps(self._prepare_response_obj(args, kwargs), default=self.default, option=ORJSON_OPTIONS)
+            return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+app.json = TimedJSONProvider(app)
+
+# Per worker process; size it so workers * DB_POOL_SIZE stays under max_connections
+# (DB_BACKEND=sqlite: connections to the local database file, see storage.py)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+db_pool = ConnectionPool(lambda: InstrumentedConnection(storage.connect(), metrics), size=DB_POOL_SIZE)
 
 def get_db_connection():
-    return mysql.connector.connect(**db_config)
+    """
+    Checks a connection out of the pool. conn.close() gives it back; any
+    connection a handler didn't close (e.g. because it raised) is given back
+    when the request ends.
+    """
+    conn = db_pool.get()
+    if has_app_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
 
-# --- NEW HELPER FUNCTION ---
-def format_data_unit(mb_value):
-    """Converts a float MB value to a readable string (MB or GB)."""
-    if mb_value is None or mb_value == 0:
-        return "0 MB"
+@app.teardown_appcontext
+def release_db_connections(exc):
+    for conn in g.pop('db_connections', []):
+        conn.close()
+
+# How many buckets the charts show (one week of hours, one day of 5-minute slots)
+USAGE_CHART_HOURS = 168
+DEVICE_CHART_BUCKETS = 288
+
+def cumulative_bucket_series(rows, step, total_bytes, label_format):
+    """
+    Turns sparse bucket rows (Bucket_Start, total_usage in bytes) into a
+    gap-filled cumulative series in MB, like resample().sum().cumsum() over
+    the raw logs. Usage from before the first bucket is carried in via
+    total_bytes, the all-time total, so the last point always equals it.
+    """
+    if not rows:
+        return {"labels": [], "data": []}
+    usage = {r['Bucket_Start']: to_mb(r['total_usage']) for r in rows}
+    running = max(to_mb(total_bytes) - sum(usage.values()), 0.0)
+    labels, data = [], []
+    bucket, end = rows[0]['Bucket_Start'], rows[-1]['Bucket_Start']
+    while bucket <= end:
+        running += usage.get(bucket, 0.0)
+        labels.append(bucket.strftime(label_format))
+        data.append(round(running, 2))
+        bucket += step
+    return {"labels": labels, "data": data}
+
+# --- RESPONSE CACHE ---
+# The read endpoints return the same answer until new usage lands or a device is edited,
+# and every such write bumps Ingest_Watermark.Version (see aggregates.bump_watermark).
+# A cached response is served while the version is unchanged; the TTL bounds the
+# fields that age on their own (the 90-second "Connected" status, "today").
+WATERMARK_CHECK_INTERVAL = 1.0  # Seconds one watermark read is shared by all requests
+RESPONSE_CACHE_TTL = 15
+response_cache = TTLCache(maxsize=256, ttl=RESPONSE_CACHE_TTL, counters=('stale', 'notModified', 'bypassed'))
+_watermark = {'version': None, 'checkedAt': 0.0, 'read': 0}  # read: number of the latest claimed read
+_watermark_lock = threading.Lock()
+
+def ingest_watermark(conn):
+    """Ingest_Watermark.Version: goes up with every committed usage write or device edit."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT Version FROM Ingest_Watermark WHERE Id = 1")
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else 0
+
+def current_watermark():
+    """
+    The ingest watermark, read from the database at most once per
+    WATERMARK_CHECK_INTERVAL (failed reads included). None if unavailable.
+    The request that claims a read does it outside the lock; the others
+    get the last version meanwhile.
+    """
+    with _watermark_lock:
+        if time.monotonic() - _watermark['checkedAt'] < WATERMARK_CHECK_INTERVAL:
+            return _watermark['version']
+        _watermark['checkedAt'] = time.monotonic()
+        _watermark['read'] += 1
+        read = _watermark['read']
     try:
-        mb_value = float(mb_value)
+        conn = get_db_connection()
+        try:
+            version = ingest_watermark(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Could not read the ingest watermark: {e}")
+        version = None
+    with _watermark_lock:
+        if _watermark['read'] == read:  # a later read may have finished first
+            _watermark['version'] = version
+    return version
+
+def data_changed():
+    """Call after committing an edit that bumped the watermark, so this process sees it at once."""
+    with _watermark_lock:
+        _watermark['checkedAt'] = 0.0
+    live_hub.poke()
+
+def cached_response(view):
+    """
+    Serves a read endpoint from response_cache (keyed by path and query
+    string) while the ingest watermark is unchanged. Responses carry an
+    ETag, so a poll whose data hasn't changed gets a bodiless 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = current_watermark()
+        if version is None:
+            response_cache.count('bypassed')
+            return view(*args, **kwargs)
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(key)
+        if entry is not None and entry['version'] != version:
+            response_cache.count('stale')
+            entry = None
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            entry = {
+                'version': version,
+                'etag': hashlib.sha1(body).hexdigest(),
+                'body': body,
+                'mimetype': response.mimetype,
+            }
+            response_cache.set(key, entry)
+
+        response = app.response_class(entry['body'], mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'  # always revalidate, which is cheap
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            response_cache.count('notModified')
+        return response
+    return wrapper
+
+# --- LISTINGS (keyset pagination) ---
+# Listings return {"items": [...], "nextCursor": ...}. The cursor carries the sort key
+# and id of the last row, so the next page is a range scan from there (no OFFSET).
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# A device seen within this window counts as Connected / online
+CONNECTED_WINDOW = timedelta(seconds=90)
+
+class InvalidQuery(ValueError):
+    """A listing's sort, filter or cursor can't be used; answered with 400."""
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        # TIMESTAMP columns hold whole seconds; this is also the form SQLite compares as text
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value.item() if hasattr(value, 'item') else float(value)
+
+def encode_cursor(sort, order, sort_value, row_id):
+    raw = json.dumps([sort, order, sort_value, row_id], separators=(',', ':'), default=_cursor_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort, order):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_order, sort_value, row_id = json.loads(raw)
     except (ValueError, TypeError):
-        return "N/A"
-    
-    if abs(mb_value) < 1024:
-        # Show MB if it's less than 1 GB
-        return f"{round(mb_value, 2)} MB"
-    else:
-        # Show GB if it's 1 GB or more
-        gb_value = mb_value / 1024
-        return f"{round(gb_value, 2)} GB"
-# --- END NEW HELPER FUNCTION ---
+        raise InvalidQuery("cursor is not valid")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise InvalidQuery("cursor belongs to a different sort order")
+    return sort_value, row_id
+
+def listing_args(args, sorts, default_sort, default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Reads limit, sort, order and cursor from a query string.
+    sorts: {sort name: SQL expression of the sort key}
+    """
+    try:
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        raise InvalidQuery("limit must be a number")
+    sort = args.get('sort', default_sort)
+    if sort not in sorts:
+        raise InvalidQuery(f"sort must be one of: {', '.join(sorts)}")
+    order = args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise InvalidQuery("order must be asc or desc")
+    after = decode_cursor(args['cursor'], sort, order) if args.get('cursor') else None
+    return {
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+        'sort': sort,
+        'order': order,
+        'sortKey': sorts[sort],
+        'after': after,
+    }
+
+def keyset(page, id_column, sort_key=None):
+    """
+    (condition, params, order_by) for one page: the condition continues after
+    the cursor (None on the first page); order_by fetches one extra row to
+    tell whether there is a next page.
+    """
+    sort_key = sort_key or page['sortKey']
+    direction = 'DESC' if page['order'] == 'desc' else 'ASC'
+    order_by = f"ORDER BY {sort_key} {direction}, {id_column} {direction} LIMIT {page['limit'] + 1}"
+    if page['after'] is None:
+        return None, [], order_by
+    # (key, id) < (a, b) spelled out, so an index on the sort key serves it as a range
+    comparison = '<' if page['order'] == 'desc' else '>'
+    sort_value, row_id = page['after']
+    condition = f"{sort_key} {comparison}= %s AND ({sort_key} {comparison} %s OR {id_column} {comparison} %s)"
+    return condition, [sort_value, sort_value, row_id], order_by
+
+def finish_page(rows, page, id_key):
+    """Drops the look-ahead row and the sortKey column; returns the page response."""
+    next_cursor = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        next_cursor = encode_cursor(page['sort'], page['order'], rows[-1]['sortKey'], rows[-1][id_key])
+    for row in rows:
+        del row['sortKey']
+    return {"items": rows, "nextCursor": next_cursor}
+
+def id_arg(args, name):
+    """A numeric ID from the query string (IDs are BIGINT; compare them as integers)."""
+    try:
+        return int(args[name])
+    except ValueError:
+        raise InvalidQuery(f"{name} must be a numeric ID")
+
+def status_filter(value, last_seen_column, now):
+    """SQL condition and params for ?status=online|offline."""
+    if value == 'online':
+        return f"{last_seen_column} >= %s", [now - CONNECTED_WINDOW]
+    if value == 'offline':
+        return f"({last_seen_column} IS NULL OR {last_seen_column} < %s)", [now - CONNECTED_WINDOW]
+    raise InvalidQuery("status must be online or offline")
 
 class User(UserMixin):
     def __init__(self, id, email, first_name):
@@ -46,8 +323,23 @@ class User(UserMixin):
         self.email = email
         self.first_name = first_name
 
+# load_user runs on every authenticated request, so keep recently seen users in memory.
+# Anything that changes User rows must call invalidate_user().
+user_cache = TTLCache(maxsize=1024, ttl=300)
+
+def invalidate_user(user_id=None):
+    """Drops one cached user, or all of them when no id is given."""
+    user_cache.invalidate(user_id)
+
 @login_manager.user_loader
 def load_user(user_id):
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None  # a session from before User_ID became numeric
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT User_ID, Email_ID, First_Name FROM User WHERE User_ID = %s", (user_id,))
@@ -55,7 +347,9 @@ def load_user(user_id):
     cursor.close()
     conn.close()
     if db_user:
-        return User(id=db_user['User_ID'], email=db_user['Email_ID'], first_name=db_user['First_Name'])
+        user = User(id=db_user['User_ID'], email=db_user['Email_ID'], first_name=db_user['First_Name'])
+        user_cache.set(user_id, user)
+        return user
     return None
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -73,6 +367,7 @@ def login():
 
         if db_user and check_password_hash(db_user['Password_Hash'], password):
             user_obj = User(id=db_user['User_ID'], email=db_user['Email_ID'], first_name=db_user['First_Name'])
+            user_cache.set(user_obj.id, user_obj)
             login_user(user_obj)
             return redirect('/')
         else:
@@ -100,7 +395,7 @@ def index():
     except FileNotFoundError:
         return "Error: index.html not found.", 404
 
-@app.route('/api/device/<string:device_id>', methods=['GET'])
+@app.route('/api/device/<int:device_id>', methods=['GET'])
 @login_required
 def get_device_details(device_id):
     try:
@@ -112,67 +407,198 @@ def get_device_details(device_id):
         if not device_details:
             return jsonify({"error": "Device not found"}), 404
         
-        usage_query = "SELECT cl.Timestamp, (du.Data_Downloaded + du.Data_Uploaded) as total_usage FROM Data_Usage du JOIN Connection_Log cl ON du.Log_ID = cl.Log_ID WHERE cl.Device_ID = %s ORDER BY cl.Timestamp;"
-        df = pd.read_sql(usage_query, conn, params=(device_id,))
-        usage_graph_data = {"labels": [], "data": []}
-        if not df.empty:
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-            usage_resampled = df.set_index('Timestamp').resample('5min')['total_usage'].sum().cumsum()
-            usage_graph_data = {"labels": usage_resampled.index.strftime('%H:%M').tolist(), "data": usage_resampled.values.round(2).tolist()}
-        
-        log_query = "SELECT cl.Timestamp, cl.IP_Address, n.SSID, du.Data_Downloaded, du.Data_Uploaded FROM Connection_Log cl JOIN Network n ON cl.Network_ID = n.Network_ID JOIN Data_Usage du ON cl.Log_ID = du.Log_ID WHERE cl.Device_ID = %s ORDER BY cl.Timestamp DESC LIMIT 20;"
-        cursor.execute(log_query, (device_id,))
-        connection_logs = cursor.fetchall()
+        cursor.execute("SELECT COALESCE(Data_Downloaded + Data_Uploaded, 0) as total FROM Device_Usage_Total WHERE Device_ID = %s", (device_id,))
+        device_total = cursor.fetchone()
+        usage_query = """
+        SELECT Bucket_Start, (Data_Downloaded + Data_Uploaded) as total_usage
+        FROM (
+            SELECT Bucket_Start, Data_Downloaded, Data_Uploaded FROM Usage_Bucket_Device
+            WHERE Resolution = 300 AND Device_ID = %s
+            ORDER BY Bucket_Start DESC LIMIT %s
+        ) recent
+        ORDER BY Bucket_Start
+        """
+        cursor.execute(usage_query, (device_id, DEVICE_CHART_BUCKETS))
+        usage_graph_data = cumulative_bucket_series(cursor.fetchall(), timedelta(minutes=5),
+                                                    device_total['total'] if device_total else 0, '%H:%M')
         
-        formatted_logs = [{
-            'Timestamp': log['Timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-            'IP_Address': log['IP_Address'],
-            'Network_SSID': log['SSID'],
-            'Data_Downloaded_Formatted': format_data_unit(log['Data_Downloaded']),
-            'Data_Uploaded_Formatted': format_data_unit(log['Data_Uploaded'])
-        } for log in connection_logs]
+        logs = device_logs_data(cursor, device_id, request.args)
         
         cursor.close()
         conn.close()
-        response_data = {"details": device_details, "usage_graph": usage_graph_data, "logs": formatted_logs}
+        response_data = {"details": device_details, "usage_graph": usage_graph_data,
+                         "logs": logs['items'], "logsNextCursor": logs['nextCursor']}
         return jsonify(response_data)
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in /api/device/<device_id>: {e}")
         return jsonify({"error": str(e)}), 500
 
+LOG_SORTS = {
+    'time': "cl.Timestamp",
+    'usage': "(du.Data_Downloaded + du.Data_Uploaded)",
+}
+
+def device_logs_data(cursor, device_id, args):
+    """
+    One page of a device's connection history. Query string: limit
+    (default 20), sort (time|usage), order, cursor and network (Network_ID).
+    """
+    page = listing_args(args, LOG_SORTS, 'time', default_limit=20)
+    conditions, params = ["cl.Device_ID = %s"], [device_id]
+    if args.get('network'):
+        conditions.append("cl.Network_ID = %s")
+        params.append(args['network'])
+    after, after_params, order_by = keyset(page, 'cl.Log_ID')
+    if after:
+        conditions.append(after)
+        params.extend(after_params)
+    log_query = f"""
+    SELECT cl.Log_ID, cl.Timestamp, cl.IP_Address, n.SSID, du.Data_Downloaded, du.Data_Uploaded,
+           {page['sortKey']} as sortKey
+    FROM Connection_Log cl
+    JOIN Network n ON cl.Network_ID = n.Network_ID
+    JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+    WHERE {" AND ".join(conditions)}
+    {order_by}
+    """
+    cursor.execute(log_query, params)
+    result = finish_page(cursor.fetchall(), page, 'Log_ID')
+    logs = result['items']
+    with timed(metrics, 'shape', 'device_logs_data'):
+        result['items'] = [{
+            'Timestamp': timestamp,
+            'IP_Address': log['IP_Address'],
+            'Network_SSID': log['SSID'],
+            'Data_Downloaded_Formatted': down,
+            'Data_Uploaded_Formatted': up
+        } for log, timestamp, down, up in zip(
+            logs,
+            timestamp_column([log['Timestamp'] for log in logs]),
+            unit_column(mb_column([log['Data_Downloaded'] for log in logs])),
+            unit_column(mb_column([log['Data_Uploaded'] for log in logs])),
+        )]
+    return result
+
+@app.route('/api/device/<int:device_id>/logs', methods=['GET'])
+@login_required
+@cached_response
+def get_device_logs(device_id):
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        logs = device_logs_data(cursor, device_id, request.args)
+        cursor.close()
+        conn.close()
+        return jsonify(logs)
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in /api/device/<device_id>/logs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# --- CSV EXPORTS ---
+# Rows are streamed from an unbuffered (server-side) cursor and formatted
+# EXPORT_BATCH_ROWS at a time, so an export's memory use doesn't grow with
+# the table and the first bytes go out right away.
+EXPORT_BATCH_ROWS = 1000
+
+def parse_since(value):
+    """'2025-01-31' or '2025-01-31T08:00:00' -> datetime. Raises ValueError."""
+    return datetime.fromisoformat(value.strip().replace(' ', 'T'))
+
+def csv_export_response(filename, query, params, header, format_rows):
+    """
+    Runs query and streams the result as a CSV attachment; format_rows turns
+    one batch of result tuples into CSV rows. ?gzip=1 streams it gzipped.
+    """
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    # Checked out of the pool directly: the stream outlives the request's teardown
+    conn = db_pool.get()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+    except Exception:
+        conn.close()
+        raise
+    state = {'finished': False}
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None  # wbits=31: gzip container
+
+        def take_chunk():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(data) if compressor else data
+
+        writer.writerow(header)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            writer.writerows(format_rows(rows))
+            chunk = take_chunk()
+            if chunk:
+                yield chunk
+        chunk = take_chunk()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+        state['finished'] = True
+
+    def release():
+        if state['finished']:
+            cursor.close()
+            conn.close()
+        else:
+            # Client went away mid-export: the unread rest of the result makes the connection unusable
+            conn.discard()
+
+    response = Response(generate(), mimetype='application/gzip' if use_gzip else 'text/csv')
+    response.call_on_close(release)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}{'.gz' if use_gzip else ''}"
+    return response
+
+def format_device_export_rows(rows):
+    mb = mb_column([row[5] for row in rows])
+    return [
+        (device_id, name, device_type, mac, owner, label, total_mb, last_seen)
+        for (device_id, name, device_type, mac, owner, _, _), label, total_mb, last_seen in zip(
+            rows, unit_column(mb), mb, timestamp_column([row[6] for row in rows]))
+    ]
+
 @app.route('/api/devices/export', methods=['GET'])
 @login_required
 def export_devices():
+    """?since=<ISO date/time> exports only devices seen since then; ?gzip=1 compresses."""
     try:
-        conn = get_db_connection()
-        query = """
+        params = ()
+        since_filter = ""
+        if request.args.get('since'):
+            try:
+                params = (parse_since(request.args['since']),)
+            except ValueError:
+                return jsonify({"error": "since must be an ISO date or date/time, e.g. 2025-01-31T08:00:00"}), 400
+            since_filter = "WHERE t.Last_Seen >= %s"
+        query = f"""
         SELECT 
             d.Device_ID, d.Device_Name, d.Device_Type, d.MAC_Address, 
             CONCAT(u.First_Name, ' ', u.Second_Name) as Owner, 
-            COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalMB, 
-            MAX(cl.Timestamp) as lastSeen 
+            COALESCE(t.Data_Downloaded + t.Data_Uploaded, 0) as totalBytes, 
+            t.Last_Seen as lastSeen 
         FROM Device d 
         JOIN User u ON d.User_ID = u.User_ID 
-        LEFT JOIN Connection_Log cl ON d.Device_ID = cl.Device_ID 
-        LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID 
-        GROUP BY d.Device_ID, d.Device_Name, d.Device_Type, d.MAC_Address, Owner 
-        ORDER BY totalMB DESC;
+        LEFT JOIN Device_Usage_Total t ON d.Device_ID = t.Device_ID 
+        {since_filter}
+        ORDER BY totalBytes DESC;
         """
-        df = pd.read_sql(query, conn)
-        conn.close()
-        
-        df['Total_Usage_Formatted'] = df['totalMB'].apply(format_data_unit)
-        df['lastSeen'] = df['lastSeen'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S') if pd.notnull(x) else 'Never')
-        
-        df = df.rename(columns={'totalMB': 'Total_Usage_MB'})
-        export_cols = ['Device_ID', 'Device_Name', 'Device_Type', 'MAC_Address', 'Owner', 'Total_Usage_Formatted', 'Total_Usage_MB', 'lastSeen']
-        df = df[export_cols]
-
-        csv_data = df.to_csv(index=False, encoding='utf-8')
-        response = make_response(csv_data)
-        response.headers["Content-Disposition"] = "attachment; filename=devices_export.csv"
-        response.headers["Content-Type"] = "text/csv"
-        return response
+        header = ['Device_ID', 'Device_Name', 'Device_Type', 'MAC_Address', 'Owner', 'Total_Usage_Formatted', 'Total_Usage_MB', 'lastSeen']
+        return csv_export_response("devices_export.csv", query, params, header, format_device_export_rows)
     except Exception as e:
         print(f"Error in /api/devices/export: {e}")
         return jsonify({"error": str(e)}), 500
@@ -180,42 +606,44 @@ def export_devices():
 @app.route('/api/users/export', methods=['GET'])
 @login_required
 def export_users():
+    """?gzip=1 compresses. User rows carry no timestamp, so there is no since= filter."""
     try:
-        conn = get_db_connection()
+        if request.args.get('since'):
+            return jsonify({"error": "since is not supported for users (User rows have no timestamp)"}), 400
         query = "SELECT User_ID, First_Name, Second_Name, Email_ID, Phone_No FROM User"
-        df = pd.read_sql(query, conn)
-        conn.close()
-        csv_data = df.to_csv(index=False, encoding='utf-8')
-        response = make_response(csv_data)
-        response.headers["Content-Disposition"] = "attachment; filename=users_export.csv"
-        response.headers["Content-Type"] = "text/csv"
-        return response
+        header = ['User_ID', 'First_Name', 'Second_Name', 'Email_ID', 'Phone_No']
+        return csv_export_response("users_export.csv", query, (), header, lambda rows: rows)
     except Exception as e:
         print(f"Error in /api/users/export: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/device/update/<string:device_id>', methods=['POST'])
+@app.route('/api/device/update/<int:device_id>', methods=['POST'])
 @login_required
 def update_device(device_id):
     try:
         data = request.json
         new_name = data.get('Device_Name')
-        new_user_id = data.get('User_ID')
+        try:
+            new_user_id = int(data.get('User_ID'))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "User_ID must be a numeric ID"}), 400
         
         conn = get_db_connection()
         cursor = conn.cursor()
         update_query = "UPDATE Device SET Device_Name = %s, User_ID = %s WHERE Device_ID = %s"
         cursor.execute(update_query, (new_name, new_user_id, device_id))
+        bump_watermark(cursor)
         conn.commit()
         cursor.close()
         conn.close()
+        data_changed()
         
         return jsonify({"success": True, "message": "Device updated successfully"})
     except Exception as e:
         print(f"Error updating device: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/device/delete/<string:device_id>', methods=['DELETE'])
+@app.route('/api/device/delete/<int:device_id>', methods=['DELETE'])
 @login_required
 def delete_device(device_id):
     try:
@@ -223,76 +651,163 @@ def delete_device(device_id):
         cursor = conn.cursor()
         delete_query = "DELETE FROM Device WHERE Device_ID = %s"
         cursor.execute(delete_query, (device_id,))
+        bump_watermark(cursor)
         conn.commit()
         cursor.close()
         conn.close()
+        data_changed()
         
         return jsonify({"success": True, "message": "Device deleted successfully"})
     except Exception as e:
         print(f"Error deleting device: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+DEVICE_SORTS = {
+    'usage': "COALESCE(t.Data_Downloaded + t.Data_Uploaded, 0)",
+    'lastSeen': "COALESCE(UNIX_TIMESTAMP(t.Last_Seen), 0)",
+}
+
+def devices_data(conn, args=None):
+    """
+    One page of /api/devices (and the live 'devices' view, which is the
+    default first page). Query string: limit, sort (usage|lastSeen), order,
+    cursor, and the filters type, owner (User_ID), network (Network_ID) and
+    status (online|offline).
+    """
+    args = args or {}
+    page = listing_args(args, DEVICE_SORTS, 'usage')
+    now = datetime.now()
+    conditions, params = [], []
+    if args.get('type'):
+        conditions.append("d.Device_Type = %s")
+        params.append(args['type'])
+    if args.get('owner'):
+        conditions.append("d.User_ID = %s")
+        params.append(id_arg(args, 'owner'))
+    if args.get('network'):
+        conditions.append("EXISTS (SELECT 1 FROM Network_Usage_Total nt WHERE nt.Device_ID = d.Device_ID AND nt.Network_ID = %s)")
+        params.append(args['network'])
+    if args.get('status'):
+        condition, status_params = status_filter(args['status'], 't.Last_Seen', now)
+        conditions.append(condition)
+        params.extend(status_params)
+    after, after_params, order_by = keyset(page, 'd.Device_ID')
+    if after:
+        conditions.append(after)
+        params.extend(after_params)
+
+    query = f"""
+    SELECT 
+        d.Device_ID, 
+        d.Device_Name, 
+        d.Device_Type, 
+        d.MAC_Address, 
+        d.User_ID,
+        COALESCE(t.Data_Downloaded + t.Data_Uploaded, 0) as totalBytes,
+        t.Last_Seen as lastSeen,
+        {page['sortKey']} as sortKey
+    FROM Device d
+    LEFT JOIN Device_Usage_Total t ON d.Device_ID = t.Device_ID
+    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+    {order_by}
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, params)
+    result = finish_page(cursor.fetchall(), page, 'Device_ID')
+    cursor.close()
+    # A device not seen within CONNECTED_WINDOW is Not Connected
+    with timed(metrics, 'shape', 'devices_data'):
+        shape_usage(result['items'], 'totalBytes', now, CONNECTED_WINDOW)
+    # 64-bit IDs don't survive JavaScript numbers; send them as strings
+    for device in result['items']:
+        device['Device_ID'] = str(device['Device_ID'])
+        device['User_ID'] = str(device['User_ID'])
+    return result
+
 @app.route('/api/devices', methods=['GET'])
 @login_required
+@cached_response
 def get_all_devices():
     try:
         conn = get_db_connection()
-        query = """
-        SELECT 
-            d.Device_ID, 
-            d.Device_Name, 
-            d.Device_Type, 
-            d.MAC_Address, 
-            d.User_ID,
-            COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalMB,
-            MAX(cl.Timestamp) as lastSeen
-        FROM Device d
-        LEFT JOIN Connection_Log cl ON d.Device_ID = cl.Device_ID
-        LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
-        GROUP BY d.Device_ID, d.Device_Name, d.Device_Type, d.MAC_Address, d.User_ID
-        ORDER BY totalMB DESC
-        """
-        df = pd.read_sql(query, conn)
+        devices = devices_data(conn, request.args)
         conn.close()
-        
-        # --- NEW STATUS LOGIC ---
-        now = datetime.now()
-        # If lastSeen is older than 90 seconds, mark as Not Connected
-        live_threshold = timedelta(seconds=90) 
-
-        def get_status(last_seen_timestamp):
-            if pd.isnull(last_seen_timestamp):
-                return "Not Connected"
-            # pd.read_sql makes last_seen_timestamp a pandas Timestamp object
-            if (now - last_seen_timestamp) < live_threshold:
-                return "Connected"
-            else:
-                return "Not Connected"
-
-        # Apply the function to create the new 'status' column
-        df['status'] = df['lastSeen'].apply(get_status)
-        # --- END NEW STATUS LOGIC ---
-        
-        df['lastSeen'] = df['lastSeen'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S') if pd.notnull(x) else 'Never')
-        df['totalUsageFormatted'] = df['totalMB'].apply(format_data_unit)
-        
-        return jsonify(df.to_dict('records'))
+        return jsonify(devices)
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in /api/devices: {e}")
         return jsonify({"error": str(e)}), 500
 
+USER_SORTS = {
+    'usage': "COALESCE(SUM(t.Data_Downloaded + t.Data_Uploaded), 0)",
+    'lastSeen': "COALESCE(MAX(UNIX_TIMESTAMP(t.Last_Seen)), 0)",
+}
+
+def users_data(conn, args):
+    """
+    One page of /api/users with each user's device count, usage and last
+    seen. Query string: limit, sort (usage|lastSeen), order, cursor, and the
+    filters type and network (users with such a device), owner (User_ID) and
+    status (online|offline: any device connected).
+    """
+    page = listing_args(args, USER_SORTS, 'usage')
+    now = datetime.now()
+    conditions, params = [], []
+    if args.get('owner'):
+        conditions.append("u.User_ID = %s")
+        params.append(id_arg(args, 'owner'))
+    if args.get('type'):
+        conditions.append("EXISTS (SELECT 1 FROM Device dt WHERE dt.User_ID = u.User_ID AND dt.Device_Type = %s)")
+        params.append(args['type'])
+    if args.get('network'):
+        conditions.append("""EXISTS (SELECT 1 FROM Device dn JOIN Network_Usage_Total nt ON nt.Device_ID = dn.Device_ID
+                                     WHERE dn.User_ID = u.User_ID AND nt.Network_ID = %s)""")
+        params.append(args['network'])
+    having, having_params = [], []
+    if args.get('status'):
+        condition, status_params = status_filter(args['status'], 'MAX(t.Last_Seen)', now)
+        having.append(condition)
+        having_params.extend(status_params)
+    after, after_params, order_by = keyset(page, 'u.User_ID', sort_key='sortKey')
+    if after:
+        having.append(after)
+        having_params.extend(after_params)
+
+    query = f"""
+    SELECT u.User_ID, u.First_Name, u.Second_Name, u.Email_ID, u.Phone_No,
+           COUNT(d.Device_ID) as deviceCount,
+           COALESCE(SUM(t.Data_Downloaded + t.Data_Uploaded), 0) as totalBytes,
+           MAX(t.Last_Seen) as lastSeen,
+           {page['sortKey']} as sortKey
+    FROM User u
+    LEFT JOIN Device d ON d.User_ID = u.User_ID
+    LEFT JOIN Device_Usage_Total t ON t.Device_ID = d.Device_ID
+    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+    GROUP BY u.User_ID, u.First_Name, u.Second_Name, u.Email_ID, u.Phone_No
+    {"HAVING " + " AND ".join(having) if having else ""}
+    {order_by}
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, params + having_params)
+    result = finish_page(cursor.fetchall(), page, 'User_ID')
+    cursor.close()
+    with timed(metrics, 'shape', 'users_data'):
+        shape_usage(result['items'], 'totalBytes', now, CONNECTED_WINDOW)
+    for user in result['items']:
+        user['User_ID'] = str(user['User_ID'])
+    return result
+
 @app.route('/api/users', methods=['GET'])
 @login_required
 def get_all_users():
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT User_ID, First_Name, Second_Name, Email_ID, Phone_No FROM User"
-        cursor.execute(query)
-        users = cursor.fetchall()
-        cursor.close()
+        users = users_data(conn, request.args)
         conn.close()
         return jsonify(users)
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in /api/users: {e}")
         return jsonify({"error": str(e)}), 500
@@ -302,7 +817,7 @@ def get_all_users():
 def add_user():
     try:
         data = request.json
-        user_id = f'U{str(int(datetime.now().timestamp() * 1000))[-8:]}'
+        user_id = next_id()
         
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -326,146 +841,222 @@ def add_user():
         cursor.close()
         conn.close()
         
-        return jsonify({"success": True, "message": "User added successfully", "user_id": user_id})
+        return jsonify({"success": True, "message": "User added successfully", "user_id": str(user_id)})
     except Exception as e:
         print(f"Error adding user: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def dashboard_stats_data(conn):
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute("SELECT COUNT(DISTINCT Device_ID) as count FROM Device")
+    connected_devices = cursor.fetchone()['count']
+    
+    cursor.execute("SELECT COALESCE(SUM(Data_Downloaded + Data_Uploaded), 0) as total FROM Device_Usage_Total")
+    total_usage_mb = to_mb(cursor.fetchone()['total'])
+    
+    top_device_query = """
+    SELECT d.Device_Name, COALESCE(t.Data_Downloaded + t.Data_Uploaded, 0) as totalBytes
+    FROM Device d
+    LEFT JOIN Device_Usage_Total t ON d.Device_ID = t.Device_ID
+    ORDER BY totalBytes DESC
+    LIMIT 1
+    """
+    cursor.execute(top_device_query)
+    top_device = cursor.fetchone()
+    cursor.close()
+    
+    return {
+        "connectedDevices": connected_devices,
+        "totalUsageFormatted": format_data_unit(total_usage_mb),
+        "topDevice": {
+            "name": top_device['Device_Name'] if top_device else 'N/A',
+            "usageFormatted": format_data_unit(to_mb(top_device['totalBytes'])) if top_device else "0 MB"
+        }
+    }
+
 @app.route('/api/dashboard-stats', methods=['GET'])
 @login_required
+@cached_response
 def get_dashboard_stats():
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT COUNT(DISTINCT Device_ID) as count FROM Device")
-        connected_devices = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COALESCE(SUM(Data_Downloaded + Data_Uploaded), 0) as total FROM Data_Usage")
-        total_usage_mb = cursor.fetchone()['total']
-        
-        top_device_query = """
-        SELECT d.Device_Name, COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalMB
-        FROM Device d
-        LEFT JOIN Connection_Log cl ON d.Device_ID = cl.Device_ID
-        LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
-        GROUP BY d.Device_ID, d.Device_Name
-        ORDER BY totalMB DESC
-        LIMIT 1
-        """
-        cursor.execute(top_device_query)
-        top_device = cursor.fetchone()
-        
-        cursor.close()
+        stats = dashboard_stats_data(conn)
         conn.close()
-        
-        return jsonify({
-            "connectedDevices": connected_devices,
-            "totalUsageFormatted": format_data_unit(total_usage_mb),
-            "topDevice": {
-                "name": top_device['Device_Name'] if top_device else 'N/A',
-                "usageFormatted": format_data_unit(top_device['totalMB']) if top_device else "0 MB"
-            }
-        })
+        return jsonify(stats)
     except Exception as e:
         print(f"Error in /api/dashboard-stats: {e}")
         return jsonify({"error": str(e)}), 500
 
+def usage_over_time_data(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COALESCE(SUM(Data_Downloaded + Data_Uploaded), 0) as total FROM Device_Usage_Total")
+    total_usage_bytes = cursor.fetchone()['total']
+    
+    cursor.execute("SELECT MAX(Bucket_Start) as latest FROM Usage_Bucket_Global WHERE Resolution = 3600")
+    latest = cursor.fetchone()['latest']
+    if latest is None:
+        cursor.close()
+        return {"labels": [], "data": []}
+    
+    query = """
+    SELECT Bucket_Start, (Data_Downloaded + Data_Uploaded) as total_usage
+    FROM Usage_Bucket_Global
+    WHERE Resolution = 3600 AND Bucket_Start > %s
+    ORDER BY Bucket_Start
+    """
+    cursor.execute(query, (latest - timedelta(hours=USAGE_CHART_HOURS),))
+    rows = cursor.fetchall()
+    cursor.close()
+    return cumulative_bucket_series(rows, timedelta(hours=1), total_usage_bytes, '%m-%d %H:%M')
+
 @app.route('/api/usage-over-time', methods=['GET'])
 @login_required
+@cached_response
 def get_usage_over_time():
     try:
         conn = get_db_connection()
-        query = """
-        SELECT cl.Timestamp, (du.Data_Downloaded + du.Data_Uploaded) as total_usage
-        FROM Data_Usage du
-        JOIN Connection_Log cl ON du.Log_ID = cl.Log_ID
-        ORDER BY cl.Timestamp
-        """
-        df = pd.read_sql(query, conn)
+        series = usage_over_time_data(conn)
         conn.close()
-        
-        if df.empty:
-            return jsonify({"labels": [], "data": []})
-        
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        usage_resampled = df.set_index('Timestamp').resample('1H')['total_usage'].sum().cumsum()
-        
-        return jsonify({
-            "labels": usage_resampled.index.strftime('%m-%d %H:%M').tolist(),
-            "data": usage_resampled.values.round(2).tolist()
-        })
+        return jsonify(series)
     except Exception as e:
         print(f"Error in /api/usage-over-time: {e}")
         return jsonify({"error": str(e)}), 500
 
+def top_devices_today_data(conn):
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    # A Timestamp range rather than DATE(Timestamp) = today, so idx_connection_log_time is usable
+    query = """
+    SELECT d.Device_Name, COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalBytes
+    FROM Connection_Log cl
+    JOIN Device d ON d.Device_ID = cl.Device_ID
+    LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+    WHERE cl.Timestamp >= %s AND cl.Timestamp < %s
+    GROUP BY d.Device_ID, d.Device_Name
+    ORDER BY totalBytes DESC
+    LIMIT 5
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, (today, today + timedelta(days=1)))
+    results = cursor.fetchall()
+    cursor.close()
+    return {
+        "labels": [r['Device_Name'] for r in results],
+        "data": [round(to_mb(r['totalBytes']), 2) for r in results]
+    }
+
 @app.route('/api/top-devices-today', methods=['GET'])
 @login_required
+@cached_response
 def get_top_devices_today():
     try:
         conn = get_db_connection()
-        today = datetime.now().date()
-        query = """
-        SELECT d.Device_Name, COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalMB
-        FROM Device d
-        LEFT JOIN Connection_Log cl ON d.Device_ID = cl.Device_ID
-        LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
-        WHERE DATE(cl.Timestamp) = %s
-        GROUP BY d.Device_ID, d.Device_Name
-        ORDER BY totalMB DESC
-        LIMIT 5
-        """
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, (today,))
-        results = cursor.fetchall()
-        cursor.close()
+        top_devices = top_devices_today_data(conn)
         conn.close()
-        
-        return jsonify({
-            "labels": [r['Device_Name'] for r in results],
-            "data": [round(r['totalMB'], 2) for r in results]
-        })
+        return jsonify(top_devices)
     except Exception as e:
         print(f"Error in /api/top-devices-today: {e}")
         return jsonify({"error": str(e)}), 500
 
+def network_overview_data(conn):
+    query = """
+    SELECT 
+        n.Network_ID,
+        n.SSID,
+        COALESCE(SUM(t.Data_Downloaded + t.Data_Uploaded), 0) as totalBytes,
+        COUNT(t.Device_ID) as deviceCount
+    FROM Network n
+    LEFT JOIN Network_Usage_Total t ON n.Network_ID = t.Network_ID
+    GROUP BY n.Network_ID, n.SSID
+    ORDER BY totalBytes DESC
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query)
+    results = cursor.fetchall()
+    cursor.close()
+    shape_usage(results, 'totalBytes')
+    return {
+        "tableData": [{
+            "networkId": r['Network_ID'],
+            "ssid": r['SSID'], 
+            "totalUsageFormatted": r['totalUsageFormatted'],
+            "totalMB": r['totalMB'],
+            "deviceCount": r['deviceCount']
+        } for r in results],
+        "chartData": {
+            "labels": [r['SSID'] for r in results],
+            "data": [round(r['totalMB'], 2) for r in results]
+        }
+    }
+
 @app.route('/api/network-overview', methods=['GET'])
 @login_required
+@cached_response
 def get_network_overview():
     try:
         conn = get_db_connection()
-        query = """
-        SELECT 
-            n.SSID,
-            COALESCE(SUM(du.Data_Downloaded + du.Data_Uploaded), 0) as totalMB,
-            COUNT(DISTINCT cl.Device_ID) as deviceCount
-        FROM Network n
-        LEFT JOIN Connection_Log cl ON n.Network_ID = cl.Network_ID
-        LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
-        GROUP BY n.Network_ID, n.SSID
-        ORDER BY totalMB DESC
-        """
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query)
-        results = cursor.fetchall()
-        cursor.close()
+        overview = network_overview_data(conn)
         conn.close()
-        
-        return jsonify({
-            "tableData": [{
-                "ssid": r['SSID'], 
-                "totalUsageFormatted": format_data_unit(r['totalMB']),
-                "totalMB": float(r['totalMB']),
-                "deviceCount": r['deviceCount']
-            } for r in results],
-            "chartData": {
-                "labels": [r['SSID'] for r in results],
-                "data": [round(float(r['totalMB']), 2) for r in results]
-            }
-        })
+        return jsonify(overview)
     except Exception as e:
         print(f"Error in /api/network-overview: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- LIVE UPDATES (Server-Sent Events) ---
+live_hub = LiveHub(
+    db_pool.get,
+    {
+        'dashboard-stats': dashboard_stats_data,
+        'usage-over-time': usage_over_time_data,
+        'top-devices-today': top_devices_today_data,
+        'network-overview': network_overview_data,
+        'devices': devices_data,
+    },
+    ingest_watermark,
+    delta_keys={'devices': 'Device_ID'},
+    dumps=lambda payload: app.json.dumps(payload),
+)
+
+@app.route('/api/live', methods=['GET'])
+@login_required
+def live_updates():
+    response = Response(live_hub.stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a reverse proxy buffer the stream
+    return response
+
+@app.route('/api/live-stats', methods=['GET'])
+@login_required
+def get_live_stats():
+    return jsonify(live_hub.stats())
+
+@app.route('/api/response-cache-stats', methods=['GET'])
+@login_required
+def get_response_cache_stats():
+    stats = response_cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    # A lookup that found an entry from an older watermark was really a miss
+    served = stats['hits'] - stats['stale']
+    stats['hitRate'] = round(served / lookups, 4) if lookups else 0.0
+    return jsonify({**stats, "watermark": _watermark['version']})
+
+@app.route('/api/db-pool-stats', methods=['GET'])
+@login_required
+def get_db_pool_stats():
+    return jsonify(db_pool.stats())
+
+@app.route('/api/user-cache-stats', methods=['GET'])
+@login_required
+def get_user_cache_stats():
+    return jsonify(user_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    token = request.headers.get('Authorization', '')
+    token_ok = bool(METRICS_TOKEN) and hmac.compare_digest(token, f"Bearer {METRICS_TOKEN}")
+    if not token_ok and not current_user.is_authenticated:
+        return login_manager.unauthorized()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: upload/download classification per packet, comparing the old
+string-prefix check (MY_SUBNET = first three octets) with SubnetClassifier.
+
+Usage:
+    python bench_classifier.py [--packets 1000000] [--networks 4]
+"""
+import argparse
+import random
+import socket
+import struct
+import time
+
+from subnet_classifier import SubnetClassifier
+
+_IP_ADDRESSES = struct.Struct('!II')
+
+
+def string_path(headers, prefix):
+    """The old way: dotted strings and str.startswith (addresses converted as the capture would)."""
+    inet_ntoa = socket.inet_ntoa
+    uploads = downloads = 0
+    for header in headers:
+        src_ip = inet_ntoa(header[0:4])
+        dst_ip = inet_ntoa(header[4:8])
+        if src_ip.startswith(prefix) and not dst_ip.startswith(prefix):
+            uploads += 1
+        elif not src_ip.startswith(prefix) and dst_ip.startswith(prefix):
+            downloads += 1
+    return uploads, downloads
+
+
+def integer_path(headers, classifier):
+    """The new way: packed 32-bit addresses and masked dict lookups."""
+    unpack = _IP_ADDRESSES.unpack
+    lookup = classifier.lookup
+    uploads = downloads = 0
+    for header in headers:
+        src_ip, dst_ip = unpack(header)
+        src_network = lookup(src_ip)
+        dst_network = lookup(dst_ip)
+        if src_network is not None and src_network != dst_network:
+            uploads += 1
+        if dst_network is not None and dst_network != src_network:
+            downloads += 1
+    return uploads, downloads
+
+
+def make_headers(count, local_networks, seed=1):
+    """8-byte src+dst address pairs: half upload, half download, against random remotes."""
+    rng = random.Random(seed)
+    headers = []
+    for _ in range(count):
+        base, size = rng.choice(local_networks)
+        local = struct.pack('!I', base + rng.randrange(1, size - 1))
+        remote = struct.pack('!I', rng.randrange(1 << 24, 224 << 24))
+        headers.append(local + remote if rng.random() < 0.5 else remote + local)
+    return headers
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare string-prefix and integer CIDR packet classification.")
+    parser.add_argument("--packets", type=int, default=1000000)
+    parser.add_argument("--networks", type=int, default=4, help="subnets for the multi-network run")
+    args = parser.parse_args()
+
+    single = [("192.168.43.0/24", "N001")]
+    headers = make_headers(args.packets, [(0xC0A82B00, 256)])
+    string_time, string_result = timed(string_path, headers, "192.168.43.")
+    int_time, int_result = timed(integer_path, headers, SubnetClassifier(single))
+    assert string_result == int_result, (string_result, int_result)
+
+    multi = [(f"10.{i}.0.0/{20 + i % 9}", f"N{i:03d}") for i in range(args.networks)]
+    multi_classifier = SubnetClassifier(multi)
+    multi_headers = make_headers(args.packets, [(int(n.network_address), n.num_addresses)
+                                                for n, _ in multi_classifier.networks])
+    multi_time, _ = timed(integer_path, multi_headers, multi_classifier)
+
+    per_packet = lambda seconds: seconds / args.packets * 1e9
+    print(f"--- Classifying {args.packets} packets ---")
+    print(f"String prefix, one /24:          {per_packet(string_time):7.1f} ns/packet")
+    print(f"Integer CIDR, one /24:           {per_packet(int_time):7.1f} ns/packet "
+          f"({string_time / int_time:.2f}x)")
+    print(f"Integer CIDR, {args.networks} mixed prefixes:  {per_packet(multi_time):7.1f} ns/packet "
+          f"(the string path can't express this)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Endpoint latency benchmark: seeds a dataset of --devices x --networks x --days
+of 30-second samples into a local database, then drives every read endpoint
+of app.py through the Flask test client:
+
+  sequential  --requests calls per endpoint, one at a time: p50/p95/p99 and
+              the database work per call (rows fetched; rows examined on
+              MySQL, from the Handler_read_* counters; VM steps on SQLite)
+  concurrent  the same calls from --concurrency threads at once
+
+The response cache is bypassed (unless --cached), so every call reaches the
+database. Results are written as JSON (--json); --baseline compares a run
+with an earlier result file and exits 1 if an endpoint got slower than
+--tolerance allows or does more database work, or the concurrent
+throughput dropped. The seeded samples end when they were seeded, so
+"today" and the online devices drift as the dataset ages; --seed renews it.
+
+By default the dataset is a SQLite file (bench_<devices>d_<networks>n_<days>x.db),
+seeded on first use and reused afterwards. With DB_BACKEND=mysql the
+configured MySQL database is used and only seeded when --seed is given.
+
+Usage:
+    python bench_endpoints.py --devices 200 --networks 8 --days 7 --json baseline.json
+    python bench_endpoints.py --devices 200 --networks 8 --days 7 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+SAMPLE_INTERVAL = 30   # Seconds between a device's samples, as hotspot_monitor.FLUSH_INTERVAL
+SEED_BATCH = 5000      # Samples per seeding transaction
+MIN_REGRESSION_MS = 1.0  # Latency differences below this are noise, whatever the ratio
+VM_STEP_GRANULARITY = 100  # SQLite progress handler period, in VM instructions
+
+# Endpoint paths; {device}, {user}, {network} and {type} are filled from the dataset,
+# {cursor} with the nextCursor of the first 20-device page.
+# The templates are the keys in the results, so runs on different datasets compare.
+ENDPOINTS = [
+    "/api/dashboard-stats",
+    "/api/usage-over-time",
+    "/api/top-devices-today",
+    "/api/network-overview",
+    "/api/devices",
+    "/api/devices?sort=lastSeen&order=asc",
+    "/api/devices?status=online",
+    "/api/devices?type={type}",
+    "/api/devices?owner={user}",
+    "/api/devices?network={network}",
+    "/api/devices?limit=20&cursor={cursor}",
+    "/api/users",
+    "/api/users?sort=lastSeen&status=offline",
+    "/api/users?network={network}",
+    "/api/device/{device}",
+    "/api/device/{device}/logs?sort=usage",
+    "/api/device/{device}/logs?network={network}",
+    "/api/devices/export",
+    "/api/users/export",
+]
+
+_work = threading.local()
+
+
+# --- DATABASE WORK COUNTERS ---
+
+class CountingCursor:
+    """Counts the rows a request fetches."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _count(self, rows):
+        _work.rows = getattr(_work, 'rows', 0) + len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count([row])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count([row])
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Pool connection wrapper: remembers which connections a request used, for the MySQL handler counters."""
+
+    def __init__(self, raw, backend):
+        self._raw = raw
+        self.backend = backend
+        if backend == 'sqlite':
+            raw.set_progress_handler(self._vm_step, VM_STEP_GRANULARITY)
+
+    @staticmethod
+    def _vm_step():
+        _work.vm_steps = getattr(_work, 'vm_steps', 0) + VM_STEP_GRANULARITY
+        return 0
+
+    def handler_reads(self):
+        """Sum of this session's Handler_read_* counters (rows MySQL examined)."""
+        cursor = self._raw.cursor()
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+        total = sum(int(value) for _, value in cursor.fetchall())
+        cursor.close()
+        return total
+
+    def cursor(self, *args, **kwargs):
+        used = getattr(_work, 'connections', None)
+        if used is not None and self.backend == 'mysql' and self not in used:
+            used[self] = self.handler_reads()
+        return CountingCursor(self._raw.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def start_counting():
+    _work.rows = 0
+    _work.vm_steps = 0
+    _work.connections = {}
+
+
+def stop_counting(backend, snapshot_cost):
+    """(rows fetched, rows examined or None, VM steps or None) since start_counting()."""
+    used, _work.connections = _work.connections, None
+    examined = None
+    if backend == 'mysql':
+        examined = sum(max(0, conn.handler_reads() - before - snapshot_cost) for conn, before in used.items())
+    vm_steps = _work.vm_steps if backend == 'sqlite' else None
+    return _work.rows, examined, vm_steps
+
+
+# --- DATASET ---
+
+def seed_dataset(conn, devices, networks, days, end):
+    """Writes days of 30-second samples for every device, ending at `end`. Returns the rows written."""
+    from simulator import ensure_fleet, sample_bytes, write_batch
+
+    fleet, _ = ensure_fleet(conn, devices, networks)
+    rng = random.Random(1)
+    steps = int(days * 86400 / SAMPLE_INTERVAL)
+    start = end - timedelta(seconds=steps * SAMPLE_INTERVAL)
+    # Devices report at different offsets within each interval, as real ones do
+    offsets = [rng.randrange(SAMPLE_INTERVAL) for _ in fleet]
+    total = steps * len(fleet)
+    written = 0
+    batch = []
+    started = time.monotonic()
+    print(f"Seeding {total} samples ({len(fleet)} devices x {steps} intervals)...")
+    for step in range(steps):
+        base = start + timedelta(seconds=step * SAMPLE_INTERVAL)
+        for (device_id, network_id), offset in zip(fleet, offsets):
+            data_down, data_up = sample_bytes(rng)
+            ip = f"10.{(device_id >> 16) & 0xff}.{(device_id >> 8) & 0xff}.{device_id & 0xff}"
+            batch.append((device_id, network_id, base + timedelta(seconds=offset), ip, data_down, data_up))
+        if len(batch) >= SEED_BATCH or step == steps - 1:
+            write_batch(conn, batch)
+            written += len(batch)
+            batch = []
+            if written * 10 // total != (written - SEED_BATCH) * 10 // total:
+                print(f"  {written}/{total} rows ({written / (time.monotonic() - started):.0f} rows/s)")
+    return written
+
+
+def dataset_values(conn):
+    """IDs to put in the endpoint paths: the busiest device, its owner and network, and its type."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT d.Device_ID, d.User_ID, d.Device_Type, t.Network_ID
+        FROM Network_Usage_Total t
+        JOIN Device d ON d.Device_ID = t.Device_ID
+        ORDER BY t.Data_Downloaded + t.Data_Uploaded DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    cursor.execute("SELECT COUNT(*) FROM Connection_Log")
+    log_rows = cursor.fetchone()[0]
+    cursor.close()
+    if not row:
+        raise SystemExit("The database has no usage to benchmark against; seed it with --seed.")
+    device, user, device_type, network = row
+    return {"device": device, "user": user, "type": device_type, "network": network}, log_rows
+
+
+# --- MEASUREMENT ---
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(seconds):
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 3),
+        "p95": round(percentile(seconds, 95) * 1000, 3),
+        "p99": round(percentile(seconds, 99) * 1000, 3),
+        "mean": round(sum(seconds) / len(seconds) * 1000, 3) if seconds else 0.0,
+    }
+
+
+def timed_get(client, path):
+    began = time.perf_counter()
+    response = client.get(path)
+    response.get_data()  # drain streamed responses (the exports)
+    elapsed = time.perf_counter() - began
+    response.close()
+    return response.status_code, elapsed
+
+
+def run_sequential(app, paths, requests, backend, snapshot_cost):
+    client = app.test_client()
+    results = {}
+    for template, path in paths.items():
+        timed_get(client, path)  # warm-up: pool connections, statement caches
+        latencies = []
+        work = []
+        status = 200
+        for _ in range(requests):
+            start_counting()
+            code, elapsed = timed_get(client, path)
+            work.append(stop_counting(backend, snapshot_cost))
+            latencies.append(elapsed)
+            if code != 200:
+                status = code
+        rows, examined, vm_steps = work[-1]
+        results[template] = {**latency_summary(latencies), "requests": requests, "status": status,
+                             "rowsFetched": rows, "rowsExamined": examined, "vmSteps": vm_steps}
+        print(f"  {template:45} p50 {results[template]['p50']:9.3f} ms  p95 {results[template]['p95']:9.3f} ms  "
+              f"p99 {results[template]['p99']:9.3f} ms  rows {rows}"
+              + (f", examined {examined}" if examined is not None else "")
+              + (f", vm steps {vm_steps}" if vm_steps is not None else "")
+              + ("" if status == 200 else f"  HTTP {status}"))
+    return results
+
+
+def run_concurrent(app, paths, requests, concurrency):
+    clients = threading.local()
+    calls = [template for _ in range(requests) for template in paths]
+
+    def call(template):
+        client = getattr(clients, 'client', None)
+        if client is None:
+            client = clients.client = app.test_client()
+        return template, timed_get(client, paths[template])
+
+    latencies = {template: [] for template in paths}
+    errors = 0
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for template, (code, elapsed) in pool.map(call, calls):
+            latencies[template].append(elapsed)
+            errors += code != 200
+    wall = time.perf_counter() - began
+    print(f"  {len(calls)} requests from {concurrency} threads in {wall:.2f}s "
+          f"({len(calls) / wall:.1f} req/s, {errors} errors)")
+    return {
+        "concurrency": concurrency,
+        "requests": len(calls),
+        "requestsPerSecond": round(len(calls) / wall, 1),
+        "errors": errors,
+        "endpoints": {template: latency_summary(values) for template, values in latencies.items()},
+    }
+
+
+# --- BASELINE COMPARISON ---
+
+def compare(current, baseline, tolerance):
+    """Lists the regressions of current against baseline: slower latencies or more database work."""
+    regressions = []
+
+    def check(label, new, old, unit, slack=0.0):
+        if new is None or old is None:
+            return
+        if new > old * (1 + tolerance) and new - old > slack:
+            regressions.append(f"{label}: {old} -> {new} {unit}")
+
+    for template, new in current["sequential"].items():
+        old = baseline.get("sequential", {}).get(template)
+        if not old:
+            continue
+        for pct in ("p50", "p95", "p99"):
+            check(f"{template} sequential {pct}", new[pct], old[pct], "ms", MIN_REGRESSION_MS)
+        for field in ("rowsFetched", "rowsExamined", "vmSteps"):
+            check(f"{template} {field}", new.get(field), old.get(field), "")
+    # Per-endpoint latencies under concurrency mostly measure who held the GIL; compare the throughput
+    old_rate = baseline.get("concurrent", {}).get("requestsPerSecond")
+    new_rate = current["concurrent"]["requestsPerSecond"]
+    if old_rate and new_rate < old_rate / (1 + tolerance):
+        regressions.append(f"concurrent throughput: {old_rate} -> {new_rate} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py's read endpoints against a seeded dataset.")
+    parser.add_argument("--devices", type=int, default=100, help="devices in the dataset (default 100)")
+    parser.add_argument("--networks", type=int, default=4, help="networks in the dataset (default 4)")
+    parser.add_argument("--days", type=float, default=3, help="days of 30-second samples per device (default 3)")
+    parser.add_argument("--db", help="SQLite file (default bench_<devices>d_<networks>n_<days>x.db)")
+    parser.add_argument("--seed", action="store_true", help="(re)seed the dataset first; needed for MySQL")
+    parser.add_argument("--requests", type=int, default=30, help="calls per endpoint and phase (default 30)")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads in the concurrent phase (default 8)")
+    parser.add_argument("--cached", action="store_true", help="go through the response cache instead of bypassing it")
+    parser.add_argument("--json", help="write the results to this file (use it as a later --baseline)")
+    parser.add_argument("--baseline", help="compare with this earlier results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    # storage reads its configuration at import time
+    os.environ.setdefault('DB_BACKEND', 'sqlite')
+    backend = os.environ['DB_BACKEND'].lower()
+    seed = args.seed
+    if backend == 'sqlite':
+        path = args.db or f"bench_{args.devices}d_{args.networks}n_{args.days:g}x.db"
+        os.environ['SQLITE_PATH'] = path
+        if seed:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        seed = seed or not os.path.exists(path)
+
+    import storage
+    import app as webapp
+
+    conn = storage.connect()
+    try:
+        if seed:
+            began = time.monotonic()
+            rows = seed_dataset(conn, args.devices, args.networks, args.days, datetime.now())
+            print(f"Seeded {rows} rows in {time.monotonic() - began:.1f}s")
+        values, log_rows = dataset_values(conn)
+    finally:
+        conn.close()
+
+    webapp.app.config['LOGIN_DISABLED'] = True
+    if not args.cached:
+        webapp.current_watermark = lambda: None  # cached_response() then calls the view every time
+    connect = webapp.db_pool.connect
+    webapp.db_pool.connect = lambda: CountingConnection(connect(), storage.BACKEND)
+    snapshot_cost = 0
+    if storage.BACKEND == 'mysql':
+        probe = CountingConnection(storage.connect(), 'mysql')
+        before = probe.handler_reads()
+        snapshot_cost = probe.handler_reads() - before  # what reading the counters itself adds
+        probe.close()
+
+    first_page = webapp.app.test_client().get("/api/devices?limit=20").get_json()
+    values['cursor'] = quote(first_page.get('nextCursor') or '')
+    paths = {template: template.format(**values) for template in ENDPOINTS}
+    print(f"--- {log_rows} log rows ({storage.BACKEND}), {args.requests} calls per endpoint ---")
+    print("Sequential:")
+    sequential = run_sequential(webapp.app, paths, args.requests, storage.BACKEND, snapshot_cost)
+    print("Concurrent:")
+    concurrent = run_concurrent(webapp.app, paths, args.requests, args.concurrency)
+
+    results = {
+        "dataset": {"backend": storage.BACKEND, "devices": args.devices, "networks": args.networks,
+                    "days": args.days, "logRows": log_rows},
+        "responseCache": args.cached,
+        "sequential": sequential,
+        "concurrent": concurrent,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("dataset", {}).get("logRows") != log_rows:
+            print(f"Note: the baseline was taken on {baseline.get('dataset', {}).get('logRows')} log rows, this run on {log_rows}")
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"--- {len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}) ---")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
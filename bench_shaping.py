@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: shaping a page of query rows into an API response, comparing
+the old row-by-row pandas path (DataFrame, apply() per column, to_dict(),
+json) with the column-wise helpers in shaping.py plus orjson (when installed).
+
+Both paths shape the same synthetic rows and must produce the same JSON
+(the users rows carry Decimal sums, as MySQL returns them).
+
+Needs pandas, which the app itself no longer uses: pip install -r requirements-bench.txt
+
+Usage:
+    python bench_shaping.py [--rows 50 500 5000] [--repeat 200] [--json results.json]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pandas as pd
+
+from aggregates import BYTES_PER_MB
+from shaping import TIMESTAMP_FORMAT, format_data_unit, to_mb, mb_column, unit_column, timestamp_column, shape_usage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CONNECTED_WINDOW = timedelta(seconds=90)
+
+
+def make_device_rows(count, now, seed=1):
+    """Rows as the /api/devices query returns them: a third never seen, a third online."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        seen = rng.random()
+        rows.append({
+            'Device_ID': 10 ** 17 + i,
+            'Device_Name': f"device-{i}",
+            'Device_Type': rng.choice(["Smartphone", "Laptop", "Tablet"]),
+            'MAC_Address': f"02:51:4d:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}",
+            'User_ID': 10 ** 17 + i % 50,
+            'totalBytes': int(rng.lognormvariate(20, 3)) if seen > 0.33 else 0,
+            'lastSeen': None if seen <= 0.33 else now - timedelta(seconds=rng.randrange(30 if seen > 0.66 else 600, 86400)),
+        })
+    return rows
+
+
+def make_log_rows(count, now, seed=2):
+    rng = random.Random(seed)
+    return [{
+        'Timestamp': now - timedelta(seconds=30 * i),
+        'IP_Address': "192.168.1.20",
+        'SSID': "GH_1",
+        'Data_Downloaded': int(rng.lognormvariate(14, 2)),
+        'Data_Uploaded': int(rng.lognormvariate(12, 2)),
+    } for i in range(count)]
+
+
+def make_user_rows(count, now, seed=3):
+    """Rows as the /api/users query returns them on MySQL, where SUM() over BIGINT is a Decimal."""
+    rng = random.Random(seed)
+    return [{
+        'User_ID': 10 ** 17 + i,
+        'First_Name': f"user-{i}",
+        'deviceCount': rng.randrange(4),
+        'totalBytes': Decimal(int(rng.lognormvariate(20, 3))) if i % 4 else Decimal(0),
+        'lastSeen': None if i % 4 == 0 else now - timedelta(seconds=rng.randrange(30, 86400)),
+    } for i in range(count)]
+
+
+def stdlib_dumps(payload):
+    # Flask's default: sorted keys, compact separators
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def fast_dumps(payload):
+    if orjson is None:
+        return stdlib_dumps(payload)
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS).decode()
+
+
+# --- OLD PATHS (as app.py had them) ---
+
+def devices_pandas(rows, now):
+    df = pd.DataFrame.from_records(rows, columns=list(rows[0]))
+
+    def get_status(last_seen_timestamp):
+        if pd.isnull(last_seen_timestamp):
+            return "Not Connected"
+        if (now - last_seen_timestamp) < CONNECTED_WINDOW:
+            return "Connected"
+        return "Not Connected"
+
+    df['status'] = df['lastSeen'].apply(get_status)
+    df['lastSeen'] = df['lastSeen'].apply(lambda x: x.strftime(TIMESTAMP_FORMAT) if pd.notnull(x) else 'Never')
+    df['totalMB'] = df.pop('totalBytes') / BYTES_PER_MB
+    df['totalUsageFormatted'] = df['totalMB'].apply(format_data_unit)
+    items = df.to_dict('records')
+    for device in items:
+        device['Device_ID'] = str(device['Device_ID'])
+        device['User_ID'] = str(device['User_ID'])
+    return stdlib_dumps({"items": items, "nextCursor": None})
+
+
+def logs_rowwise(rows, now):
+    items = [{
+        'Timestamp': log['Timestamp'].strftime(TIMESTAMP_FORMAT),
+        'IP_Address': log['IP_Address'],
+        'Network_SSID': log['SSID'],
+        'Data_Downloaded_Formatted': format_data_unit(to_mb(log['Data_Downloaded'])),
+        'Data_Uploaded_Formatted': format_data_unit(to_mb(log['Data_Uploaded']))
+    } for log in rows]
+    return stdlib_dumps({"items": items, "nextCursor": None})
+
+
+def users_rowwise(rows, now):
+    for user in rows:
+        user['User_ID'] = str(user['User_ID'])
+        user['totalMB'] = to_mb(user.pop('totalBytes'))
+        user['totalUsageFormatted'] = format_data_unit(user['totalMB'])
+        user['status'] = "Connected" if user['lastSeen'] and now - user['lastSeen'] < CONNECTED_WINDOW else "Not Connected"
+        user['lastSeen'] = user['lastSeen'].strftime(TIMESTAMP_FORMAT) if user['lastSeen'] else 'Never'
+    return stdlib_dumps({"items": rows, "nextCursor": None})
+
+
+# --- NEW PATHS ---
+
+def devices_columns(rows, now):
+    items = shape_usage(rows, 'totalBytes', now, CONNECTED_WINDOW)
+    for device in items:
+        device['Device_ID'] = str(device['Device_ID'])
+        device['User_ID'] = str(device['User_ID'])
+    return fast_dumps({"items": items, "nextCursor": None})
+
+
+def logs_columns(rows, now):
+    items = [{
+        'Timestamp': timestamp,
+        'IP_Address': log['IP_Address'],
+        'Network_SSID': log['SSID'],
+        'Data_Downloaded_Formatted': down,
+        'Data_Uploaded_Formatted': up
+    } for log, timestamp, down, up in zip(
+        rows,
+        timestamp_column([log['Timestamp'] for log in rows]),
+        unit_column(mb_column([log['Data_Downloaded'] for log in rows])),
+        unit_column(mb_column([log['Data_Uploaded'] for log in rows])),
+    )]
+    return fast_dumps({"items": items, "nextCursor": None})
+
+
+def users_columns(rows, now):
+    items = shape_usage(rows, 'totalBytes', now, CONNECTED_WINDOW)
+    for user in items:
+        user['User_ID'] = str(user['User_ID'])
+    return fast_dumps({"items": items, "nextCursor": None})
+
+
+def time_path(fn, make_rows, count, now, repeat):
+    """Median seconds per response; rows are rebuilt each time since shaping changes them in place."""
+    samples = []
+    for _ in range(repeat):
+        rows = make_rows(count, now)
+        started = time.perf_counter()
+        fn(rows, now)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-wise pandas and column-wise result shaping.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[50, 500, 5000], help="rows per response")
+    parser.add_argument("--repeat", type=int, default=200, help="responses timed per case (median reported)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    now = datetime.now().replace(microsecond=0)
+    cases = [
+        ("devices", make_device_rows, devices_pandas, devices_columns),
+        ("device logs", make_log_rows, logs_rowwise, logs_columns),
+        ("users", make_user_rows, users_rowwise, users_columns),
+    ]
+    print(f"--- Shaping one response (median of {args.repeat}; JSON by {'orjson' if orjson else 'json'}) ---")
+    results = []
+    for name, make_rows, old, new in cases:
+        for count in args.rows:
+            old_json = json.loads(old(make_rows(count, now), now))
+            new_json = json.loads(new(make_rows(count, now), now))
+            assert old_json == new_json, f"{name}: the two paths disagree"
+            old_time = time_path(old, make_rows, count, now, args.repeat)
+            new_time = time_path(new, make_rows, count, now, args.repeat)
+            results.append({"case": name, "rows": count, "oldUs": round(old_time * 1e6, 1),
+                            "newUs": round(new_time * 1e6, 1), "speedup": round(old_time / new_time, 2)})
+            print(f"{name:12} {count:6} rows: {old_time * 1e6:10.1f} us -> {new_time * 1e6:9.1f} us "
+                  f"({old_time / new_time:.1f}x)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"json": "orjson" if orjson else "json", "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
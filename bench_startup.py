@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Start-up benchmark: how long each entry point takes to import and how much
+memory the process holds afterwards, each measured in a fresh interpreter
+(--runs times, median time and largest RSS reported):
+
+  python                        the bare interpreter, for reference
+  app                           import app (what a web worker does on start)
+  hotspot_monitor               import hotspot_monitor (AF_PACKET capture needs no more)
+  hotspot_monitor + scapy       ... plus load_scapy(), for the Scapy backend
+  find_interface                a whole run of find_interface.py
+
+--json writes the results; --baseline compares with an earlier file and
+exits 1 if an entry point got slower or bigger than --tolerance allows.
+Uses the resource module, so Unix only. The children inherit the
+environment: DB_BACKEND=sqlite measures app without the MySQL driver.
+
+Usage:
+    python bench_startup.py --json startup.json
+    python bench_startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+MIN_REGRESSION_MS = 20.0  # Import time differences below this are noise, whatever the ratio
+MIN_REGRESSION_MB = 2.0
+
+ENTRY_POINTS = {
+    "python": "pass",
+    "app": "import app",
+    "hotspot_monitor": "import hotspot_monitor",
+    "hotspot_monitor + scapy": "import hotspot_monitor; hotspot_monitor.load_scapy()",
+    "find_interface": ("import contextlib, io, runpy\n"
+                       "with contextlib.redirect_stdout(io.StringIO()):\n"
+                       "    runpy.run_path('find_interface.py')"),
+}
+
+# Runs one entry point and prints "<seconds> <max RSS in KB>" as its last line
+CHILD = """
+import resource, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(code, cwd):
+    """(import seconds, whole process seconds, max RSS in MB) of one fresh interpreter."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD.format(code=code)], cwd=cwd,
+                            capture_output=True, text=True)
+    process_seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    seconds, rss_kb = result.stdout.strip().splitlines()[-1].split()
+    return float(seconds), process_seconds, int(rss_kb) / 1024
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def compare(current, baseline, tolerance):
+    """Lists entry points that got slower or bigger than the baseline."""
+    regressions = []
+    for name, new in current["entryPoints"].items():
+        old = baseline.get("entryPoints", {}).get(name)
+        if not old or "error" in new or "error" in old:
+            continue
+        for field, unit, slack in (("importMs", "ms", MIN_REGRESSION_MS), ("rssMB", "MB", MIN_REGRESSION_MB)):
+            if new[field] > old[field] * (1 + tolerance) and new[field] - old[field] > slack:
+                regressions.append(f"{name} {field}: {old[field]} -> {new[field]} {unit}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and memory of each entry point.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point (default 5)")
+    parser.add_argument("--json", help="write the results to this file (use it as a later --baseline)")
+    parser.add_argument("--baseline", help="compare with this earlier results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed growth against the baseline, as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"--- Start-up, median of {args.runs} runs (DB_BACKEND={os.environ.get('DB_BACKEND', 'mysql')}) ---")
+    entry_points = {}
+    for name, code in ENTRY_POINTS.items():
+        try:
+            runs = [measure(code, here) for _ in range(args.runs)]
+        except RuntimeError as e:
+            entry_points[name] = {"error": str(e)}
+            print(f"  {name:25} failed: {e}")
+            continue
+        entry_points[name] = {
+            "importMs": round(median([r[0] for r in runs]) * 1000, 1),
+            "processMs": round(median([r[1] for r in runs]) * 1000, 1),
+            "rssMB": round(max(r[2] for r in runs), 1),
+        }
+        result = entry_points[name]
+        print(f"  {name:25} import {result['importMs']:7.1f} ms   process {result['processMs']:7.1f} ms   "
+              f"RSS {result['rssMB']:6.1f} MB")
+
+    results = {"python": sys.version.split()[0], "dbBackend": os.environ.get('DB_BACKEND', 'mysql'),
+               "entryPoints": entry_points}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"--- {len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}) ---")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
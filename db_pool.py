@@ -0,0 +1,203 @@
+"""
+Bounded database connection pool used by app.py.
+
+Connections are handed out as PooledConnection wrappers: calling close() on
+one returns it to the pool instead of closing the TCP connection, so existing
+`conn = get_db_connection() ... conn.close()` code keeps working unchanged.
+Connections that sat idle for a while are pinged before reuse, and ones idle
+longer than max_idle are closed and replaced.
+"""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class PooledConnection:
+    """A checked-out connection. close() hands it back to the pool (only once)."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise AttributeError(f"'{name}': connection was already returned to the pool")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw)
+
+    def discard(self):
+        """Closes the connection instead of returning it, e.g. when a streamed result was abandoned half-read."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, reuse=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool. get() blocks for up to `timeout` seconds when all
+    `size` connections are in use, then raises PoolTimeout.
+    """
+
+    def __init__(self, connect, size=8, timeout=10, max_idle=300, health_check_after=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = []  # (raw connection, last returned at), most recent last
+        self._open = 0
+        self._in_use = 0
+        self._waiters = 0
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._failed_checks = 0
+        self._discarded = 0
+
+    def get(self):
+        """Checks out a healthy connection, opening a new one if the pool has room."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            stale = self._reap_idle(started)
+            while True:
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    raw, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s ({self.size} in use)")
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        for conn in stale:
+            self._discard(conn)
+
+        try:
+            raw = self._prepare(raw, last_used)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw)
+
+    def _prepare(self, raw, last_used):
+        """Recycles or pings a reused connection, or opens a new one."""
+        if raw is not None:
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle:
+                self._discard(raw)
+                raw = None
+                with self._cond:
+                    self._recycled += 1
+            elif idle_for > self.health_check_after:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    self._discard(raw)
+                    raw = None
+                    with self._cond:
+                        self._failed_checks += 1
+        if raw is None:
+            raw = self.connect()
+            with self._cond:
+                self._created += 1
+        return raw
+
+    def _release(self, raw, reuse=True):
+        # End whatever the borrower left open so the next user gets a fresh
+        # snapshot; a connection that can't even roll back is thrown away.
+        healthy = reuse
+        try:
+            if reuse and raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._open -= 1
+                if reuse:
+                    self._failed_checks += 1
+                else:
+                    self._discarded += 1
+            self._cond.notify()
+
+        if not healthy:
+            self._discard(raw)
+
+    def _reap_idle(self, now):
+        """Drops idle connections past max_idle. Caller holds the lock and closes them."""
+        stale = []
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            stale.append(self._idle.pop(0)[0])
+            self._open -= 1
+            self._recycled += 1
+        return stale
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Snapshot of pool usage, for sizing the pool per worker process."""
+        with self._cond:
+            return {
+                "pid": os.getpid(),
+                "size": self.size,
+                "open": self._open,
+                "inUse": self._in_use,
+                "idle": len(self._idle),
+                "waiters": self._waiters,
+                "checkouts": self._checkouts,
+                "waitTimeTotalMs": round(self._wait_total * 1000, 3),
+                "waitTimeAvgMs": round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "waitTimeMaxMs": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "failedHealthChecks": self._failed_checks,
+                "discarded": self._discarded,
+            }
@@ -0,0 +1,176 @@
+"""
+In-memory MAC -> Device_ID registry for hotspot_monitor.py.
+
+The registry is bulk-loaded from the Device table at startup, answers
+lookups from memory and inserts unknown devices in one batch per flush.
+It is bounded: phones with randomized (locally administered) MACs create a
+new "device" every time they rotate, so idle entries are evicted, transient
+ones first. Evicted devices stay in the database and are looked up again if
+they come back.
+"""
+import time
+from collections import OrderedDict
+
+from id_generator import next_ids
+
+
+def is_multicast_mac(mac):
+    """True for broadcast/multicast MACs (I/G bit set), e.g. ff:ff:..., 01:00:5e:..., 33:33:..."""
+    try:
+        return int(mac[:2], 16) & 0x01 == 1
+    except ValueError:
+        return True
+
+
+def is_randomized_mac(mac):
+    """True for locally administered MACs, which phones use for MAC randomization."""
+    try:
+        return int(mac[:2], 16) & 0x02 == 2
+    except ValueError:
+        return False
+
+
+def is_trackable(mac, ip):
+    """Multicast/broadcast traffic doesn't belong to a device."""
+    if is_multicast_mac(mac):
+        return False
+    if ip.startswith("224.") or ip.startswith("239.") or ip == "255.255.255.255":
+        return False
+    return True
+
+
+class DeviceRegistry:
+    """
+    Keeps at most max_devices MACs. Entries idle for longer than idle_timeout
+    (transient_idle_timeout for randomized MACs) are dropped on evict().
+    """
+
+    def __init__(self, max_devices=5000, idle_timeout=3600, transient_idle_timeout=600):
+        self.max_devices = max_devices
+        self.idle_timeout = idle_timeout
+        self.transient_idle_timeout = transient_idle_timeout
+        self._devices = OrderedDict()  # mac -> [Device_ID, last active], least recently active first
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._devices)
+
+    def preload(self, cursor):
+        """Loads the most recently active devices (up to max_devices) from the Device table."""
+        cursor.execute("""
+            SELECT d.Device_ID, d.MAC_Address
+            FROM Device d
+            LEFT JOIN Device_Usage_Total t ON d.Device_ID = t.Device_ID
+            ORDER BY t.Last_Seen DESC
+            LIMIT %s
+        """, (self.max_devices,))
+        now = time.monotonic()
+        for device_id, mac in reversed(cursor.fetchall()):
+            self._devices[mac.lower()] = [device_id, now]
+        return len(self._devices)
+
+    def get(self, mac):
+        """Device_ID for a MAC if it's in memory, else None. Does not touch the database."""
+        entry = self._devices.get(mac)
+        return entry[0] if entry else None
+
+    def resolve(self, cursor, mac_ips):
+        """
+        Maps every MAC in mac_ips ({mac: ip}) to its Device_ID. Misses are
+        looked up with one SELECT and unknown devices are inserted with one
+        multi-row INSERT on the caller's cursor (NOT committed).
+        """
+        now = time.monotonic()
+        device_ids = {}
+        misses = []
+        for mac in mac_ips:
+            entry = self._devices.get(mac)
+            if entry is None:
+                misses.append(mac)
+                continue
+            entry[1] = now
+            self._devices.move_to_end(mac)
+            device_ids[mac] = entry[0]
+        self.hits += len(device_ids)
+        self.misses += len(misses)
+
+        if misses:
+            found = self._lookup(cursor, misses)
+            new_macs = [mac for mac in misses if mac not in found]
+            if new_macs:
+                found.update(self._insert(cursor, new_macs, mac_ips))
+            for mac, device_id in found.items():
+                self._devices[mac] = [device_id, now]
+            device_ids.update(found)
+
+        self.evict(now)
+        return device_ids
+
+    def forget(self, macs):
+        """Drops entries, e.g. for devices whose insert was rolled back."""
+        for mac in macs:
+            self._devices.pop(mac, None)
+
+    def _lookup(self, cursor, macs):
+        placeholders = ", ".join(["%s"] * len(macs))
+        cursor.execute(f"SELECT Device_ID, MAC_Address FROM Device WHERE MAC_Address IN ({placeholders})", macs)
+        return {mac.lower(): device_id for device_id, mac in cursor.fetchall()}
+
+    def _insert(self, cursor, new_macs, mac_ips):
+        cursor.execute("SELECT User_ID FROM User WHERE First_Name = 'Jeeva'")
+        default_user = cursor.fetchone()
+        if default_user is None:
+            cursor.execute("SELECT MIN(User_ID) FROM User")
+            default_user = cursor.fetchone()
+        user_id = default_user[0]
+
+        new_rows = []
+        created = {}
+        for device_id, mac in zip(next_ids(len(new_macs)), new_macs):
+            ip = mac_ips[mac]
+            print(f"New device detected! MAC: {mac}, IP: {ip}. Adding to database...")
+            new_rows.append((device_id, user_id, mac, f"New Device ({ip})", "Unknown"))
+            created[mac] = device_id
+
+        insert_sql = """
+            INSERT INTO Device (Device_ID, User_ID, MAC_Address, Device_Name, Device_Type)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        cursor.executemany(insert_sql, new_rows)
+        self.created += len(created)
+        return created
+
+    def evict(self, now=None):
+        """Drops idle entries, then the least recently active ones until under max_devices."""
+        now = time.monotonic() if now is None else now
+        idle = [
+            mac for mac, (_, last_active) in self._devices.items()
+            if now - last_active > (self.transient_idle_timeout if is_randomized_mac(mac) else self.idle_timeout)
+        ]
+        for mac in idle:
+            del self._devices[mac]
+        evicted = len(idle)
+        overflow = len(self._devices) - self.max_devices
+        if overflow > 0:
+            # Oldest randomized MACs go first, then the oldest of the rest
+            transient = [mac for mac in self._devices if is_randomized_mac(mac)][:overflow]
+            for mac in transient:
+                del self._devices[mac]
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+            evicted += overflow
+        self.evicted += evicted
+        return evicted
+
+    def stats(self):
+        return {
+            "devices": len(self._devices),
+            "maxDevices": self.max_devices,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "evicted": self.evicted,
+        }
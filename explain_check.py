@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Query-plan check for the dashboard: calls every read endpoint of app.py
+against the real database, EXPLAINs each SELECT it issues (with the same
+parameters) and fails if any of them reads a table that grows with time in
+full. Tables sized by the number of devices, users or networks may be read
+whole; Connection_Log, Data_Usage and the usage buckets may not.
+
+Run it after `python migrate.py`, on a database with some data in it
+(simulator.py), since MySQL may prefer a table scan on a nearly empty table.
+
+Usage:
+    python explain_check.py [--verbose]
+"""
+import argparse
+import re
+import sys
+from urllib.parse import quote
+import mysql.connector
+
+import app
+import storage
+
+# Tables whose row count grows with time; a full read of one is a failure
+GROWING_TABLES = {"Connection_Log", "Data_Usage", "Usage_Bucket_Global", "Usage_Bucket_Device", "Usage_Bucket_Network"}
+# EXPLAIN access types that read every row of a table (ALL) or of an index (index)
+FULL_SCAN_TYPES = {"ALL", "index"}
+
+_TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|INNER|GROUP|ORDER|HAVING|LIMIT)\b)(\w+))?',
+                          re.IGNORECASE)
+
+
+class ExplainingCursor:
+    """Cursor wrapper that EXPLAINs every SELECT before running it."""
+
+    def __init__(self, cursor, raw_conn, plans):
+        self._cursor = cursor
+        self._raw_conn = raw_conn
+        self._plans = plans
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        if operation.lstrip().upper().startswith("SELECT"):
+            explain = self._raw_conn.cursor(dictionary=True, buffered=True)
+            explain.execute("EXPLAIN " + operation, params)
+            self._plans.append((operation, explain.fetchall()))
+            explain.close()
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class ExplainingConnection:
+    def __init__(self, raw, plans):
+        self._raw = raw
+        self._plans = plans
+
+    def cursor(self, *args, **kwargs):
+        return ExplainingCursor(self._raw.cursor(*args, **kwargs), self._raw, self._plans)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def table_aliases(sql):
+    """{alias or table name: table name} for the FROM/JOIN clauses of a query."""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql, plan):
+    """[(table, access type)] for each growing table the plan reads in full."""
+    aliases = table_aliases(sql)
+    scans = []
+    for row in plan:
+        table = aliases.get(row['table'], row['table'])
+        if table in GROWING_TABLES and row['type'] in FULL_SCAN_TYPES:
+            scans.append((table, row['type']))
+    return scans
+
+
+def sample_values():
+    """One existing Device_ID, User_ID, Network_ID and Device_Type to put in the endpoint URLs."""
+    conn = mysql.connector.connect(**storage.db_config)
+    cursor = conn.cursor()
+    cursor.execute("SELECT Device_ID, User_ID, Device_Type FROM Device LIMIT 1")
+    device = cursor.fetchone()
+    cursor.execute("SELECT Network_ID FROM Network LIMIT 1")
+    network = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if not device or not network:
+        raise SystemExit("The database has no devices or networks to check against.")
+    return {"device": device[0], "user": device[1], "type": quote(device[2]), "network": quote(network[0])}
+
+
+def endpoint_paths(sample):
+    """Every read endpoint, with each sort and filter of the listings."""
+    device = sample["device"]
+    return [
+        "/api/dashboard-stats",
+        "/api/usage-over-time",
+        "/api/top-devices-today",
+        "/api/network-overview",
+        "/api/devices?limit=1",
+        "/api/devices?limit=1&sort=lastSeen&order=asc",
+        "/api/devices?status=online",
+        "/api/devices?status=offline",
+        f"/api/devices?type={sample['type']}",
+        f"/api/devices?owner={sample['user']}",
+        f"/api/devices?network={sample['network']}",
+        "/api/users?limit=1",
+        "/api/users?limit=1&sort=lastSeen&status=offline",
+        f"/api/users?type={sample['type']}",
+        f"/api/users?network={sample['network']}",
+        f"/api/device/{device}?limit=1",
+        f"/api/device/{device}/logs?limit=1&sort=usage",
+        f"/api/device/{device}/logs?limit=1&order=asc",
+        f"/api/device/{device}/logs?network={sample['network']}",
+        "/api/devices/export",
+        "/api/devices/export?since=2000-01-01",
+        "/api/users/export",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every endpoint query and fail on full scans of growing tables.")
+    parser.add_argument("--verbose", action="store_true", help="print every query plan")
+    args = parser.parse_args()
+    if storage.BACKEND != 'mysql':
+        raise SystemExit("explain_check.py reads MySQL query plans; run it with DB_BACKEND=mysql.")
+
+    sample = sample_values()
+    plans = []
+    app.db_pool.connect = lambda: ExplainingConnection(mysql.connector.connect(**storage.db_config), plans)
+    app.app.config['LOGIN_DISABLED'] = True
+    client = app.app.test_client()
+
+    failures = 0
+    checked = 0
+    pending = endpoint_paths(sample)
+    while pending:
+        path = pending.pop(0)
+        del plans[:]
+        response = client.get(path)
+        body = response.get_json(silent=True)
+        response.close()
+        if response.status_code != 200:
+            print(f"FAIL {path}: HTTP {response.status_code}")
+            failures += 1
+            continue
+        # Follow one cursor per listing so the keyset condition is checked too
+        if isinstance(body, dict) and 'cursor=' not in path:
+            base = path.split('?')[0]
+            if body.get('nextCursor'):
+                pending.append(f"{path}&cursor={body['nextCursor']}")
+            if body.get('logsNextCursor'):
+                pending.append(f"{base}/logs?cursor={body['logsNextCursor']}")
+
+        for sql, plan in plans:
+            checked += 1
+            scans = full_scans(sql, plan)
+            if scans:
+                failures += 1
+                tables = ", ".join(f"{table} ({access})" for table, access in scans)
+                print(f"FAIL {path}: full scan of {tables}\n  {' '.join(sql.split())}")
+            if args.verbose:
+                print(f"{path}: {' '.join(sql.split())}")
+                for row in plan:
+                    print(f"    {row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}")
+
+    print(f"--- {checked} queries checked, {failures} failure(s) ---")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Fast-path packet capture for hotspot_monitor.py (Linux only).
+
+Frames are read from an AF_PACKET socket through a PACKET_MMAP (TPACKET_V2)
+receive ring shared with the kernel, so there is no syscall or copy per
+packet. A classic BPF filter attached to the socket drops everything that
+isn't IPv4 in the kernel and only copies the first SNAPLEN bytes of each
+frame. The Ethernet and IPv4 headers are then parsed by offset instead of
+being dissected into Scapy objects.
+
+If the ring can't be set up, frames are read with recv_into() instead.
+"""
+import ctypes
+import mmap
+import select
+import socket
+import struct
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+SOL_PACKET = 263
+SO_ATTACH_FILTER = 26
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V2 = 1
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+ETH_HEADER_LEN = 14
+# Enough for the Ethernet header and the IPv4 addresses; tp_len still reports the full frame length
+SNAPLEN = 64
+# recv() only learns the real frame length if the filter doesn't trim the frame
+MAX_FRAME_LEN = 262144
+
+# tpacket2_hdr: tp_status, tp_len, tp_snaplen, tp_mac, tp_net (the rest isn't needed)
+_TPACKET2_HDR = struct.Struct('<IIIHH')
+_STATUS = struct.Struct('<I')
+# IPv4 source and destination address, at offset 12 of the IP header
+_IP_ADDRESSES = struct.Struct('!II')
+
+
+def ip_filter_program(snaplen=SNAPLEN):
+    """
+    BPF for "ip" on Ethernet, returning only the first snaplen bytes:
+        ldh [12]; jeq #0x800, accept, drop; accept: ret #snaplen; drop: ret #0
+    """
+    instructions = [
+        (0x28, 0, 0, 12),        # ldh [12]        (EtherType)
+        (0x15, 0, 1, ETH_P_IP),  # jeq #0x800
+        (0x06, 0, 0, snaplen),   # ret #snaplen
+        (0x06, 0, 0, 0),         # ret #0
+    ]
+    return b"".join(struct.pack('HBBI', *ins) for ins in instructions), len(instructions)
+
+
+def attach_filter(sock, snaplen=SNAPLEN):
+    code, count = ip_filter_program(snaplen)
+    buf = ctypes.create_string_buffer(code)
+    # struct sock_fprog { unsigned short len; struct sock_filter *filter; }
+    fprog = struct.pack('HL', count, ctypes.addressof(buf))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+class AFPacketCapture:
+    """
+    Captures IPv4 frames on one interface and calls
+    on_packet(src_mac, dst_mac, src_ip, dst_ip, frame_length) for each,
+    with the IPs as 32-bit ints.
+    """
+
+    def __init__(self, iface, frame_size=256, block_size=1 << 16, block_count=64):
+        self.iface = iface
+        self.frame_size = frame_size
+        self.frame_count = (block_size // frame_size) * block_count
+        self.running = False
+        self.ring = None
+
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        try:
+            try:
+                self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V2)
+                self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING,
+                                     struct.pack('IIII', block_size, block_count, frame_size, self.frame_count))
+                self.ring = mmap.mmap(self.sock.fileno(), block_size * block_count,
+                                      mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            except OSError as e:
+                print(f"PACKET_MMAP ring unavailable ({e}); reading frames with recv().")
+                self.ring = None
+                try:
+                    # An all-zero request releases a ring that was set up but couldn't be mapped
+                    self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, struct.pack('IIII', 0, 0, 0, 0))
+                except OSError:
+                    pass
+            attach_filter(self.sock, SNAPLEN if self.ring is not None else MAX_FRAME_LEN)
+            self.sock.bind((iface, 0))
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def mode(self):
+        return "PACKET_MMAP ring" if self.ring is not None else "recv"
+
+    def run(self, on_packet):
+        """Blocks, feeding packets to on_packet until stop() or an exception."""
+        self.running = True
+        if self.ring is not None:
+            self._run_ring(on_packet)
+        else:
+            self._run_recv(on_packet)
+
+    def stop(self):
+        self.running = False
+
+    def _run_ring(self, on_packet):
+        ring = self.ring
+        frame_size = self.frame_size
+        frame_count = self.frame_count
+        unpack_header = _TPACKET2_HDR.unpack_from
+        set_status = _STATUS.pack_into
+        unpack_addresses = _IP_ADDRESSES.unpack_from
+        poller = select.poll()
+        poller.register(self.sock.fileno(), select.POLLIN | select.POLLERR)
+
+        frame = 0
+        while self.running:
+            offset = frame * frame_size
+            status, length, _, mac_offset, net_offset = unpack_header(ring, offset)
+            if not status & TP_STATUS_USER:
+                poller.poll(500)
+                continue
+
+            mac = offset + mac_offset
+            src_ip, dst_ip = unpack_addresses(ring, offset + net_offset + 12)
+            on_packet(ring[mac + 6:mac + 12].hex(':'), ring[mac:mac + 6].hex(':'), src_ip, dst_ip, length)
+
+            set_status(ring, offset, TP_STATUS_KERNEL)
+            frame = frame + 1 if frame + 1 < frame_count else 0
+
+    def _run_recv(self, on_packet):
+        buf = bytearray(SNAPLEN)
+        view = memoryview(buf)
+        recv_into = self.sock.recv_into
+        unpack_addresses = _IP_ADDRESSES.unpack_from
+        while self.running:
+            # MSG_TRUNC makes recv_into return the full frame length, not the bytes copied
+            length = recv_into(buf, SNAPLEN, socket.MSG_TRUNC)
+            if length < ETH_HEADER_LEN + 20:
+                continue
+            src_ip, dst_ip = unpack_addresses(buf, ETH_HEADER_LEN + 12)
+            on_packet(view[6:12].hex(':'), view[0:6].hex(':'), src_ip, dst_ip, length)
+
+    def stats(self):
+        """(packets, drops) seen by the kernel since the previous call."""
+        packets, drops = struct.unpack('II', self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+        return packets, drops
+
+    def close(self):
+        self.running = False
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self.sock.close()
@@ -8,12 +8,6 @@ import psutil
 import socket
 import platform
 
-try:
-    from scapy.all import conf, get_working_ifaces
-except ImportError:
-    print("Scapy not found. Please ensure it is installed: pip install scapy")
-    exit()
-
 print("=" * 60)
 print("DETECTED NETWORK INTERFACES (v2)")
 print("=" * 60)
@@ -58,6 +52,11 @@ except Exception as e:
 print("\n--- Method 2: Using 'Scapy' (Backup) ---")
 print("This list shows all interfaces Scapy can *directly* use.\n")
 try:
+    # Only Scapy's interface code (scapy.arch registers this OS's interface provider),
+    # not scapy.all, which loads every protocol layer and takes most of a second
+    import scapy.arch
+    from scapy.interfaces import get_working_ifaces
+
     # Get a list of *working* interfaces from Scapy
     working_ifaces = get_working_ifaces()
     
@@ -71,6 +70,8 @@ try:
         print(f"  MAC Address: {iface.mac}")
         print("-" * 20)
 
+except ImportError:
+    print("Scapy not found. Please ensure it is installed: pip install scapy")
 except Exception as e:
     print(f"Error with Scapy method: {e}")
 
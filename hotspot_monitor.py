@@ -3,190 +3,278 @@
 Real-Time Mobile Hotspot Monitor with Scapy
 Monitors devices connected to your mobile hotspot and tracks data usage.
 (Version 4: Fixes rounding bug for small data packets)
+
+Usage:
+    python hotspot_monitor.py                    # Scapy capture (works everywhere)
+    python hotspot_monitor.py --capture afpacket # Linux fast path, falls back to Scapy
+    python hotspot_monitor.py --network 172.20.10.0/28=N008 --network 10.0.0.0/16=N003
+    python hotspot_monitor.py --stats-port 9105                # live stats: curl localhost:9105/stats
 """
-import mysql.connector 
+import argparse
+import storage
 import time
 import threading
 from datetime import datetime
-from scapy.all import sniff, IP, ARP
-from collections import defaultdict
 import psutil
 import socket
+from aggregates import BYTES_PER_MB, record_usage
+from device_registry import DeviceRegistry, is_trackable
+from subnet_classifier import SubnetClassifier, ip_to_int, int_to_ip, parse_network_spec
+from usage_counters import UsageCounters
+from usage_spool import UsageSpool, load_checkpoint, save_checkpoint
+from monitor_stats import MonitorStats, report_stats, serve_stats
+from id_generator import next_ids
 
 # --- CONFIGURATION: YOU MUST CHANGE THESE ---
 YOUR_INTERFACE_NAME = "Wi-Fi"  # This is correct
 YOUR_NETWORK_ID = "N008"       # This is fine
+# Hotspot subnets to monitor as (CIDR, Network_ID). Empty means the interface's own
+# subnet (with its real netmask) logged as YOUR_NETWORK_ID. --network overrides this.
+MONITORED_NETWORKS = []
+MAX_TRACKED_DEVICES = 5000     # MAC -> Device_ID entries kept in memory
+DEVICE_IDLE_TIMEOUT = 3600     # Seconds before an idle device is dropped from memory
+RANDOM_MAC_IDLE_TIMEOUT = 600  # Same, for randomized (locally administered) MACs
+FLUSH_INTERVAL = 30            # Seconds of usage per spooled interval
+SPOOL_DIR = "usage_spool"      # Local spool between the counters and MySQL
+UPLOAD_BATCH_INTERVALS = 120   # Spooled intervals written per upload transaction
+UPLOAD_IDLE_INTERVAL = 2       # Seconds between spool checks when caught up
+UPLOAD_RETRY_INTERVAL = 10     # Seconds before retrying after a database error
+STATS_INTERVAL = 60            # Seconds between "stats {...}" log lines (--stats-interval)
 # --- END CONFIGURATION ---
 
-# --- DATABASE CONFIG (same as app.py) ---
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '1234',  
-    'database': 'dbms_proj'
-}
-
 # --- GLOBAL DATA STORES ---
-device_data_usage = defaultdict(lambda: {"uploaded": 0, "downloaded": 0})
-device_ip_map = {}
-data_lock = threading.Lock()
+# Written only by the capture thread, drained only by the flush thread (no per-packet lock)
+usage_counters = UsageCounters()
+device_registry = DeviceRegistry(MAX_TRACKED_DEVICES, DEVICE_IDLE_TIMEOUT, RANDOM_MAC_IDLE_TIMEOUT)
+spool = None  # UsageSpool, opened in main()
+upload_position = None  # Spool position the uploader has committed up to
+monitor_stats = MonitorStats(FLUSH_INTERVAL)
+
+# --- Scapy, imported by load_scapy() only when the Scapy backend runs ---
+sniff = None
+IP = None
 
-# --- Get IP/MAC using psutil (which we know works) ---
+# --- Set from the interface in main() ---
 MY_IP = None
 MY_MAC = None
-MY_SUBNET = None
-try:
+classifier = None
+
+def get_interface_addresses(interface_name):
+    """Gets the IPv4 address, netmask and MAC of an interface using psutil (which we know works)."""
+    ip, netmask, mac = None, None, None
     all_addrs = psutil.net_if_addrs()
-    if YOUR_INTERFACE_NAME not in all_addrs:
-        raise Exception(f"Interface '{YOUR_INTERFACE_NAME}' not found by psutil. Is it connected?")
+    if interface_name not in all_addrs:
+        raise Exception(f"Interface '{interface_name}' not found by psutil. Is it connected?")
         
-    for addr in all_addrs[YOUR_INTERFACE_NAME]:
+    for addr in all_addrs[interface_name]:
         if addr.family == socket.AF_INET: # IPv4
-            MY_IP = addr.address
+            ip = addr.address
+            netmask = addr.netmask
         elif addr.family == psutil.AF_LINK: # MAC Address
-            MY_MAC = addr.address.replace('-', ':').lower()
+            mac = addr.address.replace('-', ':').lower()
 
-    if not MY_IP or not MY_MAC:
+    if not ip or not mac:
         raise Exception("Could not find both IP and MAC for interface.")
-    
-    MY_SUBNET = ".".join(MY_IP.split('.')[:3]) + "."
-
-except Exception as e:
-    print(f"Error: Could not get IP/MAC for interface '{YOUR_INTERFACE_NAME}'.")
-    print(f"Error details: {e}")
-    exit(1)
-# --- END IP/MAC BLOCK ---
-
-
-print("--- Live Hotspot Monitor Started ---")
-print(f"Monitoring interface: {YOUR_INTERFACE_NAME} ({MY_IP} / {MY_MAC})")
-print(f"Logging data to Network ID: {YOUR_NETWORK_ID} (Subnet: {MY_SUBNET})")
-print("Press CTRL+C to stop.")
+    return ip, netmask or "255.255.255.0", mac
 
 def get_db_connection():
-    return mysql.connector.connect(**db_config)
-
-def get_or_create_device(mac, ip):
-    """Finds a device by MAC. If it doesn't exist, creates it."""
-    
-    if mac.startswith("01:00:5e") or mac == "ff:ff:ff:ff:ff:ff":
-        return None 
-    if ip.startswith("224.") or ip.startswith("239.") or ip == "255.255.255.255":
-        return None
+    return storage.connect()
 
+def preload_devices():
+    """Bulk-loads known devices so flushes rarely need to query Device."""
     conn = get_db_connection()
-    # --- FIX 1: Added buffered=True ---
-    cursor = conn.cursor(dictionary=True, buffered=True)
-    
-    cursor.execute("SELECT Device_ID FROM Device WHERE MAC_Address = %s", (mac,))
-    device = cursor.fetchone()
-    
-    if device:
+    try:
+        cursor = conn.cursor(buffered=True)
+        loaded = device_registry.preload(cursor)
+        print(f"Loaded {loaded} known devices into memory.")
+    finally:
         conn.close()
-        return device['Device_ID']
-    
-    print(f"New device detected! MAC: {mac}, IP: {ip}. Adding to database...")
-    
-    device_id = f'D{str(int(time.time() * 1000))[-8:]}' 
-    
-    cursor.execute("SELECT User_ID FROM User WHERE First_Name = 'Jeeva'") 
-    default_user = cursor.fetchone()
-    user_id = default_user['User_ID'] if default_user else 'U001'
-    
-    device_name = f"New Device ({ip})"
-    device_type = "Unknown"
-    
-    insert_sql = """
-        INSERT INTO Device (Device_ID, User_ID, MAC_Address, Device_Name, Device_Type)
-        VALUES (%s, %s, %s, %s, %s)
+
+def flush_usage(intervals, checkpoint=None):
+    """
+    Writes usage snapshots ([(timestamp, usage), ...], oldest first) in a
+    single transaction: devices are resolved in one pass, then every
+    Connection_Log / Data_Usage row goes in with one multi-row INSERT each.
+    With checkpoint, the spool position is committed in the same
+    transaction. Returns the number of rows written, or None on a database
+    error (nothing was written).
     """
+    started = time.perf_counter()
+
+    pending = []
+    mac_ips = {}
+    for timestamp, current_data_usage in intervals:
+        logged_at = datetime.fromtimestamp(timestamp)
+        for mac, usage in current_data_usage.items():
+            ip = int_to_ip(usage['ip']) if usage['ip'] is not None else 'N/A'
+            if not is_trackable(mac, ip):
+                continue
+
+            # Usage is stored as exact byte counts, so even a single small packet is kept
+            bytes_down = usage['downloaded']
+            bytes_up = usage['uploaded']
+            if bytes_down == 0 and bytes_up == 0:
+                continue
+
+            pending.append((mac, ip, usage['network'], logged_at, bytes_down, bytes_up))
+            mac_ips[mac] = ip
+
+    if not pending and checkpoint is None:
+        return 0
+
+    conn = None
+    log_rows, usage_rows = [], []
     try:
-        cursor.execute(insert_sql, (device_id, user_id, mac, device_name, device_type))
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        device_ids = device_registry.resolve(cursor, mac_ips)
+
+        log_ids = next_ids(len(pending))
+        usage_ids = next_ids(len(pending))
+        samples = []
+        for log_id, usage_id, (mac, ip, network_id, logged_at, bytes_down, bytes_up) in zip(log_ids, usage_ids, pending):
+            device_id = device_ids[mac]
+            log_rows.append((log_id, network_id, device_id, logged_at, ip))
+            usage_rows.append((usage_id, log_id, bytes_down, bytes_up))
+            samples.append((device_id, network_id, logged_at, bytes_down, bytes_up))
+
+        if log_rows:
+            log_sql = """
+                INSERT INTO Connection_Log (Log_ID, Network_ID, Device_ID, Timestamp, IP_Address)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.executemany(log_sql, log_rows)
+
+            usage_sql = """
+                INSERT INTO Data_Usage (Usage_ID, Log_ID, Data_Downloaded, Data_Uploaded)
+                VALUES (%s, %s, %s, %s)
+            """
+            cursor.executemany(usage_sql, usage_rows)
+            record_usage(cursor, samples)
+
+        if checkpoint is not None:
+            save_checkpoint(cursor, spool.spool_id, checkpoint)
+
         conn.commit()
-        print(f"Successfully added new device: {device_id} ({mac})")
-        return device_id
-    except mysql.connector.Error as err:
-        print(f"Error adding new device: {err}")
-        conn.rollback()
+    except storage.DatabaseError as err:
+        print(f"Error logging to DB: {err}")
+        if conn is not None:
+            conn.rollback()
+        # Devices inserted in this transaction were rolled back too
+        device_registry.forget(mac_ips)
         return None
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+    if len(intervals) == 1:
+        for mac, ip, network_id, logged_at, bytes_down, bytes_up in pending:
+            print(f"  - Logged: {device_ids[mac]} ({mac}) | Down: {bytes_down / BYTES_PER_MB:.4f} MB, "
+                  f"Up: {bytes_up / BYTES_PER_MB:.4f} MB")
+
+    rows_written = len(log_rows) + len(usage_rows)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"  Flush complete: {len(intervals)} intervals, {len(log_rows)} device samples, "
+          f"{rows_written} rows in {elapsed_ms:.1f} ms")
+    return rows_written
+
+def take_snapshot(wait=True):
+    """
+    Returns the usage counted since the last snapshot and starts a new interval.
+    wait=False is only for callers that are themselves the capture thread.
+    """
+    return usage_counters.snapshot(wait)
 
 def log_data_to_db():
     """
-    This function runs in a separate thread, logging data to the DB
-    every 30 seconds and then clearing the in-memory cache.
+    This function runs in a separate thread. Every FLUSH_INTERVAL seconds it
+    moves the in-memory counters to the local spool (never to MySQL
+    directly, so a slow database can't hold it up or lose the interval).
     """
     while True:
-        time.sleep(30) 
-        
-        with data_lock:
-            current_data_usage = dict(device_data_usage)
-            device_data_usage.clear()
-        
+        time.sleep(FLUSH_INTERVAL)
+
+        started = time.perf_counter()
+        current_data_usage = take_snapshot()
+
         if not current_data_usage:
+            monitor_stats.record_interval(time.perf_counter() - started)
             continue
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Logging data for {len(current_data_usage)} devices...")
-        conn = get_db_connection()
-        # --- FIX 2: Added buffered=True ---
-        cursor = conn.cursor(buffered=True)
-        
-        for mac, usage in current_data_usage.items():
-            ip = device_ip_map.get(mac, 'N/A')
-            
-            device_id = get_or_create_device(mac, ip)
-            
-            if not device_id:
-                continue 
-            
-            # --- THIS IS THE FIX ---
-            # Check raw byte count first
-            raw_down = usage['downloaded']
-            raw_up = usage['uploaded']
-            
-            # If no data at all, skip
-            if raw_down == 0 and raw_up == 0:
-                continue
-                
-            # Now convert to MB, but round to 4 decimal places
-            data_down_mb = round(raw_down / (1024*1024), 4)
-            data_up_mb = round(raw_up / (1024*1024), 4)
-
-            # Secondary check: if it's still 0.0 after rounding, skip
-            # This prevents logging 0.0000 MB entries
-            if data_down_mb == 0 and data_up_mb == 0:
-                continue
-            # --- END OF FIX ---
+        spool.append(time.time(), current_data_usage)
+        monitor_stats.record_interval(time.perf_counter() - started)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Spooled data for {len(current_data_usage)} devices.")
 
-            unique_id_stamp = str(int(time.time() * 1000000))
-            log_id = f'L{unique_id_stamp[-10:]}' 
-            usage_id = f'U{unique_id_stamp[-10:]}'
-            current_time = datetime.now()
-            
+def upload_spool():
+    """
+    Runs in its own thread: drains the spool into MySQL in batches of up to
+    UPLOAD_BATCH_INTERVALS intervals, resuming from the committed checkpoint.
+    """
+    global upload_position
+    while True:
+        try:
+            conn = get_db_connection()
             try:
-                log_sql = """
-                    INSERT INTO Connection_Log (Log_ID, Network_ID, Device_ID, Timestamp, IP_Address)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                cursor.execute(log_sql, (log_id, YOUR_NETWORK_ID, device_id, current_time, ip))
-                
-                usage_sql = """
-                    INSERT INTO Data_Usage (Usage_ID, Log_ID, Data_Downloaded, Data_Uploaded)
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(usage_sql, (usage_id, log_id, data_down_mb, data_up_mb))
-                
-                conn.commit()
-                # --- THIS LINE SHOULD NOW PRINT ---
-                print(f"  - Logged: {device_id} ({mac}) | Down: {data_down_mb} MB, Up: {data_up_mb} MB")
-
-            except mysql.connector.Error as err:
-                print(f"Error logging to DB: {err}")
-                conn.rollback()
-        
-        conn.close()
+                position = load_checkpoint(conn.cursor(buffered=True), spool.spool_id)
+            finally:
+                conn.close()
+            upload_position = position
+            break
+        except storage.DatabaseError as err:
+            print(f"Spool uploader: database unavailable ({err}); retrying in {UPLOAD_RETRY_INTERVAL}s")
+            time.sleep(UPLOAD_RETRY_INTERVAL)
+
+    while True:
+        records, next_position = spool.read(position, UPLOAD_BATCH_INTERVALS)
+        if not records:
+            position = next_position
+            spool.purge(position)
+            time.sleep(UPLOAD_IDLE_INTERVAL)
+            continue
+
+        started = time.perf_counter()
+        written = flush_usage(records, checkpoint=next_position)
+        monitor_stats.record_upload(time.perf_counter() - started, written is not None)
+        if written is None:
+            backlog = spool.backlog(position)
+            print(f"Spool uploader: upload failed, {backlog['bytes']} bytes in "
+                  f"{backlog['segments']} segments waiting; retrying in {UPLOAD_RETRY_INTERVAL}s")
+            time.sleep(UPLOAD_RETRY_INTERVAL)
+            continue
+
+        position = upload_position = next_position
+        spool.purge(position)
+        if len(records) == UPLOAD_BATCH_INTERVALS:
+            backlog = spool.backlog(position)
+            print(f"Spool uploader: catching up, {backlog['bytes']} bytes left")
+
 
+def count_packet(src_mac, dst_mac, src_ip, dst_ip, packet_size):
+    """
+    Adds one packet to the per-device upload/download counters.
+    IPs are 32-bit ints. Shared by every capture backend.
+    """
+    stats = monitor_stats
+    stats.packets += 1
+    stats.bytes += packet_size
+    if src_mac == MY_MAC or dst_mac == MY_MAC:
+        stats.ignored_own_mac += 1
+        return
+
+    src_network = classifier.lookup(src_ip)
+    dst_network = classifier.lookup(dst_ip)
+    if src_network == dst_network:
+        # Both outside the monitored subnets, or traffic within one of them
+        stats.ignored_outside += 1
+        return
+
+    # UPLOAD: Packet is from a monitored subnet to somewhere outside it
+    if src_network is not None:
+        usage_counters.add_upload(src_mac, src_ip, src_network, packet_size)
+
+    # DOWNLOAD: Packet is from outside a monitored subnet into it
+    if dst_network is not None:
+        usage_counters.add_download(dst_mac, dst_ip, dst_network, packet_size)
 
 def packet_callback(packet):
     """
@@ -195,38 +283,111 @@ def packet_callback(packet):
     if not packet.haslayer(IP):
         return
     
-    src_mac = packet.src.lower()
-    dst_mac = packet.dst.lower()
-    src_ip = packet[IP].src
-    dst_ip = packet[IP].dst  # <-- SYNTAX ERROR FIX
-    packet_size = len(packet)
+    ip_layer = packet[IP]
+    count_packet(packet.src.lower(), packet.dst.lower(), ip_to_int(ip_layer.src), ip_to_int(ip_layer.dst), len(packet))
 
-    if src_mac == MY_MAC or dst_mac == MY_MAC:
-        return
+def load_scapy():
+    """
+    Imports what the Scapy backend uses: sniff() and the IP layer (which
+    brings in Ethernet). scapy.all loads every protocol Scapy has, which
+    takes most of a second and tens of MB the AF_PACKET backend never needs.
+    """
+    global sniff, IP
+    from scapy.sendrecv import sniff
+    from scapy.layers.inet import IP
 
-    # UPLOAD: Packet is from our subnet to the outside world
-    if src_ip.startswith(MY_SUBNET) and not dst_ip.startswith(MY_SUBNET):
-        device_mac = src_mac
-        device_ip_map[device_mac] = src_ip 
-        with data_lock:
-            device_data_usage[device_mac]["uploaded"] += packet_size
-
-    # DOWNLOAD: Packet is from the outside world to our subnet
-    elif not src_ip.startswith(MY_SUBNET) and dst_ip.startswith(MY_SUBNET):
-        device_mac = dst_mac
-        device_ip_map[device_mac] = dst_ip 
-        with data_lock:
-            device_data_usage[device_mac]["downloaded"] += packet_size
-
-try:
-    log_thread = threading.Thread(target=log_data_to_db, daemon=True)
-    log_thread.start()
-    
+def run_capture(backend):
+    """Runs the selected capture backend until interrupted. Scapy is the fallback."""
+    if backend == "afpacket":
+        try:
+            from fast_capture import AFPacketCapture
+            capture = AFPacketCapture(YOUR_INTERFACE_NAME)
+        except (ImportError, AttributeError, OSError) as e:
+            # AttributeError: no socket.AF_PACKET (not Linux). OSError: e.g. not root.
+            print(f"AF_PACKET capture unavailable ({e}). Falling back to Scapy.")
+        else:
+            print(f"Capture backend: AF_PACKET ({capture.mode})")
+            capture.stats()  # the kernel counters reset on every read; start from zero
+            monitor_stats.kernel_source = capture.stats
+            try:
+                capture.run(count_packet)
+            finally:
+                capture.close()
+            return
+
+    print("Capture backend: Scapy")
+    load_scapy()
     sniff(iface=YOUR_INTERFACE_NAME, prn=packet_callback, filter="ip", store=False)
 
-except KeyboardInterrupt:
-    print("\n--- Monitor Stopping. Waiting for final log... ---")
-    time.sleep(2)
-    print("--- Monitor Stopped ---")
-except Exception as e:
-    print(f"\nAn error occurred: {e}")
\ No newline at end of file
+def main():
+    global MY_IP, MY_MAC, classifier, spool
+
+    parser = argparse.ArgumentParser(description="Track per-device data usage on a hotspot interface.")
+    parser.add_argument("--capture", choices=["scapy", "afpacket"], default="scapy",
+                        help="packet capture backend (default: scapy)")
+    parser.add_argument("--network", action="append", metavar="CIDR=NETWORK_ID",
+                        help="hotspot subnet to monitor and the Network_ID to log it as (repeatable)")
+    parser.add_argument("--stats-port", type=int, help="serve live stats as JSON on 127.0.0.1:PORT/stats")
+    parser.add_argument("--stats-socket", metavar="PATH", help="serve live stats as JSON on a Unix socket")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL,
+                        help=f"seconds between stats log lines (default {STATS_INTERVAL})")
+    args = parser.parse_args()
+
+    try:
+        MY_IP, netmask, MY_MAC = get_interface_addresses(YOUR_INTERFACE_NAME)
+    except Exception as e:
+        print(f"Error: Could not get IP/MAC for interface '{YOUR_INTERFACE_NAME}'.")
+        print(f"Error details: {e}")
+        exit(1)
+
+    try:
+        if args.network:
+            networks = [parse_network_spec(spec) for spec in args.network]
+        else:
+            networks = MONITORED_NETWORKS or [(f"{MY_IP}/{netmask}", YOUR_NETWORK_ID)]
+        classifier = SubnetClassifier(networks)
+    except ValueError as e:
+        print(f"Error: Invalid network configuration: {e}")
+        exit(1)
+
+    print("--- Live Hotspot Monitor Started ---")
+    print(f"Monitoring interface: {YOUR_INTERFACE_NAME} ({MY_IP} / {MY_MAC})")
+    print(f"Logging data for: {classifier}")
+    print("Press CTRL+C to stop.")
+
+    spool = UsageSpool(SPOOL_DIR)
+    print(f"Spooling usage to: {SPOOL_DIR}/ (spool {spool.spool_id})")
+
+    try:
+        try:
+            preload_devices()
+        except storage.DatabaseError as err:
+            print(f"Could not preload devices ({err}); usage will be spooled until the database is back.")
+        log_thread = threading.Thread(target=log_data_to_db, daemon=True)
+        log_thread.start()
+        upload_thread = threading.Thread(target=upload_spool, daemon=True)
+        upload_thread.start()
+
+        monitor_stats.add_source("counters", usage_counters.stats)
+        monitor_stats.add_source("devices", device_registry.stats)
+        monitor_stats.add_source("spool", lambda: spool.backlog(upload_position))
+        threading.Thread(target=report_stats, args=(monitor_stats, args.stats_interval), daemon=True).start()
+        for server in serve_stats(monitor_stats, args.stats_port, args.stats_socket):
+            print(f"Serving stats on {server.server_address}")
+        
+        run_capture(args.capture)
+
+    except KeyboardInterrupt:
+        print("\n--- Monitor Stopping. Spooling final interval... ---")
+        # Capture has stopped, so the counters can be swapped from here
+        final_usage = take_snapshot(wait=False)
+        if final_usage:
+            spool.append(time.time(), final_usage)
+        print("--- Monitor Stopped ---")
+    except Exception as e:
+        print(f"\nAn error occurred: {e}")
+    finally:
+        spool.close()
+
+if __name__ == '__main__':
+    main()
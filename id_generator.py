@@ -0,0 +1,87 @@
+"""
+64-bit, time-ordered IDs for the rows the writers create (users, devices,
+Connection_Log, Data_Usage).
+
+Layout, which fits a signed BIGINT:
+    41 bits milliseconds since ID_EPOCH_MS | 10 bits node | 12 bits sequence
+
+The node keeps writers apart: set ID_NODE (0-1023) to a distinct value per
+writing process, otherwise it is derived from the host name and PID. Within
+a process IDs only ever increase: up to 4096 per millisecond, a larger batch
+borrows the following milliseconds, and if the clock steps back the
+generator keeps counting from where it was instead of repeating values.
+"""
+import os
+import socket
+import threading
+import time
+import zlib
+
+ID_EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+
+def default_node():
+    """ID_NODE from the environment, else a hash of host name and PID."""
+    value = os.environ.get("ID_NODE")
+    if value is not None:
+        return int(value)
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) & MAX_NODE
+
+
+class IdGenerator:
+    """Thread-safe; one per process (see next_id())."""
+
+    def __init__(self, node=None):
+        self.node = default_node() if node is None else node
+        if not 0 <= self.node <= MAX_NODE:
+            raise ValueError(f"ID node must be between 0 and {MAX_NODE}, got {self.node}")
+        self._lock = threading.Lock()
+        # Last (milliseconds << SEQUENCE_BITS | sequence) handed out
+        self._last_tick = 0
+
+    def next_ids(self, count):
+        """count new IDs, in increasing order."""
+        now = (int(time.time() * 1000) - ID_EPOCH_MS) << SEQUENCE_BITS
+        with self._lock:
+            first = max(now, self._last_tick + 1)
+            self._last_tick = first + count - 1
+        node = self.node << SEQUENCE_BITS
+        return [((tick >> SEQUENCE_BITS) << (NODE_BITS + SEQUENCE_BITS)) | node | (tick & _SEQUENCE_MASK)
+                for tick in range(first, first + count)]
+
+    def next_id(self):
+        return self.next_ids(1)[0]
+
+
+def id_time(row_id):
+    """Epoch seconds at which an ID was generated."""
+    return ((row_id >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS) / 1000
+
+
+# --- Process-wide generator ---
+
+_generator = None
+_generator_pid = None
+_generator_lock = threading.Lock()
+
+
+def _process_generator():
+    # A forked child gets a generator of its own (and its own node, unless ID_NODE is set)
+    global _generator, _generator_pid
+    with _generator_lock:
+        if _generator is None or _generator_pid != os.getpid():
+            _generator = IdGenerator()
+            _generator_pid = os.getpid()
+        return _generator
+
+
+def next_id():
+    return _process_generator().next_id()
+
+
+def next_ids(count):
+    return _process_generator().next_ids(count)
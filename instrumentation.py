@@ -0,0 +1,312 @@
+"""
+Request instrumentation for app.py.
+
+Connections from the pool are wrapped in InstrumentedConnection, whose
+cursors time every SQL statement (execute plus fetching, since SQLite only
+produces rows as they are fetched) and count the rows it returned. Other
+steps of a request are wrapped in `with timed(metrics, 'shape', 'devices_data'):`.
+
+Each step is added to the current request's RequestTimings, which app.py
+turns into a Server-Timing header (visible in the browser's network panel),
+and observed in a Metrics histogram, rendered for Prometheus on /metrics:
+
+    wifi_tracker_request_duration_seconds{endpoint, method, status}
+    wifi_tracker_query_duration_seconds{query}
+    wifi_tracker_query_rows_total{query}
+    wifi_tracker_step_duration_seconds{stage, step}
+
+Statements slower than slow_query_seconds are also printed, with the
+endpoint that ran them.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LABEL_LENGTH = 160  # Longer statements are cut in the query label
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def query_label(sql):
+    """One line per statement shape: whitespace collapsed, IN (%s, %s, ...) lists shortened."""
+    label = _PLACEHOLDER_LIST.sub('%s, ...', _WHITESPACE.sub(' ', sql).strip())
+    return label if len(label) <= QUERY_LABEL_LENGTH else label[:QUERY_LABEL_LENGTH - 3] + '...'
+
+
+def _label_text(names, values):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Histogram:
+    """A Prometheus histogram: per label set, cumulative bucket counts, sum and count."""
+
+    def __init__(self, name, help, labels, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, counts in series:
+            labels = _label_text(self.labels, label_values)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {counts[-2]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {counts[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-2]}")
+        return lines
+
+
+class Counter:
+    """A Prometheus counter per label set."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{{{_label_text(self.labels, label_values)}}} {value}"
+                     for label_values, value in values)
+        return lines
+
+
+class Metrics:
+    """The app's request, query and step metrics, plus the slow-query log."""
+
+    def __init__(self, slow_query_seconds=None):
+        self.slow_query_seconds = slow_query_seconds
+        self.requests = Histogram("wifi_tracker_request_duration_seconds",
+                                  "Time to produce a response, by endpoint.", ("endpoint", "method", "status"))
+        self.queries = Histogram("wifi_tracker_query_duration_seconds",
+                                 "Time to execute an SQL statement and fetch its rows.", ("query",))
+        self.query_rows = Counter("wifi_tracker_query_rows_total", "Rows returned by SQL statements.", ("query",))
+        self.steps = Histogram("wifi_tracker_step_duration_seconds",
+                               "Time spent in a timed() step of a request, e.g. result shaping or JSON encoding.",
+                               ("stage", "step"))
+
+    def observe_query(self, sql, seconds, rows, timings=None):
+        label = (query_label(sql),)
+        self.queries.observe(label, seconds)
+        self.query_rows.inc(label, rows)
+        if timings is not None:
+            timings.add('sql', seconds)
+        if self.slow_query_seconds is not None and seconds >= self.slow_query_seconds:
+            where = timings.endpoint if timings is not None else 'background'
+            print(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows, {where}): {label[0]}")
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.queries, self.query_rows, self.steps):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- PER-REQUEST TIMINGS ---
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Time per stage (sql, shape, json, ...) within one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages = {}  # stage -> [seconds, count], in first-seen order
+        self.open_cursors = set()  # InstrumentedCursors with a statement not recorded yet
+
+    def add(self, stage, seconds):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """The Server-Timing header value: one metric per stage, plus the total."""
+        parts = [f'{stage};dur={seconds * 1000:.2f};desc="{count}x"'
+                 for stage, (seconds, count) in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def start_request(endpoint):
+    _local.timings = RequestTimings(endpoint)
+    return _local.timings
+
+
+def finish_request():
+    """Ends the current request's timings, first recording statements whose cursor is still open."""
+    timings = current_timings()
+    if timings is not None:
+        for cursor in list(timings.open_cursors):
+            cursor._record()
+    _local.timings = None
+    return timings
+
+
+def current_timings():
+    """This thread's RequestTimings, or None outside a request (e.g. the live updates thread)."""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timed(metrics, stage, step):
+    """Times the block as `step` of `stage`, for the current request and the step histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.steps.observe((stage, step), seconds)
+        timings = current_timings()
+        if timings is not None:
+            timings.add(stage, seconds)
+
+
+# --- DATABASE WRAPPERS ---
+
+class InstrumentedCursor:
+    """
+    Times each statement from execute() until the next execute() or close()
+    (or the end of the request), counting only the time spent inside the
+    driver, and the rows fetched.
+    """
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+        self._timings = None  # the request the statement ran in
+
+    def _start(self, sql):
+        self._record()
+        self._sql, self._seconds, self._rows = sql, 0.0, 0
+        self._connection._open.add(self)
+        self._timings = current_timings()
+        if self._timings is not None:
+            self._timings.open_cursors.add(self)
+
+    def _record(self):
+        if self._sql is not None:
+            self._connection.metrics.observe_query(self._sql, self._seconds, self._rows, self._timings)
+            self._sql = None
+            self._connection._open.discard(self)
+            if self._timings is not None:
+                self._timings.open_cursors.discard(self)
+
+    def _call(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def execute(self, operation, params=None):
+        self._start(operation)
+        return self._call(self._cursor.execute, operation, params)
+
+    def executemany(self, operation, seq_of_params):
+        self._start(operation)
+        return self._call(self._cursor.executemany, operation, seq_of_params)
+
+    def fetchone(self):
+        row = self._call(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._call(self._cursor.fetchmany, *args)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._call(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        rows = iter(self._cursor)
+        while True:
+            row = self._call(next, rows, None)
+            if row is None:
+                return
+            self._rows += 1
+            yield row
+
+    def close(self):
+        self._record()
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """
+    A connection whose cursors report to `metrics`. A statement whose cursor
+    is never closed is recorded at the next commit, rollback or close (the
+    pool rolls back every connection it gets back).
+    """
+
+    def __init__(self, raw, metrics):
+        self._raw = raw
+        self.metrics = metrics
+        self._open = set()
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs), self)
+
+    def _record_open(self):
+        for cursor in list(self._open):
+            cursor._record()
+
+    def commit(self):
+        self._record_open()
+        self._raw.commit()
+
+    def rollback(self):
+        self._record_open()
+        self._raw.rollback()
+
+    def close(self):
+        self._record_open()
+        self._raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
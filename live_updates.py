@@ -0,0 +1,180 @@
+"""
+Server-Sent Events fan-out for the dashboard's live views.
+
+One background thread per app process polls a cheap ingest watermark. When
+it moves (or after max_age seconds, or when poke()d after an edit), every
+view is computed once on one pooled connection and serialized once; only
+the views whose result changed are pushed to every subscriber. Views listed
+in delta_keys are sent as {"changed": [...], "removed": [...]} row deltas
+after the first full copy (for a page {"items": [...], ...}, the rows are
+diffed and its other fields are sent as they are). New subscribers get the
+latest full copy of every view without touching the database, so database
+load no longer depends on how many dashboards are open.
+"""
+import json
+import queue
+import threading
+import time
+
+
+def encode_event(name, payload, dumps=json.dumps):
+    return f"event: {name}\ndata: {dumps(payload)}\n\n"
+
+
+def row_delta(old_rows, new_rows, key):
+    """Rows of new_rows that are new or differ from old_rows, and keys that disappeared."""
+    old = {row[key]: row for row in old_rows}
+    new_keys = set()
+    changed = []
+    for row in new_rows:
+        new_keys.add(row[key])
+        if old.get(row[key]) != row:
+            changed.append(row)
+    return {"changed": changed, "removed": [k for k in old if k not in new_keys]}
+
+
+def payload_delta(old, new, key):
+    """row_delta() for a list of rows or for a page dict holding its rows under 'items'."""
+    if isinstance(new, dict):
+        delta = {field: value for field, value in new.items() if field != 'items'}
+        delta.update(row_delta(old['items'], new['items'], key))
+        return delta
+    return row_delta(old, new, key)
+
+
+class LiveHub:
+    """
+    views: {event name: fn(conn) -> JSON-serializable payload}
+    watermark: fn(conn) -> any value that changes whenever new usage is ingested
+    """
+
+    def __init__(self, connect, views, watermark, delta_keys=None, interval=2.0, max_age=15.0,
+                 queue_size=64, heartbeat=15.0, dumps=json.dumps):
+        self.connect = connect
+        self.views = views
+        self.watermark = watermark
+        self.delta_keys = delta_keys or {}
+        self.interval = interval
+        self.max_age = max_age
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.dumps = dumps
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._force = True
+        self._subscribers = set()
+        self._payloads = {}   # event name -> latest payload
+        self._events = {}     # event name -> latest payload, encoded as a full event
+        self._mark = None
+        self._computed_at = 0.0
+
+        self.refreshes = 0
+        self.events_published = 0
+        self.resyncs = 0
+
+    def poke(self):
+        """Recompute on the next tick even if the watermark didn't move (e.g. after a device edit)."""
+        self._force = True
+        self._wake.set()
+
+    # --- Subscribers ---
+
+    def stream(self):
+        """Generator of SSE text for one client: the current state, then updates and keep-alives."""
+        q = self._subscribe()
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while True:
+                try:
+                    yield q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(q)
+
+    def _subscribe(self):
+        q = queue.Queue(self.queue_size)
+        with self._lock:
+            for event in self._events.values():
+                q.put_nowait(event)
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-updates", daemon=True)
+                self._thread.start()
+        if not self._events:
+            self._wake.set()
+        return q
+
+    def _resync(self, q):
+        """A subscriber fell too far behind: replace its backlog with one full copy of every view."""
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        for event in self._events.values():
+            q.put_nowait(event)
+        self.resyncs += 1
+
+    # --- Refresh thread ---
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Live updates: refresh failed: {e}")
+
+    def refresh(self):
+        force, self._force = self._force, False
+        conn = self.connect()
+        try:
+            mark = self.watermark(conn)
+            stale = time.monotonic() - self._computed_at >= self.max_age
+            if not force and not stale and mark == self._mark:
+                return
+            payloads = {name: view(conn) for name, view in self.views.items()}
+        finally:
+            conn.close()
+        self.refreshes += 1
+
+        updates = []
+        events = {}
+        for name, payload in payloads.items():
+            events[name] = encode_event(name, payload, self.dumps)
+            old = self._payloads.get(name)
+            if payload == old:
+                continue
+            if name in self.delta_keys and old is not None:
+                updates.append(encode_event(f"{name}-delta", payload_delta(old, payload, self.delta_keys[name]), self.dumps))
+            else:
+                updates.append(events[name])
+
+        with self._lock:
+            self._payloads = payloads
+            self._events = events
+            self._mark = mark
+            self._computed_at = time.monotonic()
+            for q in self._subscribers:
+                try:
+                    for event in updates:
+                        q.put_nowait(event)
+                except queue.Full:
+                    self._resync(q)
+            self.events_published += len(updates) * len(self._subscribers)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "refreshes": self.refreshes,
+            "eventsPublished": self.events_published,
+            "resyncs": self.resyncs,
+            "views": sorted(self._payloads),
+        }
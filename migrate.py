@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+schema.sql creates the baseline tables; every later schema change is a file
+migrations/NNN_description.sql. This script applies the ones a database
+hasn't had yet, in order, and records each in Schema_Migration (with a
+checksum, so an edited migration that was already applied is reported).
+
+Migrations are MySQL DDL. The SQLite backend (storage.py) has no migration
+history: schema_sqlite.sql is kept at the latest version, so a new migration
+needs its change made there too.
+
+Statements in a migration file end with ';' at the end of a line. MySQL
+commits DDL implicitly, so a migration that fails half way is not rolled
+back: fix the cause, undo what was applied if needed, and run again.
+
+Usage:
+    python migrate.py              # apply pending migrations
+    python migrate.py --status     # list migrations and whether they're applied
+    python migrate.py --baseline 1 # mark 001 as applied without running it (a database
+                                   # that got the password ALTER by hand), then apply the rest
+"""
+import argparse
+import hashlib
+import os
+import re
+import mysql.connector
+
+import storage
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+_MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def find_migrations(directory=MIGRATIONS_DIR):
+    """[(version, name, sql text)] sorted by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise SystemExit(f"Duplicate migration numbers in {directory}")
+    return migrations
+
+
+def split_statements(sql):
+    """Splits a migration into statements; '--' comment lines are dropped."""
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        if line.strip().startswith('--'):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statement = "\n".join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    leftover = "\n".join(current).strip()
+    if leftover:
+        statements.append(leftover)
+    return statements
+
+
+def checksum(sql):
+    return hashlib.sha256(sql.encode()).hexdigest()
+
+
+def ensure_migration_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Schema_Migration (
+            Version INT PRIMARY KEY,
+            Name VARCHAR(255) NOT NULL,
+            Checksum CHAR(64) NOT NULL,
+            Applied_At TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_migrations(cursor):
+    """{version: checksum} of the migrations recorded in this database."""
+    cursor.execute("SELECT Version, Checksum FROM Schema_Migration")
+    return dict(cursor.fetchall())
+
+
+def record_migration(cursor, version, name, sql):
+    cursor.execute("INSERT INTO Schema_Migration (Version, Name, Checksum) VALUES (%s, %s, %s)",
+                   (version, name, checksum(sql)))
+
+
+def migrate(conn, migrations):
+    """Applies the pending migrations in order. Returns how many were applied."""
+    cursor = conn.cursor()
+    applied = applied_migrations(cursor)
+    count = 0
+    for version, name, sql in migrations:
+        if version in applied:
+            if applied[version] != checksum(sql):
+                print(f"Warning: migration {version:03d}_{name} was changed after it was applied")
+            continue
+        print(f"Applying {version:03d}_{name}...")
+        for statement in split_statements(sql):
+            try:
+                cursor.execute(statement)
+            except mysql.connector.Error as e:
+                conn.rollback()
+                print(f"Migration {version:03d}_{name} failed: {e}\n  in: {statement}")
+                raise SystemExit(1)
+        record_migration(cursor, version, name, sql)
+        conn.commit()
+        count += 1
+    cursor.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the schema migrations in migrations/.")
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    parser.add_argument("--baseline", type=int, metavar="VERSION",
+                        help="record migrations up to VERSION as applied without running them")
+    args = parser.parse_args()
+    if storage.BACKEND != 'mysql':
+        raise SystemExit("Migrations are for MySQL; a SQLite database is created from schema_sqlite.sql.")
+
+    migrations = find_migrations()
+    conn = mysql.connector.connect(**storage.db_config)
+    cursor = conn.cursor()
+    ensure_migration_table(cursor)
+    conn.commit()
+
+    if args.baseline is not None:
+        applied = applied_migrations(cursor)
+        for version, name, sql in migrations:
+            if version <= args.baseline and version not in applied:
+                record_migration(cursor, version, name, sql)
+                print(f"Marked {version:03d}_{name} as applied")
+        conn.commit()
+
+    if args.status:
+        applied = applied_migrations(cursor)
+        for version, name, sql in migrations:
+            state = "applied" if version in applied else "pending"
+            if version in applied and applied[version] != checksum(sql):
+                state = "applied (changed since)"
+            print(f"{version:03d}_{name}: {state}")
+    else:
+        count = migrate(conn, migrations)
+        print(f"{count} migration(s) applied." if count else "Database is up to date.")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
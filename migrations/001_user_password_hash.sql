@@ -0,0 +1,10 @@
+-- Login passwords (previously an ALTER run by hand after schema.sql).
+-- The sample users from schema.sql get an example hash (see generate_hashes.py).
+ALTER TABLE User
+ADD COLUMN Password_Hash VARCHAR(255) NOT NULL;
+
+UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U001';
+UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U002';
+UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U003';
+UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U004';
+UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U005';
@@ -0,0 +1,77 @@
+-- Running usage totals, time-bucketed usage, the ingest watermark and the
+-- usage spool checkpoint (see aggregates.py and usage_spool.py). Counters are
+-- in megabytes and keys are the baseline's VARCHAR IDs; 004 converts both.
+-- IF NOT EXISTS: databases created from an older schema.sql already have them.
+
+-- Running usage totals per device (maintained by the writers, see aggregates.py)
+CREATE TABLE IF NOT EXISTS Device_Usage_Total (
+    Device_ID VARCHAR(255) PRIMARY KEY,
+    Data_Downloaded DOUBLE NOT NULL DEFAULT 0,
+    Data_Uploaded DOUBLE NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE
+);
+
+-- Running usage totals per network, broken down by device
+CREATE TABLE IF NOT EXISTS Network_Usage_Total (
+    Network_ID VARCHAR(255) NOT NULL,
+    Device_ID VARCHAR(255) NOT NULL,
+    Data_Downloaded DOUBLE NOT NULL DEFAULT 0,
+    Data_Uploaded DOUBLE NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Network_ID, Device_ID),
+    FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE
+);
+
+-- Time-bucketed usage rollups. Resolution is the bucket size in seconds (60, 300, 3600)
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Global (
+    Resolution INT NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded DOUBLE NOT NULL DEFAULT 0,
+    Data_Uploaded DOUBLE NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Bucket_Start)
+);
+
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Device (
+    Resolution INT NOT NULL,
+    Device_ID VARCHAR(255) NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded DOUBLE NOT NULL DEFAULT 0,
+    Data_Uploaded DOUBLE NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Device_ID, Bucket_Start),
+    FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Network (
+    Resolution INT NOT NULL,
+    Network_ID VARCHAR(255) NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded DOUBLE NOT NULL DEFAULT 0,
+    Data_Uploaded DOUBLE NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Network_ID, Bucket_Start),
+    FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE
+);
+
+-- Bumped in the same transaction as every usage write or dashboard edit (see aggregates.py);
+-- app.py keeps serving cached responses while Version is unchanged
+CREATE TABLE IF NOT EXISTS Ingest_Watermark (
+    Id TINYINT PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP(3) NULL
+);
+
+INSERT IGNORE INTO Ingest_Watermark (Id, Version) VALUES (1, 0);
+
+-- How far the monitor's uploader has drained each local usage spool (see usage_spool.py)
+CREATE TABLE IF NOT EXISTS Spool_Checkpoint (
+    Spool_ID VARCHAR(64) PRIMARY KEY,
+    Segment INT NOT NULL,
+    Byte_Offset BIGINT NOT NULL,
+    Updated_At TIMESTAMP NULL
+);
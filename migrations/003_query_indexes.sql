@@ -0,0 +1,16 @@
+-- Secondary indexes for the dashboard's queries (checked with: python explain_check.py).
+-- InnoDB appends the primary key to every secondary index, so an index on
+-- (a, b) also orders ties by the primary key, which keyset paging relies on.
+
+-- Device detail / device logs: WHERE Device_ID = ? ORDER BY Timestamp DESC, Log_ID DESC.
+-- Replaces the index InnoDB created for the Device_ID foreign key.
+CREATE INDEX idx_connection_log_device_time ON Connection_Log (Device_ID, Timestamp);
+
+-- Top devices today (a Timestamp range) and time-based retention
+CREATE INDEX idx_connection_log_time ON Connection_Log (Timestamp);
+
+-- Device listing ?type= filter
+CREATE INDEX idx_device_type ON Device (Device_Type);
+
+-- Device listing ?status=online and the CSV export's ?since=
+CREATE INDEX idx_device_usage_total_last_seen ON Device_Usage_Total (Last_Seen);
@@ -0,0 +1,196 @@
+-- BIGINT surrogate keys and exact byte counters.
+--
+-- User_ID, Device_ID, Log_ID and Usage_ID become BIGINT. Existing rows are
+-- renumbered 1, 2, 3, ... (users and devices in order of their old ID, logs
+-- in time order); new rows get their IDs from id_generator.py, which start
+-- far above that range. Network_ID stays as it is: it is the code configured
+-- in hotspot_monitor.py. Usage columns change from FLOAT / DOUBLE megabytes to
+-- BIGINT bytes.
+--
+-- The tables with changing keys are rebuilt as <table>_New through the ID
+-- maps, then swapped in; foreign keys are added once every table is in place.
+SET FOREIGN_KEY_CHECKS = 0;
+
+CREATE TABLE Id_Map_User (Old_ID VARCHAR(255) PRIMARY KEY, New_ID BIGINT NOT NULL)
+    SELECT User_ID AS Old_ID, ROW_NUMBER() OVER (ORDER BY User_ID) AS New_ID FROM User;
+
+CREATE TABLE Id_Map_Device (Old_ID VARCHAR(255) PRIMARY KEY, New_ID BIGINT NOT NULL)
+    SELECT Device_ID AS Old_ID, ROW_NUMBER() OVER (ORDER BY Device_ID) AS New_ID FROM Device;
+
+CREATE TABLE Id_Map_Log (Old_ID VARCHAR(255) PRIMARY KEY, New_ID BIGINT NOT NULL)
+    SELECT Log_ID AS Old_ID, ROW_NUMBER() OVER (ORDER BY Timestamp, Log_ID) AS New_ID FROM Connection_Log;
+
+-- --- Rebuilt tables ---
+
+CREATE TABLE User_New (
+    User_ID BIGINT PRIMARY KEY,
+    First_Name VARCHAR(255) NOT NULL,
+    Second_Name VARCHAR(255),
+    Email_ID VARCHAR(255) UNIQUE,
+    Phone_No VARCHAR(20),
+    Password_Hash VARCHAR(255) NOT NULL
+);
+
+INSERT INTO User_New (User_ID, First_Name, Second_Name, Email_ID, Phone_No, Password_Hash)
+SELECT m.New_ID, u.First_Name, u.Second_Name, u.Email_ID, u.Phone_No, u.Password_Hash
+FROM User u JOIN Id_Map_User m ON m.Old_ID = u.User_ID;
+
+CREATE TABLE Device_New (
+    Device_ID BIGINT PRIMARY KEY,
+    User_ID BIGINT NOT NULL,
+    MAC_Address VARCHAR(17) UNIQUE NOT NULL,
+    Device_Name VARCHAR(255) NOT NULL,
+    Device_Type VARCHAR(255) NOT NULL,
+    KEY idx_device_user (User_ID),
+    KEY idx_device_type (Device_Type)
+);
+
+INSERT INTO Device_New (Device_ID, User_ID, MAC_Address, Device_Name, Device_Type)
+SELECT dm.New_ID, um.New_ID, d.MAC_Address, d.Device_Name, d.Device_Type
+FROM Device d
+JOIN Id_Map_Device dm ON dm.Old_ID = d.Device_ID
+JOIN Id_Map_User um ON um.Old_ID = d.User_ID;
+
+CREATE TABLE Connection_Log_New (
+    Log_ID BIGINT PRIMARY KEY,
+    Network_ID VARCHAR(255) NOT NULL,
+    Device_ID BIGINT NOT NULL,
+    Timestamp TIMESTAMP NOT NULL,
+    IP_Address VARCHAR(15) NOT NULL,
+    KEY idx_connection_log_device_time (Device_ID, Timestamp),
+    KEY idx_connection_log_time (Timestamp),
+    KEY idx_connection_log_network (Network_ID)
+);
+
+INSERT INTO Connection_Log_New (Log_ID, Network_ID, Device_ID, Timestamp, IP_Address)
+SELECT lm.New_ID, cl.Network_ID, dm.New_ID, cl.Timestamp, cl.IP_Address
+FROM Connection_Log cl
+JOIN Id_Map_Log lm ON lm.Old_ID = cl.Log_ID
+JOIN Id_Map_Device dm ON dm.Old_ID = cl.Device_ID;
+
+CREATE TABLE Data_Usage_New (
+    Usage_ID BIGINT PRIMARY KEY,
+    Log_ID BIGINT NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    KEY idx_data_usage_log (Log_ID)
+);
+
+INSERT INTO Data_Usage_New (Usage_ID, Log_ID, Data_Downloaded, Data_Uploaded)
+SELECT ROW_NUMBER() OVER (ORDER BY lm.New_ID, du.Usage_ID), lm.New_ID,
+       ROUND(du.Data_Downloaded * 1048576), ROUND(du.Data_Uploaded * 1048576)
+FROM Data_Usage du
+JOIN Id_Map_Log lm ON lm.Old_ID = du.Log_ID;
+
+CREATE TABLE Connects_New (
+    Device_ID BIGINT NOT NULL,
+    Network_ID VARCHAR(255) NOT NULL,
+    PRIMARY KEY (Device_ID, Network_ID),
+    KEY idx_connects_network (Network_ID)
+);
+
+INSERT INTO Connects_New (Device_ID, Network_ID)
+SELECT dm.New_ID, c.Network_ID
+FROM Connects c JOIN Id_Map_Device dm ON dm.Old_ID = c.Device_ID;
+
+CREATE TABLE Device_Usage_Total_New (
+    Device_ID BIGINT PRIMARY KEY,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    KEY idx_device_usage_total_last_seen (Last_Seen)
+);
+
+INSERT INTO Device_Usage_Total_New (Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+SELECT dm.New_ID, ROUND(t.Data_Downloaded * 1048576), ROUND(t.Data_Uploaded * 1048576), t.Last_Seen, t.Sample_Count
+FROM Device_Usage_Total t JOIN Id_Map_Device dm ON dm.Old_ID = t.Device_ID;
+
+CREATE TABLE Network_Usage_Total_New (
+    Network_ID VARCHAR(255) NOT NULL,
+    Device_ID BIGINT NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Network_ID, Device_ID),
+    KEY idx_network_usage_total_device (Device_ID)
+);
+
+INSERT INTO Network_Usage_Total_New (Network_ID, Device_ID, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+SELECT t.Network_ID, dm.New_ID, ROUND(t.Data_Downloaded * 1048576), ROUND(t.Data_Uploaded * 1048576), t.Last_Seen, t.Sample_Count
+FROM Network_Usage_Total t JOIN Id_Map_Device dm ON dm.Old_ID = t.Device_ID;
+
+CREATE TABLE Usage_Bucket_Device_New (
+    Resolution INT NOT NULL,
+    Device_ID BIGINT NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Device_ID, Bucket_Start),
+    KEY idx_usage_bucket_device_device (Device_ID)
+);
+
+INSERT INTO Usage_Bucket_Device_New (Resolution, Device_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Sample_Count)
+SELECT b.Resolution, dm.New_ID, b.Bucket_Start, ROUND(b.Data_Downloaded * 1048576), ROUND(b.Data_Uploaded * 1048576), b.Sample_Count
+FROM Usage_Bucket_Device b JOIN Id_Map_Device dm ON dm.Old_ID = b.Device_ID;
+
+DROP TABLE User, Device, Connection_Log, Data_Usage, Connects, Device_Usage_Total, Network_Usage_Total, Usage_Bucket_Device;
+
+RENAME TABLE
+    User_New TO User,
+    Device_New TO Device,
+    Connection_Log_New TO Connection_Log,
+    Data_Usage_New TO Data_Usage,
+    Connects_New TO Connects,
+    Device_Usage_Total_New TO Device_Usage_Total,
+    Network_Usage_Total_New TO Network_Usage_Total,
+    Usage_Bucket_Device_New TO Usage_Bucket_Device;
+
+DROP TABLE Id_Map_User, Id_Map_Device, Id_Map_Log;
+
+-- --- Tables whose keys don't change: only the counters ---
+
+UPDATE Usage_Bucket_Global SET Data_Downloaded = ROUND(Data_Downloaded * 1048576), Data_Uploaded = ROUND(Data_Uploaded * 1048576);
+
+ALTER TABLE Usage_Bucket_Global
+    MODIFY Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    MODIFY Data_Uploaded BIGINT NOT NULL DEFAULT 0;
+
+UPDATE Usage_Bucket_Network SET Data_Downloaded = ROUND(Data_Downloaded * 1048576), Data_Uploaded = ROUND(Data_Uploaded * 1048576);
+
+ALTER TABLE Usage_Bucket_Network
+    MODIFY Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    MODIFY Data_Uploaded BIGINT NOT NULL DEFAULT 0;
+
+-- --- Foreign keys ---
+
+ALTER TABLE Device
+    ADD FOREIGN KEY (User_ID) REFERENCES User(User_ID) ON DELETE CASCADE;
+
+ALTER TABLE Connection_Log
+    ADD FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    ADD FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE;
+
+ALTER TABLE Data_Usage
+    ADD FOREIGN KEY (Log_ID) REFERENCES Connection_Log(Log_ID) ON DELETE CASCADE;
+
+ALTER TABLE Connects
+    ADD FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    ADD FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE;
+
+ALTER TABLE Device_Usage_Total
+    ADD FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE;
+
+ALTER TABLE Network_Usage_Total
+    ADD FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    ADD FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE;
+
+ALTER TABLE Usage_Bucket_Device
+    ADD FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE;
+
+SET FOREIGN_KEY_CHECKS = 1;
+
+-- Cached dashboard responses hold megabyte values from before the migration
+UPDATE Ingest_Watermark SET Version = Version + 1, Updated_At = NOW(3) WHERE Id = 1;
@@ -0,0 +1,25 @@
+-- Compacted usage history (written by retention.py).
+--
+-- Raw Connection_Log / Data_Usage rows older than the retention age are
+-- summed into one row per device, network and hour (Resolution = 3600);
+-- hourly rows that age out in turn are summed per day (Resolution = 86400).
+-- The running totals already include these samples, so compaction does not
+-- change them; rebuild_aggregates() in aggregates.py reads this table too.
+CREATE TABLE Usage_Rollup (
+    Resolution INT NOT NULL,
+    Device_ID BIGINT NOT NULL,
+    Network_ID VARCHAR(255) NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Device_ID, Network_ID, Bucket_Start),
+    KEY idx_usage_rollup_age (Resolution, Bucket_Start),
+    FOREIGN KEY (Device_ID) REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    FOREIGN KEY (Network_ID) REFERENCES Network(Network_ID) ON DELETE CASCADE
+);
+
+-- Age-based pruning of the fine-grained buckets (WHERE Resolution = ? AND Bucket_Start < ?)
+CREATE INDEX idx_usage_bucket_device_age ON Usage_Bucket_Device (Resolution, Bucket_Start);
+CREATE INDEX idx_usage_bucket_network_age ON Usage_Bucket_Network (Resolution, Bucket_Start);
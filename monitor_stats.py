@@ -0,0 +1,197 @@
+"""
+Operational statistics for hotspot_monitor.py.
+
+The capture thread bumps plain integer attributes of MonitorStats (packets,
+bytes, packets ignored by the own-MAC and subnet filters); it is their only
+writer, so the hot path takes no lock. The flush and upload threads record
+how long each interval took against the FLUSH_INTERVAL budget, and other
+components (usage counters, device registry, spool, kernel ring) are read
+through source callables when a snapshot is taken.
+
+Every `interval` seconds the reporter thread closes a window: per-second
+rates, kernel drops and alerts are computed over it and printed as one JSON
+line prefixed with "stats", which is easy to grep or ship to a log pipeline.
+The latest snapshot is also served as JSON over HTTP on 127.0.0.1 and/or a
+Unix socket:
+
+    curl -s localhost:9105/stats
+    curl -s --unix-socket /run/hotspot_monitor.sock http://localhost/stats
+"""
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUDGET_WARNING_SHARE = 0.5  # Alert when a flush uses more than this share of its interval
+
+
+class MonitorStats:
+    """Counters and timings for one monitor process."""
+
+    def __init__(self, flush_budget):
+        self.flush_budget = flush_budget
+        self.started = time.time()
+
+        # Capture thread only
+        self.packets = 0
+        self.bytes = 0
+        self.ignored_own_mac = 0
+        self.ignored_outside = 0  # neither end in a monitored subnet, or both in the same one
+
+        self.intervals = 0
+        self.last_interval_seconds = 0.0
+        self.max_interval_seconds = 0.0
+        self.uploads = 0
+        self.upload_failures = 0
+        self.last_upload_seconds = 0.0
+        self.max_upload_seconds = 0.0
+        self.kernel_packets = 0
+        self.kernel_drops = 0
+
+        self.kernel_source = None  # callable -> (packets, drops) since its previous call
+        self._sources = {}         # name -> callable returning a dict
+        self._window = {}          # rates and deltas of the last closed window
+        self._previous = (time.monotonic(), 0, 0, 0)
+        self._lock = threading.Lock()  # reporter and stats readers only
+
+    def add_source(self, name, read):
+        self._sources[name] = read
+
+    # --- Recorded by the flush and upload threads ---
+
+    def record_interval(self, seconds):
+        """One FLUSH_INTERVAL moved from the counters to the spool."""
+        self.intervals += 1
+        self.last_interval_seconds = seconds
+        self.max_interval_seconds = max(self.max_interval_seconds, seconds)
+
+    def record_upload(self, seconds, ok):
+        """One batch of spooled intervals written to the database (or not)."""
+        self.uploads += 1
+        if not ok:
+            self.upload_failures += 1
+        self.last_upload_seconds = seconds
+        self.max_upload_seconds = max(self.max_upload_seconds, seconds)
+
+    # --- Reporter ---
+
+    def close_window(self):
+        """Computes rates since the previous call and reads the kernel counters."""
+        now = time.monotonic()
+        drops = None
+        if self.kernel_source is not None:
+            kernel_packets, drops = self.kernel_source()
+            self.kernel_packets += kernel_packets
+            self.kernel_drops += drops
+        with self._lock:
+            then, packets, byte_count, uploads_failed = self._previous
+            seconds = max(now - then, 1e-9)
+            self._window = {
+                "seconds": round(seconds, 1),
+                "packetsPerSecond": round((self.packets - packets) / seconds, 1),
+                "bytesPerSecond": round((self.bytes - byte_count) / seconds, 1),
+                "kernelDrops": drops,
+                "uploadFailures": self.upload_failures - uploads_failed,
+            }
+            self._previous = (now, self.packets, self.bytes, self.upload_failures)
+
+    def alerts(self, window, sources):
+        """Why capture may be falling behind, as short messages (empty when healthy)."""
+        alerts = []
+        if window.get("kernelDrops"):
+            alerts.append(f"kernel dropped {window['kernelDrops']} packets")
+        if self.last_interval_seconds > self.flush_budget * BUDGET_WARNING_SHARE:
+            alerts.append(f"interval flush took {self.last_interval_seconds:.1f}s of the {self.flush_budget}s budget")
+        if self.last_upload_seconds > self.flush_budget * BUDGET_WARNING_SHARE:
+            alerts.append(f"upload took {self.last_upload_seconds:.1f}s of the {self.flush_budget}s budget")
+        if window.get("uploadFailures"):
+            alerts.append(f"{window['uploadFailures']} uploads failed")
+        spool = sources.get("spool") or {}
+        if spool.get("segments", 0) > 1:
+            alerts.append(f"spool backlog of {spool['bytes']} bytes in {spool['segments']} segments")
+        return alerts
+
+    def snapshot(self):
+        sources = {}
+        for name, read in self._sources.items():
+            try:
+                sources[name] = read()
+            except Exception as e:  # a broken source must not take the stats down
+                sources[name] = {"error": str(e)}
+        with self._lock:
+            window = dict(self._window)
+        return {
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "uptimeSeconds": round(time.time() - self.started),
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "ignoredOwnMac": self.ignored_own_mac,
+            "ignoredOutsideSubnets": self.ignored_outside,
+            "kernelPackets": self.kernel_packets if self.kernel_source else None,
+            "kernelDrops": self.kernel_drops if self.kernel_source else None,
+            "window": window,
+            "flush": {
+                "budgetSeconds": self.flush_budget,
+                "intervals": self.intervals,
+                "lastMs": round(self.last_interval_seconds * 1000, 1),
+                "maxMs": round(self.max_interval_seconds * 1000, 1),
+            },
+            "upload": {
+                "batches": self.uploads,
+                "failures": self.upload_failures,
+                "lastMs": round(self.last_upload_seconds * 1000, 1),
+                "maxMs": round(self.max_upload_seconds * 1000, 1),
+            },
+            **sources,
+            "alerts": self.alerts(window, sources),
+        }
+
+
+def report_stats(stats, interval):
+    """Reporter thread: closes a window and prints the snapshot as one JSON line every interval seconds."""
+    while True:
+        time.sleep(interval)
+        stats.close_window()
+        print("stats " + json.dumps(stats.snapshot(), separators=(',', ':')))
+
+
+# --- STATS ENDPOINT ---
+
+def _handler_for(stats):
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/stats'):
+                self.send_error(404)
+                return
+            body = json.dumps(stats.snapshot()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scraped often; don't flood the monitor's output
+
+    return StatsHandler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_stats(stats, port=None, socket_path=None):
+    """Serves GET /stats on 127.0.0.1:port and/or a Unix socket, each from a daemon thread."""
+    servers = []
+    handler = _handler_for(stats)
+    if port:
+        servers.append(ThreadingHTTPServer(('127.0.0.1', port), handler))
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # left behind by a previous run
+        servers.append(_UnixHTTPServer(socket_path, handler))
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return servers
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Offline replay and throughput benchmark for hotspot_monitor.py.
+
+Drives the monitor's accounting pipeline (count_packet -> snapshot ->
+flush_usage) as fast as possible from a pcap file or from a synthetic
+traffic generator. MySQL is replaced by an in-memory stand-in, so this
+measures the monitor's own cost: packets/sec, per-packet cost, flush
+latency, plus the final per-device byte totals.
+
+Usage:
+    python replay_monitor.py --pcap capture.pcap --network 172.20.10.0/28=N008
+    python replay_monitor.py --pcap capture.pcap --network 172.20.10.0/28=N008 --path scapy
+    python replay_monitor.py --devices 200 --packets 1000000 --upload-ratio 0.3 \\
+        --sizes 64:0.4,576:0.2,1500:0.4 --json replay_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import struct
+import threading
+import time
+from collections import defaultdict
+
+import hotspot_monitor as monitor
+from subnet_classifier import SubnetClassifier, parse_network_spec
+
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': '<',  # microsecond timestamps, little-endian
+    b'\xa1\xb2\xc3\xd4': '>',
+    b'\x4d\x3c\xb2\xa1': '<',  # nanosecond timestamps
+    b'\xa1\xb2\x3c\x4d': '>',
+}
+LINKTYPE_ETHERNET = 1
+_IP_ADDRESSES = struct.Struct('!II')
+
+
+# --- IN-MEMORY DATABASE STAND-IN ---
+
+class MemoryDatabase:
+    """
+    Just enough of a MySQL connection for the monitor's flush path: devices
+    are kept in a dict, rows written to every other table are only counted.
+    """
+
+    def __init__(self):
+        self.devices = {}  # MAC -> Device_ID
+        self.rows = defaultdict(int)
+        self.commits = 0
+
+    def connect(self):
+        return _MemoryConnection(self)
+
+
+class _MemoryConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, **kwargs):
+        return _MemoryCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _MemoryCursor:
+    def __init__(self, db):
+        self.db = db
+        self._result = []
+
+    def execute(self, sql, params=()):
+        if sql.split()[0].upper() != "SELECT":
+            self.executemany(sql, [params])
+            return
+        if "MAC_Address IN" in sql:
+            self._result = [(self.db.devices[mac], mac) for mac in params if mac in self.db.devices]
+        elif "FROM User" in sql:
+            self._result = [(1,)]
+        elif "FROM Device" in sql:
+            self._result = [(device_id, mac) for mac, device_id in self.db.devices.items()]
+        else:
+            self._result = []
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        table = sql.split()[2]  # INSERT INTO <table> ...
+        if table == "Device":
+            for row in rows:
+                self.db.devices[row[2]] = row[0]
+        self.db.rows[table] += len(rows)
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def close(self):
+        pass
+
+
+# --- TRAFFIC SOURCES ---
+
+def read_pcap(path, limit=None):
+    """Yields (original length, frame bytes) from a classic libpcap file with Ethernet frames."""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+        if len(header) < 24 or header[:4] not in PCAP_MAGIC:
+            raise ValueError(f"{path}: not a libpcap file (pcapng is not supported; convert with editcap -F pcap)")
+        endian = PCAP_MAGIC[header[:4]]
+        linktype = struct.unpack(endian + 'I', header[20:24])[0]
+        if linktype != LINKTYPE_ETHERNET:
+            raise ValueError(f"{path}: link type {linktype} is not Ethernet")
+
+        record = struct.Struct(endian + 'IIII')
+        count = 0
+        while limit is None or count < limit:
+            raw = f.read(16)
+            if len(raw) < 16:
+                break
+            _, _, incl_len, orig_len = record.unpack(raw)
+            frame = f.read(incl_len)
+            if len(frame) < incl_len:
+                break
+            yield orig_len, frame
+            count += 1
+
+
+def parse_frame(frame):
+    """(src_mac, dst_mac, src_ip, dst_ip) for an Ethernet/IPv4 frame (IPs as ints), else None."""
+    if len(frame) < 34 or frame[12:14] != b'\x08\x00':
+        return None
+    return (frame[6:12].hex(':'), frame[0:6].hex(':')) + _IP_ADDRESSES.unpack_from(frame, 26)
+
+
+def parse_sizes(spec):
+    """'64:0.4,576:0.2,1500:0.4' -> ([64, 576, 1500], [0.4, 0.2, 0.4])"""
+    sizes, weights = [], []
+    for part in spec.split(','):
+        size, _, weight = part.partition(':')
+        sizes.append(int(size))
+        weights.append(float(weight or 1))
+    return sizes, weights
+
+
+def synthetic_packets(device_count, packet_count, upload_ratio, ignored_ratio, sizes, weights, networks, seed):
+    """
+    Generates count_packet() arguments for device_count hotspot clients, spread
+    over the given networks, talking to a pool of remote hosts. ignored_ratio of
+    the packets are ones the monitor must drop (own-MAC and client-to-client traffic).
+    """
+    rng = random.Random(seed)
+    devices = []
+    for i in range(device_count):
+        network = networks[i % len(networks)][0]
+        host = int(network.network_address) + 1 + (i // len(networks)) % max(1, network.num_addresses - 2)
+        devices.append(("3c:22:fb:%02x:%02x:%02x" % (i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff), host))
+    remotes = [(142 << 24) | (250 << 16) | rng.randint(0, 0xffff) for _ in range(64)]
+    gateway_mac = "a4:91:b1:00:00:01"
+    own_mac = monitor.MY_MAC
+    local_ip = int(networks[0][0].network_address) + 1
+
+    packets = []
+    packet_sizes = rng.choices(sizes, weights, k=packet_count)
+    for size in packet_sizes:
+        mac, ip = rng.choice(devices)
+        remote = rng.choice(remotes)
+        kind = rng.random()
+        if kind < ignored_ratio:
+            if kind < ignored_ratio / 2:
+                packets.append((own_mac, mac, local_ip, ip, size))
+            else:
+                peer_mac, peer_ip = rng.choice(devices)
+                packets.append((mac, peer_mac, ip, peer_ip, size))
+        elif rng.random() < upload_ratio:
+            packets.append((mac, gateway_mac, ip, remote, size))
+        else:
+            packets.append((gateway_mac, mac, remote, ip, size))
+    return packets
+
+
+# --- BENCHMARK ---
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_replay(items, path, flush_every, flush_thread_ms=None):
+    """
+    Feeds items through the monitor, flushing every flush_every packets, or,
+    with flush_thread_ms, from a separate flusher thread on a timer like the
+    live monitor. Returns (packets, capture seconds, flush latencies in
+    seconds, byte totals per MAC).
+    """
+    count_packet = monitor.count_packet
+    byte_totals = defaultdict(lambda: [0, 0])
+    flush_times = []
+    if path == "scapy":
+        from scapy.layers.l2 import Ether
+        monitor.load_scapy()
+        packet_callback = monitor.packet_callback
+
+    def feed(chunk):
+        if path == "synthetic":
+            for packet in chunk:
+                count_packet(*packet)
+        elif path == "fast":
+            for length, frame in chunk:
+                parsed = parse_frame(frame)
+                if parsed is not None:
+                    count_packet(*parsed, length)
+        else:
+            for length, frame in chunk:
+                packet_callback(Ether(frame))
+
+    def flush(wait):
+        snapshot = monitor.take_snapshot(wait)
+        for mac, usage in snapshot.items():
+            byte_totals[mac][0] += usage['downloaded']
+            byte_totals[mac][1] += usage['uploaded']
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            monitor.flush_usage([(time.time(), snapshot)])
+        flush_times.append(time.perf_counter() - started)
+
+    if flush_thread_ms:
+        stop = threading.Event()
+
+        def flusher():
+            while not stop.wait(flush_thread_ms / 1000):
+                flush(wait=True)
+
+        flush_thread = threading.Thread(target=flusher, daemon=True)
+        flush_thread.start()
+        started = time.perf_counter()
+        feed(items)
+        capture_time = time.perf_counter() - started
+        stop.set()
+        flush_thread.join()
+        flush(wait=False)
+        return len(items), capture_time, flush_times, byte_totals
+
+    started = time.perf_counter()
+    for start in range(0, len(items), flush_every):
+        feed(items[start:start + flush_every])
+        # Same thread as the writer, so swap the counters directly
+        flush(wait=False)
+    capture_time = time.perf_counter() - started - sum(flush_times)
+    return len(items), capture_time, flush_times, byte_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay traffic through hotspot_monitor's accounting pipeline.")
+    parser.add_argument("--pcap", help="libpcap file to replay (default: synthetic traffic)")
+    parser.add_argument("--path", choices=["fast", "scapy"], default="fast",
+                        help="pcap only: parse frames by offset (fast) or dissect them with Scapy")
+    parser.add_argument("--limit", type=int, help="pcap only: replay at most this many frames")
+    parser.add_argument("--network", action="append", metavar="CIDR=NETWORK_ID",
+                        help="monitored hotspot subnet (repeatable, default 192.168.1.0/24=N008)")
+    parser.add_argument("--local-mac", default="aa:bb:cc:dd:ee:ff", help="the monitoring host's MAC")
+    parser.add_argument("--devices", type=int, default=100, help="synthetic: number of client devices")
+    parser.add_argument("--packets", type=int, default=500000, help="synthetic: number of packets")
+    parser.add_argument("--upload-ratio", type=float, default=0.3, help="synthetic: share of counted packets that are uploads")
+    parser.add_argument("--ignored-ratio", type=float, default=0.05, help="synthetic: share of packets the filters drop")
+    parser.add_argument("--sizes", default="64:0.35,576:0.15,1500:0.5", help="synthetic: size:weight,... packet size mix")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--flush-every", type=int, default=100000, help="packets per flush interval")
+    parser.add_argument("--flush-thread-ms", type=int,
+                        help="flush from a separate thread every N ms instead (measures writer/flusher contention)")
+    parser.add_argument("--top", type=int, default=10, help="devices to list in the byte totals")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    networks = [parse_network_spec(spec) for spec in (args.network or ["192.168.1.0/24=N008"])]
+    monitor.MY_MAC = args.local_mac.lower()
+    monitor.classifier = SubnetClassifier(networks)
+    database = MemoryDatabase()
+    monitor.get_db_connection = database.connect
+
+    if args.pcap:
+        items = list(read_pcap(args.pcap, args.limit))
+        path = args.path
+        source = f"pcap {args.pcap} ({path} path)"
+    else:
+        sizes, weights = parse_sizes(args.sizes)
+        items = synthetic_packets(args.devices, args.packets, args.upload_ratio, args.ignored_ratio,
+                                  sizes, weights, monitor.classifier.networks, args.seed)
+        path = "synthetic"
+        source = f"synthetic ({args.devices} devices, sizes {args.sizes})"
+
+    print(f"--- Replaying {len(items)} packets from {source} ---")
+    packets, capture_time, flush_times, byte_totals = run_replay(items, path, max(1, args.flush_every),
+                                                                 args.flush_thread_ms)
+    flush_total = sum(flush_times)
+
+    results = {
+        "source": source,
+        "packets": packets,
+        "captureSeconds": round(capture_time, 4),
+        "packetsPerSecond": round(packets / capture_time) if capture_time > 0 else None,
+        "nsPerPacket": round(capture_time / packets * 1e9, 1) if packets else None,
+        "flushes": len(flush_times),
+        "flushMs": {
+            "avg": round(flush_total / len(flush_times) * 1000, 3) if flush_times else 0.0,
+            "p50": round(percentile(flush_times, 50) * 1000, 3),
+            "p95": round(percentile(flush_times, 95) * 1000, 3),
+            "max": round(max(flush_times, default=0.0) * 1000, 3),
+        },
+        "rowsWritten": dict(database.rows),
+        "counters": monitor.usage_counters.stats(),
+        "devices": {
+            mac: {"deviceId": database.devices.get(mac), "downloadedBytes": down, "uploadedBytes": up}
+            for mac, (down, up) in sorted(byte_totals.items(), key=lambda kv: -(kv[1][0] + kv[1][1]))
+        },
+    }
+
+    print(f"Packets/sec:      {results['packetsPerSecond']}")
+    print(f"Per-packet cost:  {results['nsPerPacket']} ns")
+    print(f"Flushes:          {results['flushes']} (avg {results['flushMs']['avg']} ms, "
+          f"p95 {results['flushMs']['p95']} ms, max {results['flushMs']['max']} ms)")
+    print(f"Rows written:     {results['rowsWritten']}")
+    print(f"Counter swaps:    {results['counters']['swaps']} (flusher waited {results['counters']['swapWaitTotalMs']} ms "
+          f"in total, max {results['counters']['swapWaitMaxMs']} ms, {results['counters']['forcedSwaps']} forced)")
+    print(f"Top {args.top} devices by bytes:")
+    for mac, totals in list(results["devices"].items())[:args.top]:
+        print(f"  {mac} ({totals['deviceId']}) | Down: {totals['downloadedBytes']} B, Up: {totals['uploadedBytes']} B")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Retention for the usage history.
+
+The monitor writes a Connection_Log + Data_Usage row per active device every
+30 seconds, forever. This job keeps that bounded:
+
+  1. Raw rows older than --raw-days are summed into hourly Usage_Rollup rows
+     (per device and network), then deleted.
+  2. Hourly rollups older than --hourly-days are summed into daily rollups.
+  3. 1- and 5-minute usage buckets older than --fine-days are deleted; the
+     hourly buckets behind the usage-over-time chart are kept.
+
+The running totals (Device_Usage_Total, Network_Usage_Total) already include
+every sample, so the dashboard totals are the same before and after a run.
+Each batch is its own transaction: the rollup upsert and the delete of the
+rows it summarises commit together, so a run can be stopped at any point.
+
+Usage:
+    python retention.py [--raw-days 30] [--hourly-days 365] [--fine-days 30] [--batch-size 5000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import storage
+
+from aggregates import bucket_start, bump_watermark
+
+HOUR = 3600
+DAY = 86400
+FINE_RESOLUTIONS = (60, 300)
+
+ROLLUP_SQL = """
+    INSERT INTO Usage_Rollup (Resolution, Device_ID, Network_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Data_Downloaded = Data_Downloaded + VALUES(Data_Downloaded),
+        Data_Uploaded = Data_Uploaded + VALUES(Data_Uploaded),
+        Last_Seen = GREATEST(COALESCE(Last_Seen, VALUES(Last_Seen)), VALUES(Last_Seen)),
+        Sample_Count = Sample_Count + VALUES(Sample_Count)
+"""
+
+
+def day_start(timestamp):
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _fold_rollup(rollups, key, last_seen, data_down, data_up, count):
+    """Adds samples to an in-memory [down, up, last_seen, count] rollup entry."""
+    entry = rollups.get(key)
+    if entry is None:
+        rollups[key] = [data_down, data_up, last_seen, count]
+        return
+    entry[0] += data_down
+    entry[1] += data_up
+    if last_seen > entry[2]:
+        entry[2] = last_seen
+    entry[3] += count
+
+
+def _write_rollups(cursor, resolution, rollups):
+    cursor.executemany(ROLLUP_SQL, [
+        (resolution, device_id, network_id, start, down, up, last_seen, count)
+        for (device_id, network_id, start), (down, up, last_seen, count) in rollups.items()
+    ])
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def compact_raw_batch(conn, cutoff, batch_size):
+    """
+    Moves the oldest raw rows before cutoff (at most batch_size) into hourly
+    rollups and deletes them, in one transaction. Returns the number of
+    Connection_Log rows compacted.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT cl.Log_ID, cl.Device_ID, cl.Network_ID, cl.Timestamp, du.Data_Downloaded, du.Data_Uploaded
+            FROM Connection_Log cl
+            LEFT JOIN Data_Usage du ON cl.Log_ID = du.Log_ID
+            WHERE cl.Timestamp < %s
+            ORDER BY cl.Timestamp, cl.Log_ID
+            LIMIT %s
+            FOR UPDATE
+        """, (cutoff, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        rollups = {}
+        log_ids = []
+        for log_id, device_id, network_id, timestamp, data_down, data_up in rows:
+            log_ids.append(log_id)
+            if data_down is None:
+                continue  # a log without a usage row was never counted in the totals
+            _fold_rollup(rollups, (device_id, network_id, bucket_start(timestamp, HOUR)),
+                         timestamp, data_down, data_up, 1)
+        _write_rollups(cursor, HOUR, rollups)
+        cursor.execute(f"DELETE FROM Data_Usage WHERE Log_ID IN ({_placeholders(log_ids)})", log_ids)
+        cursor.execute(f"DELETE FROM Connection_Log WHERE Log_ID IN ({_placeholders(log_ids)})", log_ids)
+        # Cached device detail responses may list the deleted logs
+        bump_watermark(cursor)
+        conn.commit()
+        return len(log_ids)
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def compact_hourly_batch(conn, cutoff, batch_size):
+    """
+    Moves the oldest hourly rollups before cutoff into daily rollups. Only
+    whole days are moved (cutoff is a day boundary). Returns the number of
+    hourly rows compacted.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT Device_ID, Network_ID, Bucket_Start, Data_Downloaded, Data_Uploaded, Last_Seen, Sample_Count
+            FROM Usage_Rollup
+            WHERE Resolution = %s AND Bucket_Start < %s
+            ORDER BY Bucket_Start, Device_ID, Network_ID
+            LIMIT %s
+            FOR UPDATE
+        """, (HOUR, cutoff, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        rollups = {}
+        keys = []
+        for device_id, network_id, start, data_down, data_up, last_seen, count in rows:
+            keys.append((device_id, network_id, start))
+            _fold_rollup(rollups, (device_id, network_id, day_start(start)),
+                         last_seen, data_down, data_up, count)
+        _write_rollups(cursor, DAY, rollups)
+        cursor.executemany("""
+            DELETE FROM Usage_Rollup
+            WHERE Resolution = %s AND Device_ID = %s AND Network_ID = %s AND Bucket_Start = %s
+        """, [(HOUR,) + key for key in keys])
+        conn.commit()
+        return len(keys)
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def prune_fine_buckets_batch(conn, cutoff, batch_size):
+    """Deletes up to batch_size 1- and 5-minute buckets (of each table) older than cutoff."""
+    cursor = conn.cursor()
+    deleted = 0
+    try:
+        for table in ("Usage_Bucket_Global", "Usage_Bucket_Device", "Usage_Bucket_Network"):
+            for resolution in FINE_RESOLUTIONS:
+                cursor.execute(f"DELETE FROM {table} WHERE Resolution = %s AND Bucket_Start < %s LIMIT %s",
+                               (resolution, cutoff, batch_size))
+                deleted += cursor.rowcount
+        if deleted:
+            bump_watermark(cursor)
+        conn.commit()
+        return deleted
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def run_in_batches(label, step, conn, cutoff, batch_size):
+    """Calls step until a batch comes back short; prints and returns (rows, seconds)."""
+    started = time.monotonic()
+    total = 0
+    while True:
+        count = step(conn, cutoff, batch_size)
+        total += count
+        if count < batch_size:
+            break
+    elapsed = time.monotonic() - started
+    print(f"{label}: {total} rows before {cutoff:%Y-%m-%d %H:%M} in {elapsed:.2f}s")
+    return total, elapsed
+
+
+def run_retention(conn, raw_days, hourly_days, fine_days, batch_size, now=None):
+    """Runs the three retention steps. Returns {step: (rows, seconds)}."""
+    now = now or datetime.now()
+    # Hour / day boundaries, so a partly compacted bucket is never left behind
+    raw_cutoff = bucket_start(now - timedelta(days=raw_days), HOUR)
+    hourly_cutoff = day_start(now - timedelta(days=hourly_days))
+    fine_cutoff = bucket_start(now - timedelta(days=fine_days), HOUR)
+    return {
+        'raw': run_in_batches("Raw logs compacted into hourly rollups", compact_raw_batch,
+                              conn, raw_cutoff, batch_size),
+        'hourly': run_in_batches("Hourly rollups compacted into daily rollups", compact_hourly_batch,
+                                 conn, hourly_cutoff, batch_size),
+        'fine': run_in_batches("1- and 5-minute buckets pruned", prune_fine_buckets_batch,
+                               conn, fine_cutoff, batch_size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old usage logs into rollups and prune fine-grained buckets.")
+    parser.add_argument("--raw-days", type=int, default=30, help="keep raw connection logs this many days (default 30)")
+    parser.add_argument("--hourly-days", type=int, default=365, help="keep hourly rollups this many days (default 365)")
+    parser.add_argument("--fine-days", type=int, default=30, help="keep 1- and 5-minute buckets this many days (default 30)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction (default 5000)")
+    args = parser.parse_args()
+    # Top devices today reads today's raw logs
+    if args.raw_days < 1:
+        parser.error("--raw-days must be at least 1")
+    if args.hourly_days < args.raw_days:
+        parser.error("--hourly-days must be at least --raw-days")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+
+    print("--- Usage retention ---")
+    conn = storage.connect()
+    try:
+        started = time.monotonic()
+        results = run_retention(conn, args.raw_days, args.hourly_days, args.fine_days, args.batch_size)
+        rows = sum(count for count, _ in results.values())
+        print(f"--- Done: {rows} rows compacted or pruned in {time.monotonic() - started:.2f}s ---")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
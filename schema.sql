@@ -1,4 +1,8 @@
 use dbms_proj;
+-- Baseline schema. Later changes (login passwords, usage totals and buckets,
+-- indexes, BIGINT keys and byte counters, usage rollups) are in migrations/ and
+-- applied with: python migrate.py
+
 -- User table combining all user information
 CREATE TABLE User (
     User_ID VARCHAR(255) PRIMARY KEY,
@@ -110,21 +114,6 @@ INSERT INTO Connects (Device_ID, Network_ID) VALUES
 ('D002', 'N007'),
 ('D003', 'N008');
 
-
-USE dbms_proj;
-
-ALTER TABLE User
-ADD COLUMN Password_Hash VARCHAR(255) NOT NULL;
-
-
--- Update existing users with hashed passwords (example hashes)
-
-UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U001';
-
-UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U002';
-
-UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U003';
-
-UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U004';
-
-UPDATE User SET Password_Hash = 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21' WHERE User_ID = 'U005';
\ No newline at end of file
+-- After loading this file:
+--   python migrate.py      applies migrations/ (login passwords, usage totals, query indexes, ...)
+--   python aggregates.py   fills the running totals and usage buckets from the sample logs
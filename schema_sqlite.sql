@@ -0,0 +1,164 @@
+-- SQLite schema (DB_BACKEND=sqlite, see storage.py), created on first connect.
+-- The same tables as schema.sql with every migration in migrations/ applied;
+-- a new migration needs its change made here too.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS User (
+    User_ID INTEGER PRIMARY KEY,
+    First_Name VARCHAR(255) NOT NULL,
+    Second_Name VARCHAR(255),
+    Email_ID VARCHAR(255) UNIQUE,
+    Phone_No VARCHAR(20),
+    Password_Hash VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Device (
+    Device_ID INTEGER PRIMARY KEY,
+    User_ID BIGINT NOT NULL REFERENCES User(User_ID) ON DELETE CASCADE,
+    MAC_Address VARCHAR(17) UNIQUE NOT NULL,
+    Device_Name VARCHAR(255) NOT NULL,
+    Device_Type VARCHAR(255) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_device_user ON Device (User_ID);
+CREATE INDEX IF NOT EXISTS idx_device_type ON Device (Device_Type);
+
+CREATE TABLE IF NOT EXISTS Network (
+    Network_ID VARCHAR(255) PRIMARY KEY,
+    SSID VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Connection_Log (
+    Log_ID INTEGER PRIMARY KEY,
+    Network_ID VARCHAR(255) NOT NULL REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    Device_ID BIGINT NOT NULL REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Timestamp TIMESTAMP NOT NULL,
+    IP_Address VARCHAR(15) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_connection_log_device_time ON Connection_Log (Device_ID, Timestamp);
+CREATE INDEX IF NOT EXISTS idx_connection_log_time ON Connection_Log (Timestamp);
+CREATE INDEX IF NOT EXISTS idx_connection_log_network ON Connection_Log (Network_ID);
+
+CREATE TABLE IF NOT EXISTS Data_Usage (
+    Usage_ID INTEGER PRIMARY KEY,
+    Log_ID BIGINT NOT NULL REFERENCES Connection_Log(Log_ID) ON DELETE CASCADE,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_data_usage_log ON Data_Usage (Log_ID);
+
+CREATE TABLE IF NOT EXISTS Connects (
+    Device_ID BIGINT NOT NULL REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Network_ID VARCHAR(255) NOT NULL REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    PRIMARY KEY (Device_ID, Network_ID)
+);
+CREATE INDEX IF NOT EXISTS idx_connects_network ON Connects (Network_ID);
+
+CREATE TABLE IF NOT EXISTS Device_Usage_Total (
+    Device_ID INTEGER PRIMARY KEY REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_device_usage_total_last_seen ON Device_Usage_Total (Last_Seen);
+
+CREATE TABLE IF NOT EXISTS Network_Usage_Total (
+    Network_ID VARCHAR(255) NOT NULL REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    Device_ID BIGINT NOT NULL REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Network_ID, Device_ID)
+);
+CREATE INDEX IF NOT EXISTS idx_network_usage_total_device ON Network_Usage_Total (Device_ID);
+
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Global (
+    Resolution INT NOT NULL,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Bucket_Start)
+);
+
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Device (
+    Resolution INT NOT NULL,
+    Device_ID BIGINT NOT NULL REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Device_ID, Bucket_Start)
+);
+CREATE INDEX IF NOT EXISTS idx_usage_bucket_device_device ON Usage_Bucket_Device (Device_ID);
+CREATE INDEX IF NOT EXISTS idx_usage_bucket_device_age ON Usage_Bucket_Device (Resolution, Bucket_Start);
+
+CREATE TABLE IF NOT EXISTS Usage_Bucket_Network (
+    Resolution INT NOT NULL,
+    Network_ID VARCHAR(255) NOT NULL REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Network_ID, Bucket_Start)
+);
+CREATE INDEX IF NOT EXISTS idx_usage_bucket_network_age ON Usage_Bucket_Network (Resolution, Bucket_Start);
+
+CREATE TABLE IF NOT EXISTS Usage_Rollup (
+    Resolution INT NOT NULL,
+    Device_ID BIGINT NOT NULL REFERENCES Device(Device_ID) ON DELETE CASCADE,
+    Network_ID VARCHAR(255) NOT NULL REFERENCES Network(Network_ID) ON DELETE CASCADE,
+    Bucket_Start TIMESTAMP NOT NULL,
+    Data_Downloaded BIGINT NOT NULL DEFAULT 0,
+    Data_Uploaded BIGINT NOT NULL DEFAULT 0,
+    Last_Seen TIMESTAMP NULL,
+    Sample_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Resolution, Device_ID, Network_ID, Bucket_Start)
+);
+CREATE INDEX IF NOT EXISTS idx_usage_rollup_age ON Usage_Rollup (Resolution, Bucket_Start);
+
+CREATE TABLE IF NOT EXISTS Ingest_Watermark (
+    Id TINYINT PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP(3) NULL
+);
+
+CREATE TABLE IF NOT EXISTS Spool_Checkpoint (
+    Spool_ID VARCHAR(64) PRIMARY KEY,
+    Segment INT NOT NULL,
+    Byte_Offset BIGINT NOT NULL,
+    Updated_At TIMESTAMP NULL
+);
+
+-- Sample rows, as in schema.sql (users get the example password hash from generate_hashes.py)
+INSERT OR IGNORE INTO User (User_ID, First_Name, Second_Name, Email_ID, Phone_No, Password_Hash) VALUES
+(1, 'Mithun', 'Prabhu', 'mithun.prabhu@example.com', '1234567890', 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21'),
+(2, 'Jeeva', 'Praveen', 'jeeva.praveen@example.com', '0987654321', 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21'),
+(3, 'Meharnaz', 'Kiran', 'meharnaz.kiran@example.com', '1122334455', 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21'),
+(4, 'Madhumithra', 'RR', 'madhumithra.rr@example.com', '2233445566', 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21'),
+(5, 'David', 'Wilson', 'david.wilson@example.com', '3344556677', 'pbkdf2:sha256:1000000$Q0MrOdtLBypJijm7$7c244b5ae0e05edd572e0032b9487ffb735ad904c356566c721f77277c1bdc21');
+
+INSERT OR IGNORE INTO Device (Device_ID, User_ID, MAC_Address, Device_Name, Device_Type) VALUES
+(1, 1, '00:1A:2B:3C:4D:5E', 'iPhone', 'Smartphone'),
+(2, 2, '00:1A:2B:3C:4D:5F', 'Galaxy Tab', 'Tablet'),
+(3, 3, '00:1A:2B:3C:4D:5G', 'Dell Laptop', 'Laptop'),
+(4, 4, '00:1A:2B:3C:4D:5H', 'HP Printer', 'Printer'),
+(5, 5, '00:1A:2B:3C:4D:5I', 'Samsung TV', 'Smart TV');
+
+INSERT OR IGNORE INTO Network (Network_ID, SSID) VALUES
+('N001', 'GH_1'),
+('N002', 'LH_1'),
+('N003', 'AB_1'),
+('N004', 'AB_2'),
+('N005', 'Rishabs'),
+('N006', 'GH_2'),
+('N007', 'LH_2'),
+('N008', 'GH_5');
+
+INSERT OR IGNORE INTO Connects (Device_ID, Network_ID) VALUES
+(1, 'N001'), (2, 'N002'), (3, 'N003'), (4, 'N004'), (5, 'N005'), (1, 'N006'), (2, 'N007'), (3, 'N008');
+
+INSERT OR IGNORE INTO Ingest_Watermark (Id, Version) VALUES (1, 0);
+
+COMMIT;
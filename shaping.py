@@ -0,0 +1,83 @@
+"""
+Turns query results into API values: bytes into megabytes and "12.3 MB" /
+"1.2 GB" labels, timestamps into text, last-seen times into the Connected
+status. Each helper works on a whole column (a list), with the per-value
+work kept to one comprehension, instead of being called row by row.
+
+Results are shaped from plain lists, without pandas: API pages are at most
+MAX_PAGE_SIZE rows and exports are formatted in batches, sizes at which
+building a DataFrame costs more than the shaping itself (bench_shaping.py
+compares the two).
+"""
+from aggregates import BYTES_PER_MB
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def to_mb(byte_count):
+    """Usage is stored in bytes; the API reports megabytes."""
+    return float(byte_count or 0) / BYTES_PER_MB
+
+
+def format_data_unit(mb_value):
+    """Converts a float MB value to a readable string (MB or GB)."""
+    if mb_value is None or mb_value == 0:
+        return "0 MB"
+    try:
+        mb_value = float(mb_value)
+    except (ValueError, TypeError):
+        return "N/A"
+
+    if abs(mb_value) < 1024:
+        # Show MB if it's less than 1 GB
+        return f"{round(mb_value, 2)} MB"
+    else:
+        # Show GB if it's 1 GB or more
+        gb_value = mb_value / 1024
+        return f"{round(gb_value, 2)} GB"
+
+
+# --- COLUMNS ---
+
+def mb_column(byte_counts):
+    """to_mb() of every value."""
+    # float(): MySQL returns SUM() over BIGINT as Decimal, which would reach the JSON as a string
+    return [float(b or 0) / BYTES_PER_MB for b in byte_counts]
+
+
+def unit_column(mb_values):
+    """format_data_unit() of every value, for floats as mb_column() returns them."""
+    return [
+        "0 MB" if not mb else f"{round(mb, 2)} MB" if -1024 < mb < 1024 else f"{round(mb / 1024, 2)} GB"
+        for mb in mb_values
+    ]
+
+
+def timestamp_column(values, missing='Never'):
+    """TIMESTAMP_FORMAT text of every datetime; `missing` for NULLs."""
+    # isoformat() gives the same text as strftime(TIMESTAMP_FORMAT) for these naive datetimes, faster
+    return [v.isoformat(' ', 'seconds') if v is not None else missing for v in values]
+
+
+def status_column(last_seen_values, now, window):
+    """'Connected' where the device was seen within window of now, else 'Not Connected'."""
+    cutoff = now - window
+    return ["Connected" if v is not None and v > cutoff else "Not Connected" for v in last_seen_values]
+
+
+def shape_usage(rows, bytes_key, now=None, window=None, last_seen_key='lastSeen'):
+    """
+    Replaces rows[i][bytes_key] with 'totalMB' and 'totalUsageFormatted',
+    and, when now is given, formats rows[i][last_seen_key] and adds 'status'.
+    Returns rows.
+    """
+    mb = mb_column([row.pop(bytes_key) for row in rows])
+    columns = {'totalMB': mb, 'totalUsageFormatted': unit_column(mb)}
+    if now is not None:
+        last_seen = [row[last_seen_key] for row in rows]
+        columns['status'] = status_column(last_seen, now, window)
+        columns[last_seen_key] = timestamp_column(last_seen)
+    names = list(columns)
+    for row, values in zip(rows, zip(*columns.values())):
+        row.update(zip(names, values))
+    return rows
@@ -1,100 +1,349 @@
-import mysql.connector 
-import time
+#!/usr/bin/env python3
+"""
+Load generator: writes synthetic Connection_Log / Data_Usage rows (and their
+running totals, as the monitor does) at a target rate, to size the database
+and check ingest changes.
+
+With --devices N it first creates N simulated devices (MACs 02:51:4d:xx:xx:xx)
+spread over --networks simulated networks (SIM001, ...), reusing the ones a
+previous run created; otherwise it writes for the devices and networks
+already in the database. Worker processes then split the devices between
+them and insert --batch rows per transaction, paced to --rate rows/second
+times the traffic shape:
+    flat     constant rate
+    diurnal  a daily curve, quietest at 04:00 and busiest at 16:00 (--day-length
+             compresses the day, e.g. 600 for a 10-minute day)
+    bursty   quiet stretches with short bursts at several times the rate
+Both shapes average out to --rate. Every --report-interval seconds, and at
+the end, it prints the rows/second achieved and the batch latency percentiles.
+
+Usage:
+    python simulator.py                                 # a row every few seconds, like a quiet hotspot
+    python simulator.py --devices 5000 --networks 20 --rate 2000 --workers 4 --batch 200 --duration 60
+    python simulator.py --devices 500 --rate 300 --shape diurnal --day-length 600 --json load.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
 import random
+import time
 from datetime import datetime
 
-# --- SAME DATABASE CONFIG AS YOUR APP.PY ---
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '1234',  # Make sure this matches your password
-    'database': 'dbms_proj'
-}
-
-print("--- Router Simulator Started ---")
-print("Press CTRL+C to stop.")
-
-def get_random_device_id():
-    # Fetches a random device from your Device table
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor(dictionary=True)
+import storage
+from aggregates import BYTES_PER_MB, record_usage
+import id_generator
+
+SIM_MAC_PREFIX = "02:51:4d"  # Locally administered; marks the simulated devices
+SIM_DEVICE_TYPES = ["Smartphone", "Laptop", "Tablet", "Smart TV", "Printer"]
+ROAM_CHANCE = 0.05           # Share of rows logged on another network than the device's own
+BURST_SEGMENT = 10           # Seconds per bursty on/off decision
+BURST_SHARE = 0.2            # Share of segments that are bursts...
+BURST_PEAK = 3.0             # ...at this multiple of the rate, the rest at BURST_BASE
+BURST_BASE = 0.5
+SETUP_CHUNK = 1000           # Rows per insert when creating the simulated fleet
+
+
+# --- FLEET SETUP ---
+
+def sim_mac(index):
+    return f"{SIM_MAC_PREFIX}:{(index >> 16) & 0xff:02x}:{(index >> 8) & 0xff:02x}:{index & 0xff:02x}"
+
+
+def ensure_fleet(conn, device_count, network_count):
+    """
+    Creates the simulated networks and devices that don't exist yet.
+    Returns ([(Device_ID, home Network_ID)], [Network_ID]).
+    """
+    cursor = conn.cursor()
+    networks = [f"SIM{i:03d}" for i in range(1, network_count + 1)]
+    cursor.execute("SELECT Network_ID FROM Network WHERE Network_ID LIKE 'SIM%'")
+    existing = {row[0] for row in cursor.fetchall()}
+    cursor.executemany("INSERT INTO Network (Network_ID, SSID) VALUES (%s, %s)",
+                       [(network_id, f"Sim-{network_id[3:]}") for network_id in networks if network_id not in existing])
+
+    cursor.execute("SELECT Device_ID, MAC_Address FROM Device WHERE MAC_Address >= %s AND MAC_Address < %s",
+                   (SIM_MAC_PREFIX + ":", SIM_MAC_PREFIX + ";"))
+    known = {mac: device_id for device_id, mac in cursor.fetchall()}
+    cursor.execute("SELECT MIN(User_ID) FROM User")
+    owner = cursor.fetchone()[0]
+    if owner is None:
+        raise SystemExit("The database has no users to own the simulated devices.")
+
+    missing = [i for i in range(device_count) if sim_mac(i) not in known]
+    for start in range(0, len(missing), SETUP_CHUNK):
+        chunk = missing[start:start + SETUP_CHUNK]
+        ids = id_generator.next_ids(len(chunk))
+        cursor.executemany(
+            "INSERT INTO Device (Device_ID, User_ID, MAC_Address, Device_Name, Device_Type) VALUES (%s, %s, %s, %s, %s)",
+            [(device_id, owner, sim_mac(i), f"Sim device {i:06d}", SIM_DEVICE_TYPES[i % len(SIM_DEVICE_TYPES)])
+             for device_id, i in zip(ids, chunk)])
+        cursor.executemany("INSERT INTO Connects (Device_ID, Network_ID) VALUES (%s, %s)",
+                           [(device_id, networks[i % network_count]) for device_id, i in zip(ids, chunk)])
+        known.update((sim_mac(i), device_id) for device_id, i in zip(ids, chunk))
+        conn.commit()
+    conn.commit()
+    cursor.close()
+    if missing:
+        print(f"Created {len(missing)} simulated devices.")
+    return [(known[sim_mac(i)], networks[i % network_count]) for i in range(device_count)], networks
+
+
+def existing_fleet(conn):
+    """The devices and networks already in the database, each device homed on a random network."""
+    cursor = conn.cursor()
     cursor.execute("SELECT Device_ID FROM Device")
-    devices = cursor.fetchall()
-    conn.close()
-    if devices:
-        return random.choice(devices)['Device_ID']
-    return None
-
-def get_random_network_id():
-    # Fetches a random network from your Network table
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor(dictionary=True)
+    device_ids = [row[0] for row in cursor.fetchall()]
     cursor.execute("SELECT Network_ID FROM Network")
-    networks = cursor.fetchall()
-    conn.close()
-    if networks:
-        return random.choice(networks)['Network_ID']
-    return None
-
-try:
-    # --- CHANGE: We no longer need counters ---
-    # log_id_counter = 100 
-    # usage_id_counter = 100
-
-    while True:
-        # 1. Pick a random device and network to simulate
-        device_id = get_random_device_id()
-        network_id = get_random_network_id()
-        
-        if not device_id or not network_id:
-            print("Error: No devices or networks in database. Stopping.")
-            break
-
-        # --- CHANGE: Generate UNIQUE IDs using the time ---
-        # We use microseconds to make sure it's always unique
-        unique_id_stamp = str(int(time.time() * 1000000))
-        log_id = f'L{unique_id_stamp}'
-        usage_id = f'U{unique_id_stamp}'
-        # --- END CHANGE ---
-
-        # 2. Create a new Connection_Log entry
-        new_ip = f'192.168.1.{random.randint(10, 200)}'
-        current_time = datetime.now()
-        
-        log_sql = """
+    networks = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if not device_ids or not networks:
+        raise SystemExit("Error: No devices or networks in database. Use --devices to create simulated ones.")
+    return [(device_id, random.choice(networks)) for device_id in device_ids], networks
+
+
+# --- TRAFFIC SHAPES ---
+
+def rate_multiplier(shape, elapsed, day_length, started_at, seed):
+    """How busy the simulated hotspot is `elapsed` seconds into the run (averages 1.0)."""
+    if shape == 'diurnal':
+        seconds_of_day = (started_at.hour * 3600 + started_at.minute * 60 + started_at.second
+                          + elapsed * 86400 / day_length) % 86400
+        phase = 2 * math.pi * (seconds_of_day / 3600 - 4) / 24
+        return 0.25 + 1.5 * (1 - math.cos(phase)) / 2
+    if shape == 'bursty':
+        # Seeded per segment, so all workers burst together
+        segment = int(elapsed // BURST_SEGMENT)
+        return BURST_PEAK if random.Random(seed * 1000003 + segment).random() < BURST_SHARE else BURST_BASE
+    return 1.0
+
+
+def sample_bytes(rng):
+    """Bytes down / up for one 30-second interval: mostly small, occasionally a large download."""
+    down = int(rng.lognormvariate(math.log(2 * BYTES_PER_MB), 1.2))
+    up = int(down * rng.uniform(0.05, 0.4))
+    return down, up
+
+
+# --- WORKERS ---
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def write_batch(conn, samples):
+    """Inserts one batch of (device_id, network_id, timestamp, ip, bytes_down, bytes_up) in one transaction."""
+    ids = id_generator.next_ids(2 * len(samples))
+    log_rows = []
+    usage_rows = []
+    usage = []
+    for n, (device_id, network_id, timestamp, ip, data_down, data_up) in enumerate(samples):
+        log_id, usage_id = ids[2 * n], ids[2 * n + 1]
+        log_rows.append((log_id, network_id, device_id, timestamp, ip))
+        usage_rows.append((usage_id, log_id, data_down, data_up))
+        usage.append((device_id, network_id, timestamp, data_down, data_up))
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("""
             INSERT INTO Connection_Log (Log_ID, Network_ID, Device_ID, Timestamp, IP_Address)
             VALUES (%s, %s, %s, %s, %s)
-        """
-        log_values = (log_id, network_id, device_id, current_time, new_ip)
-        
-        # 3. Create a new Data_Usage entry for that connection
-        data_down = round(random.uniform(5.0, 500.0), 2) # Random data (5-500 MB)
-        data_up = round(random.uniform(1.0, 100.0), 2)
-        
-        usage_sql = """
+        """, log_rows)
+        cursor.executemany("""
             INSERT INTO Data_Usage (Usage_ID, Log_ID, Data_Downloaded, Data_Uploaded)
             VALUES (%s, %s, %s, %s)
-        """
-        usage_values = (usage_id, log_id, data_down, data_up)
-
-        # 4. Execute the queries
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute(log_sql, log_values)
-        cursor.execute(usage_sql, usage_values)
-        conn.commit() # Save the changes to the database
+        """, usage_rows)
+        record_usage(cursor, usage)
+        conn.commit()
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def run_worker(index, args, devices, networks, id_node, started_at, results, stop):
+    """One worker process: writes batches for its share of the devices until stop is set."""
+    os.environ['ID_NODE'] = str(id_node)  # read by the generator this process creates
+    rng = random.Random(args.seed * 7919 + index)
+    rate = args.rate / args.workers
+    conn = storage.connect()
+    rows = errors = 0
+    latencies = []
+    last_report = time.monotonic()
+    start = time.monotonic()
+    next_batch = start
+    try:
+        while not stop.is_set():
+            elapsed = time.monotonic() - start
+            if args.duration and elapsed >= args.duration:
+                break
+            timestamp = datetime.now()
+            batch = []
+            for device_id, home in rng.choices(devices, k=args.batch):
+                network_id = rng.choice(networks) if rng.random() < ROAM_CHANCE else home
+                data_down, data_up = sample_bytes(rng)
+                ip = f"10.{(device_id >> 16) & 0xff}.{(device_id >> 8) & 0xff}.{device_id & 0xff}"
+                batch.append((device_id, network_id, timestamp, ip, data_down, data_up))
+            # Sorted by network and device so concurrent workers take row locks in the same order
+            batch.sort(key=lambda s: (s[1], s[0]))
+
+            began = time.monotonic()
+            try:
+                write_batch(conn, batch)
+                rows += len(batch)
+                latencies.append(time.monotonic() - began)
+            except storage.DatabaseError as e:
+                errors += 1
+                print(f"Worker {index}: batch failed ({e})")
+
+            now = time.monotonic()
+            if now - last_report >= args.report_interval:
+                results.put((index, rows, latencies, errors))
+                rows = errors = 0
+                latencies = []
+                last_report = now
+
+            # Pace to the shaped rate; after falling more than a second behind, don't try to catch up
+            multiplier = rate_multiplier(args.shape, now - start, args.day_length, started_at, args.seed)
+            next_batch += len(batch) / (rate * multiplier)
+            if next_batch < now - 1:
+                next_batch = now
+            stop.wait(max(0.0, next_batch - now))
+    except KeyboardInterrupt:
+        pass  # CTRL+C reaches every process; the parent collects the results
+    finally:
+        results.put((index, rows, latencies, errors))
+        conn.close()
+
+
+# --- REPORTING ---
+
+def summarize(rows, latencies, errors, seconds, batch):
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": round(rows / seconds, 1) if seconds > 0 else 0.0,
+        "batches": len(latencies),
+        "batchSize": batch,
+        "errors": errors,
+        "batchLatencyMs": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies, default=0.0) * 1000, 3),
+        },
+    }
+
+
+def print_summary(label, summary):
+    latency = summary["batchLatencyMs"]
+    print(f"{label} {summary['rowsPerSecond']} rows/s ({summary['rows']} rows in {summary['seconds']}s) | "
+          f"batch of {summary['batchSize']}: p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+          f"p99 {latency['p99']} ms, max {latency['max']} ms | errors {summary['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic hotspot usage at a target rate.")
+    parser.add_argument("--devices", type=int, default=0, help="simulated devices to create / reuse (default: use the existing ones)")
+    parser.add_argument("--networks", type=int, default=8, help="simulated networks, with --devices (default 8)")
+    parser.add_argument("--rate", type=float, default=0.2, help="target rows per second, all workers together (default 0.2)")
+    parser.add_argument("--workers", type=int, default=1, help="writer processes (default 1)")
+    parser.add_argument("--batch", type=int, default=1, help="rows per insert transaction (default 1)")
+    parser.add_argument("--shape", choices=["flat", "diurnal", "bursty"], default="flat")
+    parser.add_argument("--day-length", type=float, default=86400, help="diurnal: seconds per simulated day (default 86400)")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: until CTRL+C)")
+    parser.add_argument("--report-interval", type=float, default=10, help="seconds between progress lines (default 10)")
+    parser.add_argument("--id-node", type=int, default=int(os.environ.get('ID_NODE', 512)),
+                        help="ID node of the first worker; worker i uses this + i (default $ID_NODE or 512)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the final results to this file")
+    args = parser.parse_args()
+    if args.rate <= 0 or args.workers < 1 or args.batch < 1:
+        parser.error("--rate, --workers and --batch must be positive")
+    if args.id_node + args.workers - 1 > id_generator.MAX_NODE:
+        parser.error(f"--id-node + --workers must stay within {id_generator.MAX_NODE + 1} nodes")
+
+    print("--- Router Simulator Started ---")
+    conn = storage.connect()
+    try:
+        if args.devices:
+            devices, networks = ensure_fleet(conn, args.devices, args.networks)
+        else:
+            devices, networks = existing_fleet(conn)
+    finally:
         conn.close()
+    print(f"{len(devices)} devices on {len(networks)} networks | target {args.rate} rows/s ({args.shape}) | "
+          f"{args.workers} worker(s), {args.batch} rows per batch")
+    print("Press CTRL+C to stop.")
 
-        print(f"[{current_time.strftime('%H:%M:%S')}] Logged new connection: Device {device_id} used {data_down} MB")
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    started_at = datetime.now()
+    workers = [
+        multiprocessing.Process(target=run_worker,
+                                args=(i, args, devices[i::args.workers] or devices, networks,
+                                      args.id_node + i, started_at, results, stop))
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
 
-        # --- CHANGE: Remove the old counters ---
-        # log_id_counter += 1
-        # usage_id_counter += 1
-        
-        # 5. Wait for a random time (e.g., 3-8 seconds)
-        time.sleep(random.randint(3, 8))
+    total_rows = total_errors = 0
+    all_latencies = []
+    started = time.monotonic()
+    interval_rows, interval_latencies, interval_errors = 0, [], 0
+    interval_started = started
+    try:
+        while any(worker.is_alive() for worker in workers) or not results.empty():
+            try:
+                _, rows, latencies, errors = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            interval_rows += rows
+            interval_latencies.extend(latencies)
+            interval_errors += errors
+            now = time.monotonic()
+            if now - interval_started >= args.report_interval:
+                print_summary(f"[{now - started:6.0f}s]",
+                              summarize(interval_rows, interval_latencies, interval_errors, now - interval_started, args.batch))
+                total_rows += interval_rows
+                all_latencies.extend(interval_latencies)
+                total_errors += interval_errors
+                interval_rows, interval_latencies, interval_errors = 0, [], 0
+                interval_started = now
+    except KeyboardInterrupt:
+        stop.set()
+        # Workers report what they wrote since their last progress line on the way out. Drained
+        # before joining: a worker whose report is larger than the pipe buffer only exits once it's read.
+        while any(worker.is_alive() for worker in workers) or not results.empty():
+            try:
+                _, rows, latencies, errors = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            interval_rows += rows
+            interval_latencies.extend(latencies)
+            interval_errors += errors
+    for worker in workers:
+        worker.join()
 
-except KeyboardInterrupt:
+    total_rows += interval_rows
+    all_latencies.extend(interval_latencies)
+    total_errors += interval_errors
+    summary = summarize(total_rows, all_latencies, total_errors, time.monotonic() - started, args.batch)
+    summary.update({"targetRowsPerSecond": args.rate, "shape": args.shape, "workers": args.workers,
+                    "devices": len(devices), "networks": len(networks), "backend": storage.BACKEND})
     print("\n--- Simulator Stopped ---")
-except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+    print_summary("Total:", summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
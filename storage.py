@@ -0,0 +1,240 @@
+"""
+Database access shared by the dashboard, the monitor and the tools.
+
+DB_BACKEND selects the store:
+    mysql   (default) the MySQL server in db_config
+    sqlite  an embedded database file, SQLITE_PATH (default wifi_tracker.db
+            next to this file): a single-hotspot deployment or a benchmark
+            run needs no database server at all
+
+Callers get a DB-API connection from connect() and keep writing the
+MySQL-flavoured SQL with %s parameters they always have. On SQLite each
+statement is translated once and cached, so sqlite3 reuses its prepared
+statement:
+    %s                          -> ?
+    ON DUPLICATE KEY UPDATE     -> ON CONFLICT DO UPDATE SET (VALUES(c) -> excluded.c)
+    ... FOR UPDATE              -> dropped (SQLite has one writer at a time)
+    DELETE ... LIMIT n          -> DELETE ... WHERE rowid IN (SELECT ... LIMIT n)
+and NOW(), UNIX_TIMESTAMP(), GREATEST() and CONCAT() are registered as
+SQLite functions.
+TIMESTAMP values come back as datetime objects, as from MySQL.
+
+The SQLite database runs in WAL mode (readers don't block the writer) and
+is created from schema_sqlite.sql on first connect; the MySQL schema is
+schema.sql plus migrations/ (see migrate.py).
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+BACKEND = os.environ.get('DB_BACKEND', 'mysql').lower()
+
+# --- DATABASE CONFIG ---
+db_config = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', '1234'),
+    'database': os.environ.get('DB_NAME', 'dbms_proj')
+}
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(_HERE, 'wifi_tracker.db'))
+SQLITE_SCHEMA = os.path.join(_HERE, 'schema_sqlite.sql')
+SQLITE_BUSY_TIMEOUT = 10  # Seconds a writer waits for another process's write to finish
+
+if BACKEND == 'mysql':
+    import mysql.connector
+    DatabaseError = mysql.connector.Error
+elif BACKEND == 'sqlite':
+    DatabaseError = sqlite3.Error
+else:
+    raise ValueError(f"DB_BACKEND must be mysql or sqlite, got {BACKEND!r}")
+
+
+def connect():
+    """A new connection to the configured backend."""
+    if BACKEND == 'sqlite':
+        return connect_sqlite(SQLITE_PATH)
+    return mysql.connector.connect(**db_config)
+
+
+# --- SQLite backend ---
+
+_UPSERT = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_REF = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_DELETE_LIMIT = re.compile(r'^\s*DELETE\s+FROM\s+(\w+)\s+WHERE\s+(.*?)\s+LIMIT\s+(\S+)\s*$',
+                           re.IGNORECASE | re.DOTALL)
+# 'YYYY-MM-DD HH:MM:SS[.ffffff]', how TIMESTAMP values are stored
+_TIMESTAMP_TEXT = re.compile(r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(\.\d{1,6})?$')
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """The SQLite form of one of the app's MySQL statements."""
+    sql = sql.replace('%s', '?')
+    match = _UPSERT.search(sql)
+    if match:
+        sql = sql[:match.start()] + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r'excluded.\1', sql[match.end():])
+    sql = _FOR_UPDATE.sub('', sql)
+    match = _DELETE_LIMIT.match(sql)
+    if match:
+        table, condition, limit = match.groups()
+        sql = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {condition} LIMIT {limit})"
+    return sql
+
+
+def _adapt_datetime(value):
+    # TIMESTAMP columns hold whole seconds, rounded, as in MySQL
+    if value.microsecond >= 500000:
+        value += timedelta(seconds=1)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _convert_value(value):
+    # Declared types don't survive MAX() / COALESCE(), so timestamps are recognised by their text
+    if isinstance(value, str) and len(value) >= 19 and value[10] == ' ' and _TIMESTAMP_TEXT.match(value):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _tuple_row(cursor, row):
+    return tuple(_convert_value(value) for value in row)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: _convert_value(value) for column, value in zip(cursor.description, row)}
+
+
+def _sql_now(precision=0):
+    now = datetime.now()
+    if precision:
+        return now.strftime('%Y-%m-%d %H:%M:%S.%f')[:20 + min(int(precision), 6)]
+    return _adapt_datetime(now)
+
+
+def _sql_unix_timestamp(timestamp):
+    # Local time, like MySQL with the server's time zone
+    return None if timestamp is None else datetime.fromisoformat(timestamp).timestamp()
+
+
+def _sql_greatest(*values):
+    return None if any(v is None for v in values) else max(values)
+
+
+def _sql_concat(*values):
+    return None if any(v is None for v in values) else ''.join(str(v) for v in values)
+
+
+def _sql_bucket_start(timestamp, resolution):
+    """aggregates.bucket_start() for stored timestamps (whole seconds)."""
+    if timestamp is None:
+        return None
+    value = datetime.fromisoformat(timestamp)
+    return _adapt_datetime(value - timedelta(seconds=(value.minute * 60 + value.second) % resolution))
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _ensure_schema(raw, path):
+    """Creates the tables (and sample rows) the first time a database file is opened."""
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        if not raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Ingest_Watermark'").fetchone():
+            with open(SQLITE_SCHEMA) as f:
+                raw.executescript(f.read())
+        _schema_ready.add(path)
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3: %s parameters, dictionary rows."""
+
+    def __init__(self, raw, dictionary=False):
+        self._cursor = raw.cursor()
+        self._cursor.row_factory = _dict_row if dictionary else _tuple_row
+
+    def execute(self, operation, params=None):
+        self._cursor.execute(translate(operation), params or ())
+
+    def executemany(self, operation, seq_of_params):
+        self._cursor.executemany(translate(operation), seq_of_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class SQLiteConnection:
+    """The parts of a mysql.connector connection the app uses, over sqlite3."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self, dictionary=False, buffered=False, **kwargs):
+        # sqlite3 reads rows lazily either way; buffered makes no difference
+        return SQLiteCursor(self._raw, dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def ping(self, reconnect=False):
+        self._raw.execute("SELECT 1")
+
+    def set_progress_handler(self, handler, n):
+        """sqlite3's progress handler: handler() runs every n VM instructions (bench_endpoints.py counts them)."""
+        self._raw.set_progress_handler(handler, n)
+
+
+def connect_sqlite(path):
+    raw = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False, cached_statements=512)
+    raw.execute("PRAGMA journal_mode = WAL")
+    raw.execute("PRAGMA synchronous = NORMAL")  # WAL stays consistent; only the last commits can be lost on power failure
+    raw.execute("PRAGMA foreign_keys = ON")
+    raw.create_function("NOW", -1, _sql_now)
+    raw.create_function("UNIX_TIMESTAMP", 1, _sql_unix_timestamp, deterministic=True)
+    raw.create_function("GREATEST", -1, _sql_greatest, deterministic=True)
+    raw.create_function("CONCAT", -1, _sql_concat, deterministic=True)
+    raw.create_function("BUCKET_START", 2, _sql_bucket_start, deterministic=True)
+    _ensure_schema(raw, path)
+    return SQLiteConnection(raw)
@@ -0,0 +1,60 @@
+"""
+CIDR-based traffic classifier for hotspot_monitor.py.
+
+Each monitored hotspot subnet (any prefix length, e.g. 172.20.10.0/28) maps
+to a Network_ID. Addresses are compared as packed 32-bit integers: there is
+one dict per distinct netmask, keyed by `address & mask`, checked longest
+prefix first. A monitor with a single hotspot does one AND and one dict
+lookup per address instead of string prefix matching.
+"""
+import ipaddress
+import socket
+import struct
+
+_IPV4 = struct.Struct('!I')
+
+
+def ip_to_int(ip):
+    """'192.168.1.7' -> 3232235783"""
+    return _IPV4.unpack(socket.inet_aton(ip))[0]
+
+
+def int_to_ip(address):
+    """3232235783 -> '192.168.1.7'"""
+    return socket.inet_ntoa(_IPV4.pack(address))
+
+
+def parse_network_spec(spec):
+    """'172.20.10.0/28=N008' -> ('172.20.10.0/28', 'N008')"""
+    cidr, sep, network_id = spec.partition('=')
+    if not sep or not network_id:
+        raise ValueError(f"Expected CIDR=NETWORK_ID, got '{spec}'")
+    return cidr.strip(), network_id.strip()
+
+
+class SubnetClassifier:
+    """Maps IPv4 addresses (as ints) to the Network_ID of the monitored subnet containing them."""
+
+    def __init__(self, networks):
+        """networks: iterable of (cidr, network_id), e.g. [('192.168.43.0/24', 'N008')]"""
+        self.networks = []
+        tables = {}
+        for cidr, network_id in networks:
+            network = ipaddress.IPv4Network(cidr, strict=False)
+            self.networks.append((network, network_id))
+            tables.setdefault(int(network.netmask), {})[int(network.network_address)] = network_id
+        if not self.networks:
+            raise ValueError("SubnetClassifier needs at least one network")
+        # Longest prefix (largest mask) first so nested subnets resolve to the most specific one
+        self._tables = sorted(tables.items(), reverse=True)
+
+    def lookup(self, address):
+        """Network_ID of the monitored subnet containing address, or None if it's outside all of them."""
+        for mask, table in self._tables:
+            network_id = table.get(address & mask)
+            if network_id is not None:
+                return network_id
+        return None
+
+    def __repr__(self):
+        return ", ".join(f"{network} -> {network_id}" for network, network_id in self.networks)
@@ -0,0 +1,69 @@
+"""
+A small thread-safe cache with a per-entry time-to-live and LRU eviction.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Keeps at most `maxsize` entries, each for at most `ttl` seconds.
+    `counters` names extra event counts kept by the caller (see count()),
+    reported by stats() along with the hits and misses.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, counters=()):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.counts = dict.fromkeys(counters, 0)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def count(self, name):
+        """Adds one to the `name` counter."""
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def invalidate(self, key=None):
+        """Drops one entry, or everything when no key is given."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                **self.counts,
+            }
@@ -0,0 +1,176 @@
+"""
+Per-device byte counters for the capture hot path, without a lock per packet.
+
+Each MAC gets a slot number the first time it's counted. Counters live in
+two buffers of flat arrays indexed by slot; the capture thread (the only
+writer) updates the active buffer, the flusher (the only reader) drains the
+other one. To take a snapshot the flusher asks for a swap and the capture
+thread performs it before its next update, so the writer never touches a
+buffer that is being read and no lock is taken per packet.
+
+If no packet is counted for swap_timeout seconds (e.g. an idle hotspot), the
+flusher swaps the buffers itself: the writer has been idle for that long, so
+it is not in the middle of an update.
+"""
+import threading
+import time
+from array import array
+
+
+class _Buffer:
+    """Counters for one interval: uploaded/downloaded bytes, last IP and Network_ID per slot."""
+
+    def __init__(self, capacity):
+        self.uploaded = array('Q', bytes(8 * capacity))
+        self.downloaded = array('Q', bytes(8 * capacity))
+        self.ip = array('I', bytes(4 * capacity))
+        self.network = [None] * capacity
+
+    def grow(self, capacity):
+        extra = capacity - len(self.uploaded)
+        if extra > 0:
+            self.uploaded.extend(array('Q', bytes(8 * extra)))
+            self.downloaded.extend(array('Q', bytes(8 * extra)))
+            self.ip.extend(array('I', bytes(4 * extra)))
+            self.network.extend([None] * extra)
+
+
+class UsageCounters:
+    """
+    Double-buffered, slot-indexed usage counters. add_upload()/add_download()
+    must only be called from one thread; snapshot() from one other thread.
+    Slots idle for idle_intervals snapshots are recycled.
+    """
+
+    def __init__(self, capacity=256, swap_timeout=1.0, idle_intervals=20):
+        self.swap_timeout = swap_timeout
+        self.idle_intervals = idle_intervals
+        self.slots = {}                 # MAC -> slot (writer only)
+        self.macs = []                  # slot -> MAC
+        self._free_slots = []           # writer only
+        self._release_requests = []     # slots the reader wants recycled, applied by the writer on swap
+        self._idle = array('I')         # reader only: consecutive empty intervals per slot
+        self.active = _Buffer(capacity)
+        self._standby = _Buffer(capacity)
+        self.swap_requested = False
+        self._swapped = threading.Event()
+        self._swap_lock = threading.Lock()  # only taken on swaps, never per packet
+
+        self.swaps = 0
+        self.forced_swaps = 0
+        self.swap_wait_total = 0.0
+        self.swap_wait_max = 0.0
+        self.recycled = 0
+
+    # --- Writer (capture thread) ---
+
+    def add_upload(self, mac, ip, network_id, size):
+        if self.swap_requested:
+            self._swap()
+        slot = self.slots.get(mac)
+        if slot is None:
+            slot = self._assign(mac)
+        buf = self.active
+        buf.uploaded[slot] += size
+        buf.ip[slot] = ip
+        buf.network[slot] = network_id
+
+    def add_download(self, mac, ip, network_id, size):
+        if self.swap_requested:
+            self._swap()
+        slot = self.slots.get(mac)
+        if slot is None:
+            slot = self._assign(mac)
+        buf = self.active
+        buf.downloaded[slot] += size
+        buf.ip[slot] = ip
+        buf.network[slot] = network_id
+
+    def _assign(self, mac):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self.macs[slot] = mac
+        else:
+            slot = len(self.macs)
+            if slot >= len(self.active.uploaded):
+                self.active.grow(max(2 * slot, 16))
+            self.macs.append(mac)
+        self.slots[mac] = slot
+        return slot
+
+    def _swap(self):
+        with self._swap_lock:
+            if not self.swap_requested:
+                return
+            retiring, fresh = self.active, self._standby
+            # The standby buffer was fully drained by the previous snapshot
+            fresh.grow(len(retiring.uploaded))
+            for slot in self._release_requests:
+                # Only recycle slots that really stayed idle in the retiring interval
+                mac = self.macs[slot]
+                if retiring.uploaded[slot] == 0 and retiring.downloaded[slot] == 0 and self.slots.get(mac) == slot:
+                    del self.slots[mac]
+                    self.macs[slot] = None
+                    self._free_slots.append(slot)
+                    self.recycled += 1
+            self._release_requests = []
+            self.active, self._standby = fresh, retiring
+            self.swap_requested = False
+            self.swaps += 1
+        self._swapped.set()
+
+    # --- Reader (flush thread) ---
+
+    def snapshot(self, wait=True):
+        """
+        Returns {mac: {"uploaded", "downloaded", "ip", "network"}} for the
+        interval since the previous snapshot. wait=False swaps immediately;
+        use it only when the writer can't be running (same thread, or stopped).
+        """
+        started = time.perf_counter()
+        self._swapped.clear()
+        self.swap_requested = True
+        if not wait:
+            self._swap()
+        elif not self._swapped.wait(self.swap_timeout) and self.swap_requested:
+            self.forced_swaps += 1
+            self._swap()
+        waited = time.perf_counter() - started
+        self.swap_wait_total += waited
+        self.swap_wait_max = max(self.swap_wait_max, waited)
+        return self._drain(self._standby)
+
+    def _drain(self, buf):
+        usage = {}
+        uploaded, downloaded, ips, networks = buf.uploaded, buf.downloaded, buf.ip, buf.network
+        macs = self.macs
+        slot_count = min(len(macs), len(uploaded))
+        idle = self._idle
+        if len(idle) < slot_count:
+            idle.extend(array('I', bytes(4 * (slot_count - len(idle)))))
+        release = []
+        for slot in range(slot_count):
+            up, down = uploaded[slot], downloaded[slot]
+            if up or down:
+                usage[macs[slot]] = {"uploaded": up, "downloaded": down, "ip": ips[slot], "network": networks[slot]}
+                uploaded[slot] = 0
+                downloaded[slot] = 0
+                idle[slot] = 0
+            elif macs[slot] is not None:
+                idle[slot] += 1
+                if idle[slot] >= self.idle_intervals:
+                    release.append(slot)
+        if release:
+            self._release_requests = release
+        return usage
+
+    def stats(self):
+        return {
+            "slots": len(self.slots),
+            "capacity": len(self.active.uploaded),
+            "swaps": self.swaps,
+            "forcedSwaps": self.forced_swaps,
+            "swapWaitTotalMs": round(self.swap_wait_total * 1000, 3),
+            "swapWaitMaxMs": round(self.swap_wait_max * 1000, 3),
+            "recycledSlots": self.recycled,
+        }
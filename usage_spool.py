@@ -0,0 +1,207 @@
+"""
+Durable local spool between the monitor's counters and MySQL.
+
+Every flush interval the monitor appends its usage snapshot to an
+append-only spool on local disk; a separate uploader drains the spool into
+the database in large batches. A slow or unreachable MySQL then only grows
+the spool: capture never waits on it and no interval is lost.
+
+The spool is a directory of numbered segment files. Each record is one
+interval: a header (payload length, CRC32) followed by the interval end
+time, the entry count and one compact binary entry per device. Appends are
+flushed to the OS right away and fsync'ed at most every fsync_interval
+seconds.
+
+A position is (segment, offset). The uploader stores the position it has
+reached in Spool_Checkpoint in the same transaction as the rows it writes,
+so after a crash it resumes exactly where the last commit ended: nothing is
+written twice and nothing is skipped. Each process start appends to a new
+segment, so a checkpoint never points into bytes that were rewritten.
+"""
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+SEGMENT_SUFFIX = ".spool"
+
+# Record header: payload length, CRC32 of the payload
+_HEADER = struct.Struct('<II')
+# Payload: interval end (epoch seconds), entry count, then the entries
+_INTERVAL = struct.Struct('<dI')
+# Entry: MAC, IPv4 address, uploaded bytes, downloaded bytes, Network_ID length (Network_ID follows)
+_ENTRY = struct.Struct('<6sIQQB')
+
+
+def encode_interval(timestamp, usage):
+    """{mac: {"uploaded", "downloaded", "ip", "network"}} -> one spool record"""
+    parts = [_INTERVAL.pack(timestamp, len(usage))]
+    for mac, entry in usage.items():
+        network = (entry['network'] or '').encode()
+        parts.append(_ENTRY.pack(bytes.fromhex(mac.replace(':', '')), entry['ip'] or 0,
+                                 entry['uploaded'], entry['downloaded'], len(network)))
+        parts.append(network)
+    payload = b"".join(parts)
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_interval(payload):
+    """One record payload -> (timestamp, usage) in the shape encode_interval() takes."""
+    timestamp, count = _INTERVAL.unpack_from(payload)
+    offset = _INTERVAL.size
+    usage = {}
+    for _ in range(count):
+        mac, ip, uploaded, downloaded, network_len = _ENTRY.unpack_from(payload, offset)
+        offset += _ENTRY.size
+        network = payload[offset:offset + network_len].decode() or None
+        offset += network_len
+        usage[mac.hex(':')] = {"uploaded": uploaded, "downloaded": downloaded, "ip": ip, "network": network}
+    return timestamp, usage
+
+
+# --- Upload checkpoint (written in the uploader's transaction) ---
+
+def load_checkpoint(cursor, spool_id):
+    """Position the uploader had committed for this spool, or None."""
+    cursor.execute("SELECT Segment, Byte_Offset FROM Spool_Checkpoint WHERE Spool_ID = %s", (spool_id,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def save_checkpoint(cursor, spool_id, position):
+    cursor.execute("""
+        INSERT INTO Spool_Checkpoint (Spool_ID, Segment, Byte_Offset, Updated_At)
+        VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE Segment = VALUES(Segment), Byte_Offset = VALUES(Byte_Offset), Updated_At = NOW()
+    """, (spool_id, position[0], position[1]))
+
+
+class UsageSpool:
+    """Append-only interval spool in one directory. append() and read() may be called from different threads."""
+
+    def __init__(self, directory, segment_bytes=16 << 20, fsync_interval=5.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Identifies this spool in Spool_Checkpoint; a new directory starts from scratch
+        id_path = os.path.join(directory, "spool.id")
+        if not os.path.exists(id_path):
+            with open(id_path, "w") as f:
+                f.write(uuid.uuid4().hex)
+                f.flush()
+                os.fsync(f.fileno())
+        with open(id_path) as f:
+            self.spool_id = f.read().strip()
+
+        segments = self.segments()
+        self.segment = segments[-1] + 1 if segments else 0
+        self._file = open(self._segment_path(self.segment), "ab")
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+
+        self.appended = 0
+        self.fsyncs = 0
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"{segment:08d}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """Segment numbers on disk, oldest first."""
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+
+    # --- Writer (flush thread) ---
+
+    def append(self, timestamp, usage):
+        """Adds one interval. Returns once it's in the OS page cache; fsync is batched."""
+        record = encode_interval(timestamp, usage)
+        with self._lock:
+            if self._file.tell() >= self.segment_bytes:
+                self._roll()
+            self._file.write(record)
+            self._file.flush()
+            self._unsynced = True
+            self.appended += 1
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+            self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def _roll(self):
+        self._sync()
+        self._file.close()
+        self.segment += 1
+        self._file = open(self._segment_path(self.segment), "ab")
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    # --- Reader (uploader thread) ---
+
+    def read(self, position, max_records=120):
+        """
+        Returns ([(timestamp, usage), ...], next_position) for up to
+        max_records intervals after position ((segment, offset); None for
+        the start of the spool).
+        """
+        segment, offset = position or (0, 0)
+        records = []
+        for current in self.segments():
+            if current < segment:
+                continue
+            if current > segment:
+                segment, offset = current, 0
+            with open(self._segment_path(current), "rb") as f:
+                f.seek(offset)
+                while len(records) < max_records:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    length, crc = _HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        # Torn tail from a crash; the writer moved on to a new segment
+                        if current != self.segment:
+                            print(f"Spool: skipping damaged tail of segment {current} at offset {offset}")
+                        break
+                    records.append(decode_interval(payload))
+                    offset += _HEADER.size + length
+            if len(records) >= max_records or current == self.segment:
+                break
+        return records, (segment, offset)
+
+    def purge(self, position):
+        """Deletes segments that lie entirely before position."""
+        for segment in self.segments():
+            if segment >= position[0] or segment == self.segment:
+                break
+            os.remove(self._segment_path(segment))
+
+    def backlog(self, position):
+        """Bytes and segments not yet uploaded past position."""
+        segment, offset = position or (0, 0)
+        pending = 0
+        segments = 0
+        for current in self.segments():
+            if current < segment:
+                continue
+            size = os.path.getsize(self._segment_path(current))
+            pending += size - offset if current == segment else size
+            segments += 1
+        return {"bytes": max(pending, 0), "segments": segments}